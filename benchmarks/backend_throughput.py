@@ -0,0 +1,48 @@
+import argparse
+import functools
+import os
+import tempfile
+import time
+import dspy
+from diaspy.agents import AGENT_CLASSES
+from diaspy.backends import ProcessBackend, ThreadBackend, save_artifact
+from diaspy.fakes import FakeLM
+from diaspy.responders import DialecticResponder
+
+# Dialectics per second per core with a CPU-bound local "model" (FakeLM hashing in a Python loop, holding the GIL),
+# thread backend vs. process backend with compiled agents resident in each worker
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--cpu-work', type=int, default=20000, help='hash rounds per LM call')
+    parser.add_argument('--mode', default='binary')
+    args = parser.parse_args()
+    queries = [f'Query {i}: is progress inevitable?' for i in range(args.queries)]
+    lm_factory = functools.partial(FakeLM, cpu_work=args.cpu_work)
+    agents = {key: agent_class() for key, agent_class in AGENT_CLASSES.items()}
+
+    dspy.settings.configure(lm=lm_factory())
+    backend = ThreadBackend(DialecticResponder(**agents), max_workers=args.workers)
+    started = time.perf_counter()
+    backend.map(queries, mode=args.mode)
+    thread_seconds = time.perf_counter() - started
+    backend.shutdown()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'agents.json')
+        save_artifact(agents, path)
+        backend = ProcessBackend(path, lm_factory, max_workers=args.workers)
+        backend.map(queries[:args.workers], mode=args.mode)  # warm up: spawn workers and load the artifact
+        started = time.perf_counter()
+        backend.map(queries, mode=args.mode)
+        process_seconds = time.perf_counter() - started
+        backend.shutdown()
+
+    for name, seconds in (('thread', thread_seconds), ('process', process_seconds)):
+        print(f"{name:<8} {args.workers} workers: {args.queries / seconds:7.2f} dialectics/s, "
+              f"{args.queries / seconds / args.workers:7.2f} per core")
+
+if __name__ == '__main__':
+    main()
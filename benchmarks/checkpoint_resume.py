@@ -0,0 +1,58 @@
+import argparse
+import time
+from diaspy.checkpoints import SQLiteCheckpointStore
+from diaspy.fakes import fake_responder
+from diaspy.usage import on_stage
+
+# Cost of retrying a debate that fails partway, restarting from scratch versus resuming from its checkpoint, and the
+# per-call cost of checkpointing a run that never fails. FakeLM with a fixed per-call latency; critic scores stay
+# below the early exit so every round runs.
+
+class FailsAt:
+    # Wraps an agent so its n-th call overall raises once
+    def __init__(self, agent, n):
+        self.agent = agent
+        self.n = n
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        if self.calls == self.n:
+            raise TimeoutError('LM timed out')
+        return self.agent(*args, **kwargs)
+
+def attempt(responder, query, rounds, run_id=None):
+    calls = []
+    started = time.perf_counter()
+    with on_stage(lambda agent, result, seconds: calls.append(agent)):
+        try:
+            responder(query, mode='debate', max_rounds=rounds, max_iterations=1, run_id=run_id)
+        except TimeoutError:
+            pass
+    return time.perf_counter() - started, len(calls)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--rounds', type=int, default=6)
+    parser.add_argument('--db', default=':memory:')
+    args = parser.parse_args()
+    responder = fake_responder(latency=args.latency, score='0.5')
+    pro = responder.pro_debate_agent
+    print(f"{'variant':<12} {'first s':>8} {'retry s':>8} {'retry calls':>12}")
+    for variant in ('restart', 'checkpoint'):
+        responder.checkpoints = SQLiteCheckpointStore(args.db) if variant == 'checkpoint' else None
+        # The last rebuttal fails, after nearly the whole debate has run
+        responder.pro_debate_agent = FailsAt(pro, args.rounds)
+        query = f"Is progress inevitable? ({variant})"
+        first, _ = attempt(responder, query, args.rounds, run_id=variant)
+        retry, calls = attempt(responder, query, args.rounds, run_id=variant)
+        print(f"{variant:<12} {first:8.3f} {retry:8.3f} {calls:12d}")
+    responder.pro_debate_agent = pro
+    for variant in ('off', 'on'):
+        responder.checkpoints = SQLiteCheckpointStore(args.db) if variant == 'on' else None
+        latency, calls = attempt(responder, f"Is progress inevitable? (overhead {variant})", args.rounds)
+        print(f"checkpointing {variant:<3} {latency:8.3f}s for {calls} calls")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import dspy
+from diaspy.agents import AGENT_CLASSES
+from diaspy.fakes import FakeLM
+from diaspy.lm import make_lm
+from diaspy.responders import DialecticResponder
+from diaspy.usage import counters
+
+# Debates with and without convergence detection, reporting debater/critic calls, rounds saved and the critic's score
+# of each final synthesis. Offline, debaters are FakeLM agents that run dry after --fresh rounds and start restating
+# earlier turns; with --model (XAI_API_KEY set) real agents debate and the synthesis scores are meaningful.
+
+QUERIES = ['Is artificial intelligence beneficial for society?', 'Should nuclear power replace fossil fuels?',
+           'Is remote work better than office work?', 'Should space exploration be publicly funded?']
+
+class RunsDry:
+    # Wraps a debater so that after `fresh` calls per query it repeats its earlier arguments
+    def __init__(self, agent, fresh):
+        self.agent = agent
+        self.fresh = fresh
+        self.said = {}
+
+    def __call__(self, **kwargs):
+        said = self.said.setdefault(kwargs['query'], [])
+        if len(said) >= self.fresh:
+            return said[len(said) % self.fresh]
+        said.append(self.agent(**kwargs))
+        return said[-1]
+
+def run(agents, threshold, max_rounds, fresh):
+    counters.reset()
+    responder = DialecticResponder(**agents, convergence_threshold=threshold)
+    if fresh:
+        responder.pro_debate_agent = RunsDry(responder.pro_debate_agent, fresh)
+        responder.con_debate_agent = RunsDry(responder.con_debate_agent, fresh)
+    calls, scores = 0, []
+    for query in QUERIES:
+        prediction = responder(query, mode='debate', max_rounds=max_rounds)
+        calls += len(prediction.debate_history) - 1
+        history = '\n'.join(prediction.debate_history)
+        scores.append(responder.critic_agent(query=query, thesis=prediction.debate_history[0], antithesis=history,
+                                             synthesis=prediction.synthesis)[1])
+    return calls, counters.snapshot().get('debate_rounds_saved', 0), sum(scores) / len(scores)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=6)
+    parser.add_argument('--fresh', type=int, default=2, help='rounds before offline debaters run dry (0 never)')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.95, 0.9, 0.8])
+    parser.add_argument('--model', help='real LM, e.g. xai/grok-3-mini')
+    args = parser.parse_args()
+    if args.model:
+        dspy.settings.configure(lm=make_lm(args.model, api_key=os.environ.get('XAI_API_KEY')))
+        fresh = 0
+    else:
+        # Below the critic's 0.9 early exit so debates run until they converge or hit --rounds
+        dspy.settings.configure(lm=FakeLM(score='0.5'))
+        fresh = args.fresh
+    agents = {key: agent_class() for key, agent_class in AGENT_CLASSES.items()}
+    baseline_calls, _, baseline_score = run(agents, None, args.rounds, fresh)
+    print(f"{len(QUERIES)} debates, max {args.rounds} rounds")
+    print(f"{'threshold':>9} {'turns':>6} {'rounds saved':>13} {'synthesis score':>16}")
+    print(f"{'off':>9} {baseline_calls:>6} {0:>13} {baseline_score:16.3f}")
+    for threshold in args.thresholds:
+        calls, saved, score = run(agents, threshold, args.rounds, fresh)
+        print(f"{threshold:9.2f} {calls:>6} {saved:>13} {score:16.3f}")
+
+if __name__ == '__main__':
+    main()
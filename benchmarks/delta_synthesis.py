@@ -0,0 +1,67 @@
+import argparse
+import dspy
+from diaspy.agents import AGENT_CLASSES
+from diaspy.fakes import FakeLM
+from diaspy.responders import DialecticResponder
+from diaspy.usage import approx_tokens
+
+# Synthesis prompt tokens per experts-mode refinement round, full re-synthesis versus delta revision, as the panel
+# grows. Offline: FakeLM experts, of which only --changing per round revise their opinion after a critique.
+
+class PartlyStubborn:
+    # Wraps the expert so that only domains in `changing` revise their opinion when given a critique
+    def __init__(self, agent, changing):
+        self.agent = agent
+        self.changing = changing
+        self.first = {}
+
+    def __call__(self, query, expertise_domain, context=''):
+        if context and expertise_domain not in self.changing:
+            return self.first[query, expertise_domain]
+        opinion = self.agent(query=query, expertise_domain=expertise_domain, context=context)
+        self.first.setdefault((query, expertise_domain), opinion)
+        return opinion
+
+class PromptMeter:
+    # Counts input tokens sent to the agent, ignoring the first `skip` calls
+    def __init__(self, agent, skip=0):
+        self.agent = agent
+        self.skip = skip
+        self.calls = 0
+        self.tokens = 0
+
+    def __call__(self, **kwargs):
+        if self.skip:
+            self.skip -= 1
+        else:
+            self.calls += 1
+            self.tokens += approx_tokens(*kwargs.values())
+        return self.agent(**kwargs)
+
+def run(domains, changing, delta, iterations):
+    responder = DialecticResponder(**{key: agent_class() for key, agent_class in AGENT_CLASSES.items()}, delta_synthesis=delta,
+                                   dedupe_threshold=0.95)
+    responder.expert_agent = PartlyStubborn(responder.expert_agent, set(domains[:changing]))
+    # The opening synthesis is the same either way; meter only what refinement rounds send
+    responder.synthesis_agent = meter = PromptMeter(responder.synthesis_agent, skip=1)
+    responder.revision_agent = revision = PromptMeter(responder.revision_agent)
+    responder('Is artificial intelligence beneficial for society?', mode='experts', domains=domains, max_iterations=iterations)
+    return (meter.tokens + revision.tokens) / max(1, meter.calls + revision.calls)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--domains', type=int, nargs='+', default=[4, 8, 16, 32])
+    parser.add_argument('--changing', type=int, default=1, help='experts that revise their opinion each round')
+    parser.add_argument('--iterations', type=int, default=3)
+    args = parser.parse_args()
+    # Critic scores stay below the 0.8 early exit so every refinement round runs
+    dspy.settings.configure(lm=FakeLM(score='0.5', words=40))
+    print(f"{'domains':>7} {'full tokens/round':>18} {'delta tokens/round':>19} {'saved':>7}")
+    for count in args.domains:
+        domains = [f'domain{i}' for i in range(count)]
+        full = run(domains, args.changing, False, args.iterations)
+        delta = run(domains, args.changing, True, args.iterations)
+        print(f"{count:>7} {full:18.0f} {delta:19.0f} {1 - delta / full:7.1%}")
+
+if __name__ == '__main__':
+    main()
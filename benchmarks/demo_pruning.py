@@ -0,0 +1,41 @@
+import argparse
+import dspy
+from diaspy.agents import AGENT_CLASSES
+from diaspy.datasets import index_by_agent
+from diaspy.fakes import FakeLM
+from diaspy.pruning import QueryDemoSelector, agent_demos, demo_tokens, prune_demos, pruning_report
+from diaspy.utils import compile_agents, trainset
+
+# Prunes compiled agents' demos against philosophical_metric and reports demo prompt tokens saved per agent call.
+# Runs offline against FakeLM; pass --bootstrap to compile with BootstrapFewShot instead of labeled demos.
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bootstrap', action='store_true')
+    parser.add_argument('--demos', type=int, default=4)
+    parser.add_argument('--tolerance', type=float, default=0.0)
+    parser.add_argument('--select', type=int, default=1, help='demos per call for per-query selection')
+    args = parser.parse_args()
+    dspy.settings.configure(lm=FakeLM())
+    if args.bootstrap:
+        compiled = compile_agents(trainset)
+    else:
+        teleprompter = dspy.LabeledFewShot(k=args.demos)
+        examples = index_by_agent(trainset)
+        compiled = {key: teleprompter.compile(agent_class(), trainset=examples[key]) for key, agent_class in AGENT_CLASSES.items()}
+    pruned, report = prune_demos(compiled, tolerance=args.tolerance)
+    print(pruning_report(report))
+    print(f"\nPer-query selection, {args.select} demo(s) per call:")
+    examples = index_by_agent(trainset)
+    for key, agent in sorted(compiled.items()):
+        pool = agent_demos(agent)
+        if not examples[key] or not any(pool.values()):
+            continue
+        selector = QueryDemoSelector(agent, k=args.select)
+        per_call = [sum(demo_tokens([pool[name][i] for i in indices]) for name, indices in selector.select(example.query).items())
+                    for example in examples[key]]
+        full = sum(map(demo_tokens, pool.values()))
+        print(f"{key:<12} {full:>5} -> {sum(per_call) / len(per_call):7.1f} demo tokens/call")
+
+if __name__ == '__main__':
+    main()
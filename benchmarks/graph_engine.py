@@ -0,0 +1,39 @@
+import argparse
+import time
+from diaspy.fakes import fake_responder
+from diaspy.graph import CallMemo
+from diaspy.usage import on_stage
+
+# Latency and agent calls per mode on the graph engine: sequential, speculative (nodes start before the nodes that
+# may make them unnecessary), and with a CallMemo answering a repeated query. FakeLM with a fixed per-call latency;
+# critic scores stay below every early exit so all rounds run.
+
+def measure(responder, mode, queries, **kwargs):
+    calls = []
+    started = time.perf_counter()
+    with on_stage(lambda agent, result, seconds: calls.append(agent)):
+        for query in queries:
+            responder(query, mode=mode, **kwargs)
+    return (time.perf_counter() - started) / len(queries), len(calls) / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--queries', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+    responder = fake_responder(latency=args.latency, score='0.5')
+    queries = [f"Is progress inevitable? ({i})" for i in range(args.queries)]
+    print(f"{'mode':<8} {'variant':<12} {'latency s':>10} {'calls':>6}")
+    for mode in ('binary', 'debate', 'experts'):
+        for variant in ('sequential', 'speculative', 'memo'):
+            responder.speculate = variant == 'speculative'
+            responder.memo = CallMemo() if variant == 'memo' else None
+            if variant == 'memo':
+                # Warm the memo, then repeat the same queries
+                measure(responder, mode, queries, max_rounds=args.rounds)
+            latency, calls = measure(responder, mode, queries, max_rounds=args.rounds)
+            print(f"{mode:<8} {variant:<12} {latency:10.3f} {calls:6.1f}")
+
+if __name__ == '__main__':
+    main()
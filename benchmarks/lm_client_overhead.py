@@ -0,0 +1,43 @@
+import argparse
+import time
+import warnings
+import dspy
+from diaspy.fakes import FakeOpenAIServer
+from diaspy.lm import make_lm
+from diaspy.parallel import parallel_map
+
+# Per-call client overhead against a local OpenAI-compatible mock server that answers instantly, so the time
+# measured is request building, connection handling and response parsing. Plain HTTP on loopback: a real
+# provider adds a TLS handshake to every new connection, which make_lm's shared client pays once.
+
+MODEL = 'openai/fake-model'
+
+def measure(server, calls, threads, lm_for_call):
+    before = server.connections
+    started = time.perf_counter()
+    parallel_map(lambda i: lm_for_call(i)(f'Question {i}'), range(calls), max_workers=threads)
+    seconds = time.perf_counter() - started
+    return seconds / calls * 1000, server.connections - before
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    args = parser.parse_args()
+    warnings.simplefilter('ignore', DeprecationWarning)
+    with FakeOpenAIServer() as server:
+        default = dspy.LM(MODEL, api_key='test', api_base=server.url, cache=False)
+        clients = {
+            'fresh dspy.LM per call': lambda i: dspy.LM(MODEL, api_key='test', api_base=server.url, cache=False),
+            'one dspy.LM': lambda i: default,
+            'make_lm copy per call': lambda i: make_lm(MODEL, api_key='test', api_base=server.url),
+        }
+        for lm in (default, make_lm(MODEL, api_key='test', api_base=server.url)):
+            lm('warm up')
+        for threads in args.threads:
+            for name, lm_for_call in clients.items():
+                ms, connections = measure(server, args.calls, threads, lm_for_call)
+                print(f"{name:<24} {threads:>2} threads: {ms:6.2f} ms/call, {connections:4d} new connections")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from diaspy.responders import DialecticResponder
+
+# Per-request resident memory of DialecticResponder results under each retention policy. Every policy runs in
+# its own interpreter; all predictions are held at once, as a server with that many requests in flight would.
+TURN_CHARS = 2000
+
+def fake_agents():
+    counter = itertools.count()
+
+    def text(*args, **kwargs):
+        n = next(counter)
+        return f"{n} " + ('lorem ipsum dolor sit amet ' * (TURN_CHARS // 27))
+
+    return {
+        'thesis': text, 'antithesis': text, 'synthesis': text, 'pro_debate': text, 'con_debate': text, 'expert': text,
+        'critic': lambda *args, **kwargs: (text(), 0.5),
+    }
+
+def rss_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+def run(retain, requests, mode):
+    responder = DialecticResponder(**fake_agents(), retain=retain)
+    kwargs = {'max_rounds': 8} if mode == 'debate' else {'domains': [f'domain{i}' for i in range(12)]}
+    before = rss_bytes()
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        predictions = list(pool.map(lambda i: responder(f'query {i}', mode=mode, **kwargs), range(requests)))
+    after = rss_bytes()
+    return {'retain': retain, 'mode': mode, 'requests': len(predictions), 'kib_per_request': (after - before) / len(predictions) / 1024}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--mode', default='debate', choices=['debate', 'experts'])
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(run(args.child, args.requests, args.mode)))
+        return
+    for retain in ('all', 'spill', 'final'):
+        out = subprocess.run([sys.executable, __file__, '--child', retain, '--requests', str(args.requests), '--mode', args.mode],
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out)
+        print(f"{result['mode']:<8} retain={result['retain']:<6} {result['requests']} concurrent requests: {result['kib_per_request']:8.1f} KiB/request")
+
+if __name__ == '__main__':
+    main()
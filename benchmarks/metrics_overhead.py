@@ -0,0 +1,40 @@
+import argparse
+import time
+import timeit
+from diaspy import metrics
+from diaspy.fakes import fake_responder
+
+# Per-run cost of the metrics registry on the hot path: zero-latency FakeLM runs with metrics enabled and disabled,
+# interleaved to even out warm-up, plus the cost of a single update and of one Prometheus scrape.
+
+def timed(responder, queries, mode):
+    started = time.perf_counter()
+    for i in range(queries):
+        responder(f"Is progress inevitable? ({i})", mode=mode)
+    return (time.perf_counter() - started) / queries
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--mode', default='binary')
+    args = parser.parse_args()
+    responder = fake_responder()
+    timed(responder, 5, args.mode)
+    enabled, disabled = [], []
+    for _ in range(args.repeats):
+        metrics.registry.enabled = True
+        enabled.append(timed(responder, args.queries, args.mode))
+        metrics.registry.enabled = False
+        disabled.append(timed(responder, args.queries, args.mode))
+    metrics.registry.enabled = True
+    on, off = min(enabled), min(disabled)
+    print(f"{args.mode}: {off * 1e3:.2f} ms/run without metrics, {on * 1e3:.2f} ms/run with ({(on - off) / off:+.1%})")
+    per_update = timeit.timeit(lambda: metrics.agent_seconds.observe(0.3, 'thesis'), number=100000) / 100000
+    print(f"one histogram update: {per_update * 1e6:.2f} us")
+    started = time.perf_counter()
+    text = metrics.registry.prometheus()
+    print(f"scrape: {(time.perf_counter() - started) * 1e3:.2f} ms, {len(text.splitlines())} lines")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+import argparse
+import time
+from diaspy.fakes import fake_responder
+from diaspy.scheduler import PipelineScheduler
+
+# LM utilization and throughput of the stage-interleaving scheduler vs. the naive per-query loop, against a
+# fake LM with fixed network-like latency. Utilization is mean requests in flight over the in-flight target.
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=32)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per LM call')
+    parser.add_argument('--in-flight', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--mode', default='binary')
+    args = parser.parse_args()
+    queries = [f'Query {i}: is progress inevitable?' for i in range(args.queries)]
+    responder = fake_responder(latency=args.latency)
+
+    started = time.perf_counter()
+    for query in queries:
+        responder(query, mode=args.mode)
+    naive = time.perf_counter() - started
+    print(f"{'naive loop':<22} {args.queries / naive:7.2f} dialectics/s  utilization {'1 request':>12}")
+
+    for in_flight in args.in_flight:
+        # One query at a time through the scheduler is the naive loop with its utilization measured
+        for label, max_queries in (('sequential', 1), ('pipelined', None)):
+            scheduler = PipelineScheduler(responder, max_in_flight=in_flight, max_queries=max_queries)
+            scheduler.run(queries, mode=args.mode)
+            stats = scheduler.stats()
+            print(f"{label + f' x{in_flight}':<22} {stats['throughput']:7.2f} dialectics/s  utilization {stats['utilization']:11.0%}"
+                  f"  ({stats['mean_in_flight']:.1f} in flight, {stats['tasks']} calls)")
+
+if __name__ == '__main__':
+    main()
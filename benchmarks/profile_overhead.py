@@ -0,0 +1,43 @@
+import argparse
+import dspy
+from diaspy.agents import AGENT_CLASSES
+from diaspy.datasets import index_by_agent
+from diaspy.fakes import FakeLM
+from diaspy.profiling import StackSampler, cprofile, profile_phases
+from diaspy.responders import DialecticResponder
+from diaspy.utils import trainset
+
+# Where an agent call's time goes when the LM itself costs nothing: a zero-latency fake LM leaves only diaspy/DSPy
+# overhead (prompt formatting with demos, parsing, module dispatch). --demos attaches labeled demos without any LM
+# calls, to show how formatting scales with compiled prompts.
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--mode', default='binary')
+    parser.add_argument('--demos', type=int, default=4, help='labeled demos per agent (0 for bare agents)')
+    parser.add_argument('--cprofile', metavar='FILE', help='dump a pstats profile of the run')
+    parser.add_argument('--folded', metavar='FILE', help='dump sampled stacks in py-spy raw/folded format')
+    args = parser.parse_args()
+    dspy.settings.configure(lm=FakeLM())
+    examples = index_by_agent(trainset)
+    agents = {}
+    for key, agent_class in AGENT_CLASSES.items():
+        agent = agent_class()
+        if args.demos and examples.get(key):
+            agent = dspy.LabeledFewShot(k=args.demos).compile(agent, trainset=examples[key])
+        agents[key] = agent
+    responder = DialecticResponder(**agents)
+    queries = [f'Query {i}: is progress inevitable?' for i in range(args.queries)]
+    responder(queries[0], mode=args.mode)  # warm up imports and caches outside the measurement
+
+    sampler = StackSampler()
+    with profile_phases() as profiler, cprofile(args.cprofile), sampler:
+        for query in queries:
+            responder(query, mode=args.mode)
+    print(profiler.report())
+    if args.folded:
+        sampler.dump(args.folded)
+
+if __name__ == '__main__':
+    main()
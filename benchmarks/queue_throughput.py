@@ -0,0 +1,38 @@
+import argparse
+import functools
+import os
+import tempfile
+import time
+from diaspy.fakes import fake_responder
+from diaspy.jobs import SQLiteJobQueue, run_workers
+
+# Drains a batch of dialectic jobs with several worker processes on one machine and reports throughput and lag
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.02, help='fake LM seconds per call')
+    parser.add_argument('--mode', default='binary')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.db')
+        queue = SQLiteJobQueue(path)
+        for i in range(args.jobs):
+            queue.enqueue(f'Query {i}: what is justice?', args.mode)
+        started = time.perf_counter()
+        workers = run_workers(path, functools.partial(fake_responder, latency=args.latency), processes=args.workers, idle_timeout=2.0)
+        while queue.metrics()['done'] < args.jobs and any(worker.is_alive() for worker in workers):
+            time.sleep(1.0)
+            metrics = queue.metrics(window=5)
+            print(f"t={time.perf_counter() - started:5.1f}s done={metrics['done']:>5} pending={metrics['pending']:>5} "
+                  f"throughput={metrics['throughput']:6.1f} jobs/s lag={metrics['lag']:5.1f}s")
+        elapsed = time.perf_counter() - started
+        for worker in workers:
+            worker.join()
+        metrics = queue.metrics()
+        print(f"{metrics['done']} jobs in {elapsed:.1f}s with {args.workers} workers: {metrics['done'] / elapsed:.1f} jobs/s, "
+              f"mean job latency {metrics['latency']:.2f}s, redelivered {metrics['redelivered']}, failed {metrics['failed']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import time
+import dspy
+from dspy.teleprompt import BootstrapFewShot
+from diaspy.fakes import FakeLM
+from diaspy.training import CachedBootstrapFewShot, TeacherCache, timing_report
+from diaspy.utils import compile_agents, philosophical_metric, trainset
+
+# Compares serial BootstrapFewShot, a cold cached compile, and an incremental recompile after editing two examples,
+# against a fake LM with a fixed per-call latency. These agents have at most 16 examples, so every example is one of
+# its teacher's labeled demos and an edit re-runs the teacher on all of that agent's examples; other agents all hit.
+LATENCY = 0.05
+
+def main():
+    dspy.settings.configure(lm=FakeLM(latency=LATENCY))
+
+    started = time.perf_counter()
+    compile_agents(trainset, BootstrapFewShot(metric=philosophical_metric))
+    print(f"BootstrapFewShot (serial): {time.perf_counter() - started:.3f}s")
+
+    cache = TeacherCache(':memory:')
+    full = CachedBootstrapFewShot(metric=philosophical_metric, cache=cache)
+    compile_agents(trainset, full)
+
+    edited = list(trainset)
+    edited[0] = edited[0].copy(thesis="Sartre holds that existence precedes essence, so meaning is made, not found.")
+    edited[-1] = edited[-1].copy(opinion="Philosophers read gravity as a figure for the necessity binding all things.")
+    incremental = CachedBootstrapFewShot(metric=philosophical_metric, cache=cache)
+    compile_agents(edited, incremental)
+
+    print(timing_report(full.reports, incremental.reports))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import json
+import random
+from diaspy.fakes import fake_responder
+from diaspy.retrieval import RetrievalIndex
+
+# Replays a query log with and without the retrieval index and reports hit rate and LLM calls avoided.
+# Without --log, synthesizes a production-like log: Zipf-popular topics, each asked in several phrasings.
+# The default lexical index only matches queries with the same content words, so here it reuses repeats, not paraphrases.
+
+TOPICS = ['artificial intelligence', 'social media', 'remote work', 'nuclear power', 'space exploration', 'universal basic income',
+          'genetic engineering', 'cryptocurrency', 'standardized testing', 'urbanization', 'video games', 'globalization']
+PHRASINGS = ['Is {} beneficial for society?', 'Is {} good for society?', 'Is {} beneficial to humanity?', 'Does {} do more good than harm?',
+             'Is {} beneficial for society overall?', 'Is {} ultimately good for humanity?']
+
+def synthetic_log(n, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(TOPICS))]
+    return [{'query': rng.choice(PHRASINGS).format(rng.choices(TOPICS, weights)[0]), 'mode': rng.choice(['binary', 'experts'])}
+            for _ in range(n)]
+
+def load_log(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def replay(log, index=None, **thresholds):
+    responder = fake_responder()
+    responder.retrieval = index
+    responder.__dict__.update(thresholds)
+    calls = {'thesis': 0, 'expert': 0}
+    for name in calls:
+        agent = getattr(responder, f'{name}_agent')
+
+        def counted(*args, _agent=agent, _name=name, **kwargs):
+            calls[_name] += 1
+            return _agent(*args, **kwargs)
+
+        setattr(responder, f'{name}_agent', counted)
+    for record in log:
+        responder(record['query'], mode=record.get('mode', 'binary'), max_iterations=0)
+    return calls
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--log', help='JSONL of {"query": ..., "mode": ...}; synthesized when omitted')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.95, 0.85, 0.75, 0.65])
+    args = parser.parse_args()
+    log = load_log(args.log) if args.log else synthetic_log(args.queries)
+    baseline = replay(log)
+    total = sum(baseline.values())
+    print(f"{len(log)} queries, {len({record['query'] for record in log})} distinct; "
+          f"baseline {baseline['thesis']} thesis + {baseline['expert']} expert calls")
+    for threshold in args.thresholds:
+        index = RetrievalIndex()
+        calls = replay(log, index, reuse_threshold=threshold, seed_threshold=threshold - 0.15)
+        stats = index.stats()
+        avoided = total - sum(calls.values())
+        print(f"reuse >= {threshold:.2f}: hit rate {stats['hit_rate']:6.1%}, {stats['seeded']:4d} seeded, "
+              f"{avoided:4d} of {total} thesis/expert calls avoided ({avoided / total:.1%})")
+
+if __name__ == '__main__':
+    main()
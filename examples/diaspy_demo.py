@@ -22,6 +22,7 @@ Let's explore the three main modes: `binary`, `debate`, and `experts`.
 # Import necessary modules
 import os
 import dspy
+from diaspy.lm import make_lm
 from diaspy.responders import DialecticResponder
 from diaspy.utils import compile_agents, trainset
 from diaspy.agents import ThesisAgent, AntithesisAgent, SynthesisAgent, CriticAgent
@@ -33,7 +34,7 @@ if not api_key:
     print("export XAI_API_KEY='your-api-key-here'")
 else:
     print("API key found, setting up DSPy with Grok-3-mini...")
-    grok = dspy.LM(model="xai/grok-3-mini", api_key=api_key, cache=False)
+    grok = make_lm("xai/grok-3-mini", api_key=api_key)
     dspy.settings.configure(lm=grok)
     print("✓ DSPy configured successfully")
 
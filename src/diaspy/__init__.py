@@ -1,6 +1,28 @@
 __version__ = '0.1.0'
 
 from . import signatures
+from . import scoring
+from . import usage
+from . import metrics
+from . import parallel
+from . import graph
+from . import checkpoints
+from . import lm
+from . import deadlines
+from . import similarity
 from . import agents
+from . import datasets
+from . import store
+from . import retrieval
+from . import planner
+from . import profiling
+from . import pruning
+from . import records
+from . import qc
+from . import scheduler
+from . import modes
 from . import responders
+from . import training
 from . import utils
+from . import backends
+from . import jobs
@@ -3,11 +3,14 @@ from .signatures import (
     ThesisSignature,
     AntithesisSignature,
     SynthesisSignature,
+    RevisionSignature,
     CriticSignature,
     ProArgumentSignature,
     ConArgumentSignature,
     ExpertOpinionSignature,
 )
+from .metrics import critic_scores
+from .scoring import critic_score_stats, predict_score
 
 class ThesisAgent(dspy.Module):
     def __init__(self):
@@ -33,27 +36,24 @@ class SynthesisAgent(dspy.Module):
     def forward(self, query, thesis, antithesis):
         return self.generate(query=query, thesis=thesis, antithesis=antithesis).synthesis
 
-class CriticAgent(dspy.Module):
+class RevisionAgent(dspy.Module):
     def __init__(self):
         super().__init__()
+        self.generate = dspy.ChainOfThought(RevisionSignature)
+
+    def forward(self, query, previous_synthesis, changes):
+        return self.generate(query=query, previous_synthesis=previous_synthesis, changes=changes).synthesis
+
+class CriticAgent(dspy.Module):
+    def __init__(self, retries=1):
+        super().__init__()
+        self.retries = retries
         self.generate = dspy.ChainOfThought(CriticSignature)
 
     def forward(self, query, thesis, antithesis, synthesis):
-        prediction = self.generate(query=query, thesis=thesis, antithesis=antithesis, synthesis=synthesis)
-        try:
-            if isinstance(prediction.score, float):
-                score = prediction.score
-            else:
-                score_str = str(prediction.score).strip()
-                if '/' in score_str:
-                    num, den = map(float, score_str.split('/'))
-                    score = num / den
-                else:
-                    score = float(score_str)
-            # Clamp score to [0.0, 1.0]
-            score = max(0.0, min(1.0, score))
-        except (ValueError, AttributeError):
-            score = 0.5
+        prediction, score = predict_score(self.generate, retries=self.retries, stats=critic_score_stats, query=query, thesis=thesis,
+                                          antithesis=antithesis, synthesis=synthesis)
+        critic_scores.observe(score)
         return prediction.critique, score
 
 class ProDebateAgent(dspy.Module):
@@ -79,3 +79,14 @@ class ExpertAgent(dspy.Module):
 
     def forward(self, query, expertise_domain, context=''):
         return self.generate(query=query, expertise_domain=expertise_domain, context=context).opinion
+
+# Agent classes by the keyword DialecticResponder (and compile_agents) use for them
+AGENT_CLASSES = {
+    'thesis': ThesisAgent,
+    'antithesis': AntithesisAgent,
+    'synthesis': SynthesisAgent,
+    'critic': CriticAgent,
+    'pro_debate': ProDebateAgent,
+    'con_debate': ConDebateAgent,
+    'expert': ExpertAgent,
+}
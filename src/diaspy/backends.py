@@ -0,0 +1,99 @@
+import json
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import dspy
+from .agents import AGENT_CLASSES
+from .responders import DialecticResponder
+
+def save_artifact(agents, path):
+    # agents: the dict compile_agents returns (or any subset of AGENT_CLASSES keys)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({key: agent.dump_state() for key, agent in agents.items()}, f)
+
+def load_artifact(path):
+    with open(path, encoding='utf-8') as f:
+        states = json.load(f)
+    agents = {}
+    for key, state in states.items():
+        agent = AGENT_CLASSES[key]()
+        agent.load_state(state)
+        agents[key] = agent
+    return agents
+
+def _then(future, fn):
+    result = Future()
+
+    def done(source):
+        if source.cancelled():
+            result.cancel()
+        elif source.exception() is not None:
+            result.set_exception(source.exception())
+        else:
+            try:
+                value = fn(source.result())
+            except Exception as e:
+                # Otherwise the chained future never resolves and its waiters hang
+                result.set_exception(e)
+            else:
+                result.set_result(value)
+
+    future.add_done_callback(done)
+    return result
+
+class ThreadBackend:
+    def __init__(self, responder, max_workers=None):
+        self.responder = responder
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(self, query, **kwargs):
+        return self._pool.submit(self.responder, query, **kwargs)
+
+    def map(self, queries, **kwargs):
+        return [future.result() for future in [self.submit(query, **kwargs) for query in queries]]
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+# Set once per worker process by _init_worker; compiled agents stay resident for the worker's lifetime
+_worker_responder = None
+
+def _init_worker(artifact_path, lm_factory, responder_kwargs):
+    global _worker_responder
+    dspy.settings.configure(lm=lm_factory())
+    _worker_responder = DialecticResponder(**load_artifact(artifact_path), **responder_kwargs)
+
+def _run_dialectic(query, kwargs):
+    # Only a plain dict of strings crosses the process boundary
+    return _worker_responder(query, **kwargs).toDict()
+
+def _run_agent(name, args, kwargs):
+    return getattr(_worker_responder, f'{name}_agent')(*args, **kwargs)
+
+class ProcessBackend:
+    # lm_factory must be picklable (a module-level function or functools.partial); each worker builds its own LM
+    def __init__(self, artifact_path, lm_factory, max_workers=None, responder_kwargs=None, mp_context='spawn'):
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context(mp_context),
+            initializer=_init_worker,
+            initargs=(artifact_path, lm_factory, responder_kwargs or {}),
+        )
+
+    def submit(self, query, **kwargs):
+        return _then(self._pool.submit(_run_dialectic, query, kwargs), lambda result: dspy.Prediction(**result))
+
+    def map(self, queries, **kwargs):
+        return [future.result() for future in [self.submit(query, **kwargs) for query in queries]]
+
+    def agent(self, name):
+        # A callable that runs one agent call in a worker, so a local DialecticResponder can orchestrate
+        # in threads while the CPU-bound model work happens in the pool
+        def call(*args, **kwargs):
+            return self._pool.submit(_run_agent, name, args, kwargs).result()
+        return call
+
+    def agents(self):
+        return {name: self.agent(name) for name in AGENT_CLASSES}
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
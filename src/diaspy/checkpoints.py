@@ -0,0 +1,183 @@
+import abc
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from .graph import call_key
+
+class RunInProgress(Exception):
+    pass
+
+class RunCheckpoint:
+    # One run's agent calls as they complete. Everything a mode builds (thesis, debate history, opinions, critiques,
+    # the iteration reached) follows from its agent outputs, so a retry that replays the recorded outputs retraces
+    # the failed run to where it stopped and only then calls the LM. The n-th identical call (same agent, inputs and
+    # sampling settings) replays the n-th recorded output, which keeps concurrent calls independent of their order.
+    def __init__(self, store, run_id, recorded):
+        self.store = store
+        self.run_id = run_id
+        self.recorded = recorded
+        self.replayed = 0
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def key(self, agent, args, kwargs):
+        base = json.dumps(call_key(agent, args, kwargs), default=str)
+        with self._lock:
+            occurrence = self._seen.get(base, 0)
+            self._seen[base] = occurrence + 1
+        return hashlib.sha256(f"{base}#{occurrence}".encode()).hexdigest()
+
+    def replay(self, key):
+        result = self.recorded.get(key)
+        if result is not None:
+            with self._lock:
+                self.replayed += 1
+        return result
+
+    def record(self, key, agent, result):
+        self.store.record(self.run_id, key, agent, result)
+
+class CheckpointStore(abc.ABC):
+    @abc.abstractmethod
+    def open(self, run_id, query, mode, params):
+        pass
+
+    @abc.abstractmethod
+    def record(self, run_id, key, agent, result):
+        pass
+
+    @abc.abstractmethod
+    def fail(self, run_id, error):
+        pass
+
+    @abc.abstractmethod
+    def clear(self, run_id):
+        pass
+
+    @abc.abstractmethod
+    def run(self, run_id):
+        pass
+
+    @abc.abstractmethod
+    def runs(self):
+        pass
+
+    @abc.abstractmethod
+    def prune(self, older_than):
+        pass
+
+class SQLiteCheckpointStore(CheckpointStore):
+    # Unfinished runs and their completed agent calls. A run's rows are deleted once it completes; failed and
+    # truncated runs are pruned once inactive for `ttl` seconds (None keeps them until prune() or clear()). A run
+    # that recorded a call within the last `lease` seconds is still in progress and cannot be opened again.
+    def __init__(self, path='diaspy_checkpoints.db', ttl=7 * 24 * 3600, lease=300, timeout=30):
+        self.path = path
+        self.ttl = ttl
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'running',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                started REAL NOT NULL,
+                updated REAL NOT NULL,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS runs_updated ON runs (updated);
+            CREATE TABLE IF NOT EXISTS calls (
+                run_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                agent TEXT NOT NULL,
+                written REAL NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (run_id, key)
+            );
+        """)
+
+    def open(self, run_id, query, mode, params):
+        # Starts run_id, or resumes it if an earlier attempt failed or was truncated
+        if self.ttl is not None:
+            self.prune(self.ttl)
+        now, params = time.time(), json.dumps(params, sort_keys=True, default=str)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT query, mode, params, status, updated FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+                if row is not None and row[:3] != (query, mode, params):
+                    raise ValueError(f"Run {run_id} was started with a different query, mode or parameters")
+                if row is not None and row[3] == 'running' and now - row[4] < self.lease:
+                    raise RunInProgress(f"Run {run_id} is already in progress")
+                self._conn.execute("""
+                    INSERT INTO runs (run_id, query, mode, params, attempts, started, updated) VALUES (?, ?, ?, ?, 1, ?, ?)
+                    ON CONFLICT (run_id) DO UPDATE SET status = 'running', attempts = attempts + 1, updated = excluded.updated, error = NULL""",
+                                   (run_id, query, mode, params, now, now))
+                rows = self._conn.execute("SELECT key, result FROM calls WHERE run_id = ?", (run_id,)).fetchall()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return RunCheckpoint(self, run_id, {key: _decode(result) for key, result in rows})
+
+    def record(self, run_id, key, agent, result):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO calls (run_id, key, agent, written, result) VALUES (?, ?, ?, ?, ?)",
+                               (run_id, key, agent, now, _encode(result)))
+            self._conn.execute("UPDATE runs SET updated = ? WHERE run_id = ?", (now, run_id))
+
+    def fail(self, run_id, error):
+        # Leaves the run resumable; error is an exception or a reason such as a missed deadline
+        error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+        with self._lock:
+            self._conn.execute("UPDATE runs SET status = 'failed', error = ?, updated = ? WHERE run_id = ?", (error, time.time(), run_id))
+
+    def clear(self, run_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM calls WHERE run_id = ?", (run_id,))
+            self._conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    def run(self, run_id):
+        return next((run for run in self._runs("WHERE runs.run_id = ?", (run_id,))), None)
+
+    def runs(self):
+        # Unfinished runs, most recently active first, with how many agent calls a resume would replay
+        return self._runs()
+
+    def _runs(self, where='', args=()):
+        with self._lock:
+            rows = self._conn.execute(f"""
+                SELECT runs.run_id, query, mode, params, status, attempts, started, updated, error, COUNT(calls.key) FROM runs
+                LEFT JOIN calls ON calls.run_id = runs.run_id {where} GROUP BY runs.run_id ORDER BY updated DESC""", args).fetchall()
+        return [
+            {'run_id': run_id, 'query': query, 'mode': mode, 'params': json.loads(params), 'status': status, 'attempts': attempts,
+             'started': started, 'updated': updated, 'error': error, 'calls': calls}
+            for run_id, query, mode, params, status, attempts, started, updated, error, calls in rows
+        ]
+
+    def prune(self, older_than):
+        # Deletes runs inactive for more than older_than seconds; returns how many
+        cutoff = time.time() - older_than
+        with self._lock:
+            self._conn.execute("DELETE FROM calls WHERE run_id IN (SELECT run_id FROM runs WHERE updated < ?)", (cutoff,))
+            return self._conn.execute("DELETE FROM runs WHERE updated < ?", (cutoff,)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def _encode(result):
+    # JSON has no tuples, so the critic's (critique, score) is tagged to come back as a tuple
+    return json.dumps({'tuple': list(result)} if isinstance(result, tuple) else {'value': result}, default=str)
+
+def _decode(result):
+    value = json.loads(result)
+    return tuple(value['tuple']) if 'tuple' in value else value['value']
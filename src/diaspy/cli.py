@@ -1,42 +1,207 @@
+import argparse
+import contextvars
+import hashlib
+import json
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import dspy
+from .agents import AGENT_CLASSES
+from .checkpoints import SQLiteCheckpointStore
+from .fakes import FakeLM
+from .lm import make_lm
+from .metrics import serve_metrics
+from .parallel import parallel_map
 from .responders import DialecticResponder
+from .usage import on_stage
 from .utils import compile_agents, trainset
 
-def main():
+MODES = ('binary', 'debate', 'experts', 'tournament', 'auto')
+COMPARE_MODES = ('binary', 'debate', 'experts')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='diaspy', description="Dialectical LLM workflows")
+    parser.add_argument('--mode', choices=MODES, help="run every query in this mode instead of asking (default: auto)")
+    parser.add_argument('--compare', action='store_true', help="run binary, debate and experts concurrently for each query")
+    parser.add_argument('--batch', metavar='FILE', help="read queries (text lines or JSONL with query/mode) from FILE, or - for stdin")
+    parser.add_argument('--output', metavar='FILE', help="batch results as JSONL (default: stdout)")
+    parser.add_argument('--concurrency', type=int, default=4, help="batch runs in flight at once")
+    parser.add_argument('--deadline', type=float, help="seconds per run before returning the best answer so far")
+    parser.add_argument('--no-compile', action='store_true', help="skip few-shot compilation and use the bare agents")
+    parser.add_argument('--fake', action='store_true', help="offline dry run against a deterministic fake LM")
+    parser.add_argument('--fake-latency', type=float, default=0.0, help="seconds per fake LM call")
+    parser.add_argument('--checkpoints', metavar='FILE', help="checkpoint agent calls to FILE so a re-run batch resumes its failed runs")
+    parser.add_argument('--metrics-port', type=int, help="serve Prometheus metrics on this port at /metrics")
+    return parser.parse_args(argv)
+
+def build_responder(args):
+    kwargs = {'checkpoints': SQLiteCheckpointStore(args.checkpoints)} if args.checkpoints else {}
+    if args.fake:
+        dspy.settings.configure(lm=FakeLM(latency=args.fake_latency))
+        return DialecticResponder(**{key: agent_class() for key, agent_class in AGENT_CLASSES.items()}, **kwargs)
     api_key = os.environ.get('XAI_API_KEY')
     if not api_key:
         raise ValueError("XAI_API_KEY environment variable is not set.")
-    grok = dspy.LM(model="xai/grok-3-mini", api_key=api_key, cache=False)
+    grok = make_lm("xai/grok-3-mini", api_key=api_key)
     dspy.settings.configure(lm=grok)
-    compiled_agents = compile_agents(trainset)
-    responder = DialecticResponder(**compiled_agents)
+    if args.no_compile:
+        return DialecticResponder(**{key: agent_class() for key, agent_class in AGENT_CLASSES.items()}, **kwargs)
+    return DialecticResponder(**compile_agents(trainset), **kwargs)
+
+def format_stage(agent, result):
+    if agent == 'critic':
+        critique, score = result
+        return f"Critique ({score:.2f}): {critique}"
+    return f"{agent.replace('_', ' ').capitalize()}: {result}"
+
+def run_mode(responder, query, mode, emit=None, **kwargs):
+    # Runs one mode, passing each agent call's output to emit(mode, agent, result) as it lands
+    stats = {'calls': 0, 'agents': {}}
+
+    def listener(agent, result, seconds):
+        stats['calls'] += 1
+        stats['agents'][agent] = stats['agents'].get(agent, 0) + 1
+        if emit is not None:
+            emit(mode, agent, result)
+
+    started = time.perf_counter()
+    prediction, error = None, None
+    with on_stage(listener):
+        try:
+            prediction = responder(query=query, mode=mode, **kwargs)
+        except Exception as e:
+            error = str(e)
+    stats['latency'] = time.perf_counter() - started
+    return {'mode': mode, 'prediction': prediction, 'error': error, 'stats': stats}
+
+def compare(responder, query, modes=COMPARE_MODES, out=None, **kwargs):
+    out = out or sys.stdout
+    lock = threading.Lock()
+
+    def emit(mode, agent, result):
+        with lock:
+            print(f"[{mode}] {format_stage(agent, result)}\n", file=out, flush=True)
+
+    runs = parallel_map(lambda mode: run_mode(responder, query, mode, emit, **kwargs), modes)
+    print(f"{'mode':<10} {'latency':>8} {'calls':>6}  synthesis", file=out)
+    for run in runs:
+        outcome = f"Error: {run['error']}" if run['error'] else run['prediction'].synthesis
+        print(f"{run['mode']:<10} {run['stats']['latency']:7.1f}s {run['stats']['calls']:>6}  {outcome}", file=out)
+    print(file=out)
+    return runs
+
+def read_queries(source):
+    f = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line) if line.startswith('{') else {'query': line}
+            yield record['query'], record.get('mode')
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def batch_run_id(index, query, mode):
+    # Stable per batch entry, so running the same batch again resumes the runs that failed from their checkpoints
+    return hashlib.sha256(f"{index}\n{mode}\n{query}".encode()).hexdigest()[:32]
+
+def run_batch(responder, source, modes, out, concurrency=4, **kwargs):
+    jobs = [(index, query, mode) for index, (query, own_mode) in enumerate(read_queries(source)) for mode in ([own_mode] if own_mode else modes)]
+    checkpointed = getattr(responder, 'checkpoints', None) is not None
+    summary = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(contextvars.copy_context().run, run_mode, responder, query, mode, None, **kwargs,
+                               **({'run_id': batch_run_id(index, query, mode)} if checkpointed else {})): (index, query)
+                   for index, query, mode in jobs}
+        # Written as runs finish rather than in input order, so output streams under load
+        for future in as_completed(futures):
+            index, query = futures[future]
+            run = future.result()
+            record = {'index': index, 'query': query, 'mode': run['mode'], 'latency': run['stats']['latency'], 'calls': run['stats']['calls']}
+            if run['error']:
+                record['error'] = run['error']
+            else:
+                record['result'] = run['prediction'].toDict()
+            out.write(json.dumps(record, default=str) + '\n')
+            out.flush()
+            totals = summary.setdefault(run['mode'], {'runs': 0, 'errors': 0, 'latency': 0.0, 'calls': 0})
+            totals['runs'] += 1
+            totals['errors'] += bool(run['error'])
+            totals['latency'] += run['stats']['latency']
+            totals['calls'] += run['stats']['calls']
+    return summary
+
+def print_summary(summary, out=None):
+    out = out or sys.stderr
+    for mode, totals in sorted(summary.items()):
+        print(f"{mode:<10} {totals['runs']:>5} runs, {totals['errors']} errors, {totals['latency'] / totals['runs']:6.2f}s mean latency, "
+              f"{totals['calls'] / totals['runs']:5.1f} calls/run", file=out)
+
+def print_prediction(mode, prediction):
+    if mode == 'auto':
+        mode = prediction.mode
+        predicted, actual = prediction.predicted_cost, prediction.actual_cost
+        print(f"Auto-selected mode: {mode} (predicted {predicted['calls']:.1f} calls / {predicted['latency']:.1f}s, "
+              f"actual {actual['calls']} calls / {actual['latency']:.1f}s)\n")
+    if mode == 'binary':
+        print(f"Thesis: {prediction.thesis}\n")
+        print(f"Antithesis: {prediction.antithesis}\n")
+        print(f"Synthesis: {prediction.synthesis}\n")
+        for i, crit in enumerate(prediction.critiques):
+            print(f"Critique {i+1}: {crit}\n")
+    elif mode == 'debate':
+        for arg in prediction.debate_history:
+            print(f"{arg}\n")
+        print(f"Final Synthesis: {prediction.synthesis}\n")
+    elif mode == 'experts':
+        for domain, op in prediction.expert_opinions.items():
+            print(f"{domain.capitalize()}: {op}\n")
+        print(f"Synthesis: {prediction.synthesis}\n")
+    elif mode == 'tournament':
+        for index, history in prediction.branch_histories.items():
+            print(f"Branch {index+1} (score {prediction.branch_scores[index]:.2f}):")
+            for arg in history:
+                print(f"{arg}\n")
+        print(f"Pruned branches: {[index+1 for index in prediction.pruned]}\n")
+        print(f"Final Synthesis: {prediction.synthesis}\n")
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    responder = build_responder(args)
+    kwargs = {'deadline': args.deadline} if args.deadline else {}
+    if args.batch:
+        modes = COMPARE_MODES if args.compare else [args.mode or 'auto']
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            print_summary(run_batch(responder, args.batch, modes, out, args.concurrency, **kwargs))
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        return
     print("Welcome to diaspy: Dialectical LLM Workflows!")
-    print("Modes: binary, debate, experts")
+    if args.compare:
+        print(f"Comparing modes: {', '.join(COMPARE_MODES)}")
+    else:
+        print("Modes: binary, debate, experts, tournament, auto (default)")
     print("Type 'exit' to quit.\n")
     while True:
         query = input("Enter your query: ").strip()
         if query.lower() == 'exit':
             break
-        mode = input("Enter mode (binary/debate/experts): ").strip().lower()
+        if args.compare:
+            compare(responder, query, **kwargs)
+            continue
+        mode = args.mode or input("Enter mode (binary/debate/experts/tournament/auto): ").strip().lower() or 'auto'
         try:
-            prediction = responder(query=query, mode=mode)
-            if mode == 'binary':
-                print(f"Thesis: {prediction.thesis}\n")
-                print(f"Antithesis: {prediction.antithesis}\n")
-                print(f"Synthesis: {prediction.synthesis}\n")
-                for i, crit in enumerate(prediction.critiques):
-                    print(f"Critique {i+1}: {crit}\n")
-            elif mode == 'debate':
-                for arg in prediction.debate_history:
-                    print(arg + "\n")
-                print(f"Final Synthesis: {prediction.synthesis}\n")
-            elif mode == 'experts':
-                for domain, op in prediction.expert_opinions.items():
-                    print(f"{domain.capitalize()}: {op}\n")
-                print(f"Synthesis: {prediction.synthesis}\n")
+            print_prediction(mode, responder(query=query, mode=mode, **kwargs))
         except Exception as e:
             print(f"Error: {str(e)}\n")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,63 @@
+import json
+import os
+import random
+import dspy
+
+DEFAULT_TRAINSET = os.path.join(os.path.dirname(__file__), 'data', 'trainset.jsonl')
+
+# Which agent an example trains, and the input fields that agent's signature reads (first match is the primary agent)
+AGENT_RULES = [
+    ('thesis', lambda ex: 'thesis' in ex and 'antithesis' not in ex, ('query',)),
+    ('antithesis', lambda ex: 'antithesis' in ex and 'synthesis' not in ex, ('query', 'thesis')),
+    ('synthesis', lambda ex: 'synthesis' in ex, ('query', 'thesis', 'antithesis')),
+    ('critic', lambda ex: 'synthesis' in ex, ('query', 'thesis', 'antithesis', 'synthesis')),
+    ('pro_debate', lambda ex: 'pro_argument' in ex, ('query', 'current_position', 'opposing_arguments')),
+    ('con_debate', lambda ex: 'con_argument' in ex, ('query', 'current_position', 'supporting_arguments')),
+    ('expert', lambda ex: 'opinion' in ex, ('query', 'expertise_domain', 'context')),
+]
+
+def iter_records(path, batch_size=1024):
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet trainsets requires pyarrow: pip install diaspy[parquet]") from e
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def load_trainset(path=DEFAULT_TRAINSET, shard=0, num_shards=1, sample=None, seed=0):
+    # Lazily yields dspy.Examples; `sample` keeps each record with that probability, sharding is by record position
+    rng = random.Random(seed)
+    for index, record in enumerate(iter_records(path)):
+        if index % num_shards != shard:
+            continue
+        if sample is not None and rng.random() >= sample:
+            continue
+        inputs = record.pop('inputs', None)
+        example = dspy.Example(**record)
+        if inputs is None:
+            inputs = next((fields for _, matches, fields in AGENT_RULES if matches(example)), ())
+        yield example.with_inputs(*inputs)
+
+def index_by_agent(examples, limit=None, seed=0):
+    # One pass over `examples`; with `limit`, reservoir-samples at most that many examples per agent
+    rng = random.Random(seed)
+    index = {agent: [] for agent, _, _ in AGENT_RULES}
+    seen = dict.fromkeys(index, 0)
+    for example in examples:
+        for agent, matches, fields in AGENT_RULES:
+            if not matches(example):
+                continue
+            seen[agent] += 1
+            if limit is None or len(index[agent]) < limit:
+                index[agent].append(example.with_inputs(*fields))
+            else:
+                slot = rng.randrange(seen[agent])
+                if slot < limit:
+                    index[agent][slot] = example.with_inputs(*fields)
+    return index
@@ -0,0 +1,68 @@
+import contextlib
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import dspy
+from .lm import with_timeout
+
+_current = contextvars.ContextVar('diaspy_deadline', default=None)
+
+class DeadlineExceeded(Exception):
+    pass
+
+class Deadline:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.expires - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def run(self, fn, *args, **kwargs):
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"deadline of {self.seconds:.2f}s exceeded")
+        # Propagate the remaining budget to the LM client as its request timeout, so an abandoned LM call ends soon
+        # after the caller stops waiting for it
+        lm = with_timeout(dspy.settings.lm, remaining)
+        future = Future()
+
+        def call():
+            try:
+                if lm is None:
+                    result = fn(*args, **kwargs)
+                else:
+                    with dspy.context(lm=lm):
+                        result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        # A thread per call rather than a fixed pool: a call that hangs past its timeout (a custom engine, a non-LM
+        # agent) holds only its own thread and never queues the calls after it
+        future.set_running_or_notify_cancel()
+        threading.Thread(target=contextvars.copy_context().run, args=(call,), name='diaspy-deadline', daemon=True).start()
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeout:
+            raise DeadlineExceeded(f"deadline of {self.seconds:.2f}s exceeded") from None
+
+def current_deadline():
+    return _current.get()
+
+@contextlib.contextmanager
+def deadline_scope(seconds):
+    if seconds is None:
+        yield None
+        return
+    deadline = Deadline(seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
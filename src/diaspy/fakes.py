@@ -0,0 +1,208 @@
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import dspy
+from dspy.lm15 import Message, Response, TextPart, Usage
+from .agents import AGENT_CLASSES
+from .responders import DialecticResponder
+
+_OUTPUT_FIELDS = re.compile(r"Your output fields are:\n(.*?)\nAll interactions", re.S)
+_FIELD_NAME = re.compile(r"^\d+\. `(\w+)`", re.M)
+_WORDS = ['logical', 'evidence', 'truth', 'balance', 'perspectives', 'reason', 'fact', 'both', 'conclusion', 'reconcile']
+
+class _FakeEngine:
+    # Custom dspy engine: complete(request) answers the request's signature without any network call
+    def __init__(self, latency=0.0, cpu_work=0, score='0.9', words=12):
+        self.latency = latency
+        self.cpu_work = cpu_work
+        self.score = score
+        self.words = words
+
+    def complete(self, request):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.cpu_work:
+            digest = b''
+            for _ in range(self.cpu_work):
+                digest = hashlib.sha256(digest).digest()
+        messages = [{'role': 'system', 'content': request.system or ''}] + [
+            {'role': message.role, 'content': ''.join(part.text for part in message.parts if isinstance(part, TextPart))}
+            for message in request.messages]
+        output = self.answer(messages)
+        tokens = len(messages[-1]['content']) // 4
+        return Response(id=None, model='fake', message=Message.assistant([TextPart(output)]), finish_reason='stop',
+                        usage=Usage(input_tokens=tokens, output_tokens=len(output) // 4, total_tokens=tokens + len(output) // 4))
+
+    def answer(self, messages):
+        prompt = messages[-1]['content']
+        match = _OUTPUT_FIELDS.search(messages[0]['content'])
+        fields = _FIELD_NAME.findall(match.group(1)) if match else ['answer']
+        seed = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        # The chat adapter's field markers, which is what dspy parses the reply with
+        return '\n\n'.join(f"[[ ## {field} ## ]]\n{self.score if field == 'score' else self._text(field, seed)}" for field in fields)
+
+    def _text(self, field, seed):
+        # Deterministic per prompt, so identical inputs give identical outputs and different inputs differ
+        words = [_WORDS[(seed >> (4 * i)) % len(_WORDS)] for i in range(self.words)]
+        return f"{field.replace('_', ' ').capitalize()} {seed % 10007}: " + ' '.join(words) + '.'
+
+class FakeLM(dspy.LM):
+    """Offline LM that answers any signature with deterministic filler text, for tests and benchmarks."""
+
+    def __init__(self, latency=0.0, cpu_work=0, score='0.9', words=12):
+        super().__init__('fake/dummy', temperature=0.0, max_tokens=1000, cache=False, engine=_FakeEngine(latency, cpu_work, score, words))
+        self.latency = latency
+        self.cpu_work = cpu_work
+        self.score = score
+        self.words = words
+
+def fake_responder(**lm_kwargs):
+    # Picklable responder factory for worker processes: uncompiled agents against a FakeLM
+    dspy.settings.configure(lm=FakeLM(**lm_kwargs))
+    return DialecticResponder(**{key: agent_class() for key, agent_class in AGENT_CLASSES.items()})
+
+def _text_content(content):
+    if isinstance(content, list):
+        return ''.join(part.get('text', '') for part in content if isinstance(part, dict))
+    return str(content or '')
+
+class FakeOpenAIServer:
+    """Local OpenAI-compatible /v1/chat/completions endpoint answering like FakeLM, for exercising real HTTP clients."""
+
+    # latency is the mean seconds per reply, drawn from `distribution`: 'constant', 'uniform' (0 to 2x mean),
+    # 'exponential' or 'lognormal' (with `sigma`, heavy-tailed like real LM APIs). A share error_rate of requests
+    # fails with a 500; above rate_limit requests per second (token bucket, burst of one second) they get a 429.
+    def __init__(self, latency=0.0, score='0.9', words=12, host='127.0.0.1', port=0, distribution='constant', sigma=0.5,
+                 error_rate=0.0, rate_limit=None, seed=0):
+        if distribution not in ('constant', 'uniform', 'exponential', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.latency = latency
+        self.distribution = distribution
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._rng = random.Random(seed)
+        self._tokens = rate_limit or 0.0
+        self._refilled = time.monotonic()
+        self._engine = _FakeEngine(score=score, words=words)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def sample_latency(self):
+        with self._lock:
+            if not self.latency or self.distribution == 'constant':
+                return self.latency
+            if self.distribution == 'uniform':
+                return self._rng.uniform(0, 2 * self.latency)
+            if self.distribution == 'exponential':
+                return self._rng.expovariate(1 / self.latency)
+            # Lognormal with the requested mean
+            return self._rng.lognormvariate(math.log(self.latency) - self.sigma ** 2 / 2, self.sigma)
+
+    def _admit(self):
+        # None to serve the request, else the (status, message) to fail it with
+        with self._lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+                self._refilled = now
+                if self._tokens < 1:
+                    self.rate_limited += 1
+                    return 429, 'Rate limit exceeded'
+                self._tokens -= 1
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.errors += 1
+                return 500, 'Injected server error'
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 so clients can keep connections alive between requests
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; without this, Nagle + delayed ACK add ~40ms per reply
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                server._count('connections')
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                server._count('requests')
+                failure = server._admit()
+                if failure is not None:
+                    status, message = failure
+                    headers = {'Retry-After': '1'} if status == 429 else {}
+                    self._reply(status, {'error': {'message': message, 'type': 'fake_error', 'code': status}}, headers)
+                    return
+                latency = server.sample_latency()
+                if latency:
+                    time.sleep(latency)
+                self._reply(200, server._completion(body))
+
+            def _reply(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _completion(self, body):
+        # Content may arrive as a list of typed parts; the answer only needs the text
+        messages = [{'role': message.get('role'), 'content': _text_content(message.get('content'))}
+                    for message in body.get('messages') or [{'role': 'user', 'content': ''}]]
+        output = self._engine.answer(messages)
+        prompt_tokens = sum(len(message['content']) for message in messages) // 4
+        return {
+            'id': f"chatcmpl-{self.requests}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': output}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': len(output) // 4, 'total_tokens': prompt_tokens + len(output) // 4},
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
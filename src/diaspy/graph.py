@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+import dspy
+from .parallel import parallel_map
+from .usage import counters
+
+class Node:
+    # One step of a dialectic graph: fn(run) returns the value stored as run[name]. `needs` names the nodes of the
+    # same graph whose values it reads; values set outside the graph (the query, an enclosing graph's nodes) need no
+    # declaration. `after` names nodes that must commit first only because they may stop the graph: a speculative
+    # run starts the node alongside them and drops its value if they do, so such nodes must not have side effects.
+    # stop(run), checked once the value is stored, ends the graph and any loop running it.
+    def __init__(self, name, fn, needs=(), after=(), stop=None):
+        self.name = name
+        self.fn = fn
+        self.needs = tuple(needs)
+        self.after = tuple(after)
+        self.stop = stop
+
+class Map(Node):
+    # Fans fn(run, item) out over items(run) concurrently; the value maps each item to its result
+    def __init__(self, name, fn, items, needs=(), after=(), stop=None):
+        super().__init__(name, self._map, needs, after, stop)
+        self.item_fn = fn
+        self.items = items
+
+    def _map(self, run):
+        items = list(self.items(run))
+        return dict(zip(items, parallel_map(lambda item: self.item_fn(run, item), items)))
+
+class Loop(Node):
+    # Runs `body` (a Graph) up to `times` times (an int or fn(run)), exposing the round as run['iteration']. Before
+    # each round the run's budget must cover `reserve` more sequential agent calls. The value is the rounds started.
+    def __init__(self, name, body, times, reserve=0, needs=(), after=(), stop=None):
+        super().__init__(name, self._iterate, needs, after, stop)
+        self.body = body
+        self.times = times
+        self.reserve = reserve
+
+    def _iterate(self, run):
+        times = self.times(run) if callable(self.times) else self.times
+        for iteration in range(times):
+            if self.reserve and run.over_budget(self.reserve):
+                return iteration
+            run['iteration'] = iteration
+            if self.body.run(run):
+                return iteration + 1
+        return times
+
+class Graph:
+    def __init__(self, *nodes):
+        self.nodes = nodes
+        self.names = {node.name for node in nodes}
+        self._order = {node.name: index for index, node in enumerate(nodes)}
+
+    def _ready(self, node, done, speculate):
+        waits = node.needs if speculate else node.needs + node.after
+        return all(name in done for name in waits if name in self.names)
+
+    def run(self, run):
+        # Waves: every node whose dependencies have committed runs concurrently with the others of its wave. Values
+        # commit in declaration order, each after its `after` nodes; a stop discards whatever has not committed.
+        # Returns True if a node stopped the graph.
+        pending, done, held = list(self.nodes), set(), []
+        while pending:
+            wave = [node for node in pending if self._ready(node, done, run.speculate)]
+            if not wave:
+                raise ValueError(f"Unsatisfiable dependencies: {[node.name for node in pending]}")
+            for node in wave:
+                pending.remove(node)
+            held.extend(zip(wave, parallel_map(lambda node: node.fn(run), wave)))
+            held.sort(key=lambda item: self._order[item[0].name])
+            for node, value in list(held):
+                if any(name in self.names and name not in done for name in node.after):
+                    continue
+                held.remove((node, value))
+                run[node.name] = value
+                done.add(node.name)
+                if node.stop is not None and node.stop(run):
+                    if held:
+                        counters.increment('speculative_discards', len(held))
+                    return True
+        return False
+
+class Run:
+    # Named values of one graph execution. Agent calls go through owner._call; loops ask budget(calls) whether the
+    # remaining time covers that many more calls; speculate lets nodes start before the nodes in their `after`.
+    def __init__(self, owner, state=None, budget=None, speculate=False):
+        self.owner = owner
+        self.state = dict(state or {})
+        self.budget = budget
+        self.speculate = speculate
+
+    def __getitem__(self, name):
+        return self.state[name]
+
+    def __setitem__(self, name, value):
+        self.state[name] = value
+
+    def get(self, name, default=None):
+        return self.state.get(name, default)
+
+    def update(self, **values):
+        self.state.update(values)
+
+    def call(self, agent, *args, **kwargs):
+        return self.owner._call(agent, *args, **kwargs)
+
+    def over_budget(self, calls):
+        return self.budget is not None and self.budget(calls)
+
+def call_key(agent, args, kwargs):
+    # Identifies an agent call by its inputs and the sampling settings in effect (model, temperature, rollout)
+    lm = dspy.settings.lm
+    sampling = None if lm is None else (getattr(lm, 'model', None), tuple(sorted((k, repr(v)) for k, v in getattr(lm, 'kwargs', {}).items())))
+    return agent, tuple(map(str, args)), tuple(sorted((k, str(v)) for k, v in kwargs.items())), sampling
+
+class CallMemo:
+    # LRU of agent outputs keyed by call_key, so re-samples never hit and an identical call in any run is made
+    # once. Cleared by replacing it whenever the agents change.
+    def __init__(self, size=4096):
+        self.size = size
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, agent, args, kwargs):
+        return call_key(agent, args, kwargs)
+
+    def get(self, key):
+        with self._lock:
+            value = self._values.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._values.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._values[key] = value
+            while len(self._values) > self.size:
+                self._values.popitem(last=False)
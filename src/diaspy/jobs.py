@@ -0,0 +1,244 @@
+import abc
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from .checkpoints import RunInProgress
+from .store import result_key
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    __slots__ = ('id', 'query', 'mode', 'params', 'attempts')
+
+    def __init__(self, id, query, mode, params, attempts):
+        self.id = id
+        self.query = query
+        self.mode = mode
+        self.params = params
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"Job({self.id[:12]}, {self.mode!r}, {self.query!r}, attempts={self.attempts})"
+
+class JobQueue(abc.ABC):
+    @abc.abstractmethod
+    def enqueue(self, query, mode='binary', params=None, job_id=None):
+        pass
+
+    @abc.abstractmethod
+    def claim(self, worker, lease=300, max_attempts=3):
+        pass
+
+    @abc.abstractmethod
+    def renew(self, job_id, worker, lease=300):
+        pass
+
+    @abc.abstractmethod
+    def release(self, job_id, worker, delay=0):
+        pass
+
+    @abc.abstractmethod
+    def complete(self, job_id, worker, result):
+        pass
+
+    @abc.abstractmethod
+    def fail(self, job_id, worker, error, max_attempts=3):
+        pass
+
+    @abc.abstractmethod
+    def result(self, job_id):
+        pass
+
+    @abc.abstractmethod
+    def metrics(self, window=60):
+        pass
+
+class SQLiteJobQueue(JobQueue):
+    # Safe to share between processes: each process opens its own connection to the same file
+    def __init__(self, path='diaspy_jobs.db', timeout=30):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_until REAL,
+                enqueued REAL NOT NULL,
+                finished REAL,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, enqueued);
+            CREATE TABLE IF NOT EXISTS results (
+                job_id TEXT PRIMARY KEY,
+                worker TEXT NOT NULL,
+                written REAL NOT NULL,
+                result TEXT NOT NULL
+            );
+        """)
+
+    def enqueue(self, query, mode='binary', params=None, job_id=None):
+        # Re-enqueueing the same (query, mode, params) is a no-op unless an explicit job_id differs
+        params = params or {}
+        job_id = job_id or result_key(query, mode, params, None)
+        self._conn.execute("INSERT OR IGNORE INTO jobs (id, query, mode, params, enqueued) VALUES (?, ?, ?, ?, ?)",
+                           (job_id, query, mode, json.dumps(params, sort_keys=True), time.time()))
+        return job_id
+
+    def claim(self, worker, lease=300, max_attempts=3):
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # A job whose lease expired on its last attempt lost every worker it reached; stop delivering it
+            self._conn.execute("""
+                UPDATE jobs SET status = 'failed', error = 'lease expired on the last attempt', lease_until = NULL
+                WHERE status = 'running' AND lease_until < ? AND attempts >= ?""", (now, max_attempts))
+            # Pending jobs, or running jobs whose worker let the lease expire (crashed or hung): at-least-once delivery
+            row = self._conn.execute("""
+                SELECT id, query, mode, params, attempts FROM jobs
+                WHERE status = 'pending' OR (status = 'running' AND lease_until < ?)
+                ORDER BY enqueued LIMIT 1""", (now,)).fetchone()
+            if row is None:
+                self._conn.execute("COMMIT")
+                return None
+            self._conn.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, lease_until = ? WHERE id = ?",
+                               (worker, now + lease, row[0]))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return Job(row[0], row[1], row[2], json.loads(row[3]), row[4] + 1)
+
+    def renew(self, job_id, worker, lease=300):
+        # Extends the lease of a job the worker still holds; False once it lost the lease
+        return self._conn.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running' AND worker = ?",
+                                  (time.time() + lease, job_id, worker)).rowcount == 1
+
+    def release(self, job_id, worker, delay=0):
+        # Hands the job back without counting the attempt; it is redelivered like an expired lease after `delay` seconds
+        self._conn.execute("""
+            UPDATE jobs SET attempts = attempts - 1, worker = NULL, lease_until = ?
+            WHERE id = ? AND status = 'running' AND worker = ?""", (time.time() + delay, job_id, worker))
+
+    def complete(self, job_id, worker, result):
+        # First write wins, so a job redelivered after a lease expiry cannot overwrite or duplicate its result
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("INSERT OR IGNORE INTO results (job_id, worker, written, result) VALUES (?, ?, ?, ?)",
+                               (job_id, worker, now, json.dumps(result, default=str)))
+            self._conn.execute("UPDATE jobs SET status = 'done', finished = COALESCE(finished, ?), error = NULL WHERE id = ?", (now, job_id))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def fail(self, job_id, worker, error, max_attempts=3):
+        # Only the worker holding the lease: a late failure from one whose lease expired leaves the redelivery running
+        self._conn.execute("""
+            UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?, lease_until = NULL
+            WHERE id = ? AND status = 'running' AND worker = ?""", (max_attempts, str(error), job_id, worker))
+
+    def result(self, job_id):
+        row = self._conn.execute("SELECT result FROM results WHERE job_id = ?", (job_id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def metrics(self, window=60):
+        now = time.time()
+        counts = dict.fromkeys(('pending', 'running', 'done', 'failed'), 0)
+        counts.update(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        recent = self._conn.execute("SELECT COUNT(*), AVG(finished - enqueued) FROM jobs WHERE status = 'done' AND finished >= ?",
+                                    (now - window,)).fetchone()
+        oldest = self._conn.execute("SELECT MIN(enqueued) FROM jobs WHERE status = 'pending'").fetchone()[0]
+        redelivered = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE attempts > 1").fetchone()[0]
+        return {
+            **counts,
+            'throughput': recent[0] / window,
+            'latency': recent[1] or 0.0,
+            'lag': now - oldest if oldest is not None else 0.0,
+            'redelivered': redelivered,
+        }
+
+    def close(self):
+        self._conn.close()
+
+class Worker:
+    def __init__(self, queue, responder, worker_id=None, lease=300, max_attempts=3):
+        self.queue = queue
+        self.responder = responder
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.processed = 0
+
+    def run_once(self):
+        job = self.queue.claim(self.worker_id, lease=self.lease, max_attempts=self.max_attempts)
+        if job is None:
+            return False
+        try:
+            # A redelivered job resumes from the responder's checkpoint of the failed attempt, if it keeps one
+            run = {'run_id': job.id} if getattr(self.responder, 'checkpoints', None) is not None else {}
+            with self._holding(job):
+                prediction = self.responder(job.query, mode=job.mode, **run, **job.params)
+        except RunInProgress as e:
+            # The previous attempt's worker may have died within the checkpoint's lease; try again later, not as a failure
+            logger.warning(f"{job} deferred on {self.worker_id}: {e}")
+            self.queue.release(job.id, self.worker_id, delay=self.lease)
+        except Exception as e:
+            logger.error(f"{job} failed on {self.worker_id}: {e}")
+            self.queue.fail(job.id, self.worker_id, e, max_attempts=self.max_attempts)
+        else:
+            self.queue.complete(job.id, self.worker_id, prediction.toDict())
+            self.processed += 1
+        return True
+
+    @contextlib.contextmanager
+    def _holding(self, job):
+        # Renews the lease while the job runs, so a run longer than the lease is only redelivered if this worker dies
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(self.lease / 3) and self.queue.renew(job.id, self.worker_id, self.lease):
+                pass
+
+        heartbeat = threading.Thread(target=renew, name='diaspy-lease', daemon=True)
+        heartbeat.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            heartbeat.join()
+
+    def run(self, max_jobs=None, idle_timeout=None, poll_interval=0.1):
+        idle_since = time.monotonic()
+        while max_jobs is None or self.processed < max_jobs:
+            if self.run_once():
+                idle_since = time.monotonic()
+            elif idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                break
+            else:
+                time.sleep(poll_interval)
+        return self.processed
+
+def _worker_main(path, responder_factory, run_kwargs):
+    Worker(SQLiteJobQueue(path), responder_factory()).run(**run_kwargs)
+
+def run_workers(path, responder_factory, processes=4, **run_kwargs):
+    # responder_factory must be picklable; each process builds its own responder and queue connection
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_worker_main, args=(path, responder_factory, run_kwargs), daemon=True) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    return workers
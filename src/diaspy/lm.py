@@ -0,0 +1,38 @@
+import math
+import threading
+import dspy
+import httpx
+
+DEFAULT_MODEL = 'xai/grok-3-mini'
+
+_lock = threading.Lock()
+_clients = {}
+
+def make_lm(model=DEFAULT_MODEL, api_key=None, api_base=None, timeout=60.0, connect_timeout=10.0, num_retries=3, cache=False,
+            **kwargs):
+    # Every LM with the same endpoint and client settings is a copy of one dspy.LM, so they share its connection pool
+    # and keep connections alive across calls. kwargs (temperature, max_tokens, ...) apply to the returned copy only.
+    # connect_timeout bounds TCP and TLS setup, timeout each read, write and wait for a pooled connection. The pool
+    # size (100 connections per client) and protocol (HTTP/1.1 keep-alive) are dspy's; it has no option for either.
+    key = (model, api_key, api_base, timeout, connect_timeout, num_retries, cache)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            endpoint = {name: value for name, value in (('api_key', api_key), ('api_base', api_base)) if value is not None}
+            client = _clients[key] = dspy.LM(model, timeout=httpx.Timeout(timeout, connect=connect_timeout), num_retries=num_retries,
+                                             cache=cache, **endpoint)
+    return client.copy(**kwargs)
+
+def with_timeout(lm, seconds):
+    # An LM that caps each request at roughly `seconds`. LMs on a custom engine (FakeLM, BaseLM subclasses) own their
+    # timeouts and are returned as-is. Others get a copy with the timeout rounded up to a power of two, because dspy
+    # keys its connection pools on the timeout and an exact remaining-time value would open a fresh pool per call.
+    if lm is None or not isinstance(getattr(lm, 'engine', None), str):
+        return lm
+    seconds = 2 ** math.ceil(math.log2(max(seconds, 1.0)))
+    connect = getattr(lm.kwargs.get('timeout'), 'connect', None)
+    return lm.copy(timeout=seconds if connect is None else httpx.Timeout(seconds, connect=min(connect, seconds)))
+
+def clear_clients():
+    with _lock:
+        _clients.clear()
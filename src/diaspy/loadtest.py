@@ -0,0 +1,129 @@
+import argparse
+import contextvars
+import json
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import dspy
+from .agents import AGENT_CLASSES
+from .fakes import FakeOpenAIServer
+from .lm import make_lm
+from .responders import DialecticResponder
+
+MODES = ('binary', 'debate', 'experts')
+
+def poisson_arrivals(rate, duration, seed=0):
+    # Open-loop arrival offsets in seconds: exponential gaps, independent of how fast requests complete
+    rng = random.Random(seed)
+    arrivals, t = [], rng.expovariate(rate)
+    while t < duration:
+        arrivals.append(t)
+        t += rng.expovariate(rate)
+    return arrivals
+
+def open_loop(fn, arrivals, max_workers=256):
+    # Calls fn(i) at each arrival offset whether or not earlier calls have finished. Latency counts from the
+    # scheduled arrival, so time spent queued behind a saturated system is included rather than hidden.
+    samples = [None] * len(arrivals)
+    started = time.perf_counter()
+
+    def run(i):
+        error = None
+        try:
+            fn(i)
+        except Exception as e:
+            error = type(e).__name__
+        samples[i] = {'latency': time.perf_counter() - started - arrivals[i], 'error': error}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for i, arrival in enumerate(arrivals):
+            delay = started + arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(contextvars.copy_context().run, run, i)
+    return samples, time.perf_counter() - started
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float('nan')
+
+def summarize(samples, elapsed, rate=None):
+    ok = [sample['latency'] for sample in samples if sample['error'] is None]
+    errors = {}
+    for sample in samples:
+        if sample['error'] is not None:
+            errors[sample['error']] = errors.get(sample['error'], 0) + 1
+    return {
+        'offered': rate,
+        'requests': len(samples),
+        'throughput': len(ok) / elapsed if elapsed else 0.0,
+        'p50': percentile(ok, 0.5),
+        'p95': percentile(ok, 0.95),
+        'p99': percentile(ok, 0.99),
+        'error_rate': (len(samples) - len(ok)) / len(samples) if samples else 0.0,
+        'errors': errors,
+    }
+
+def saturation_point(results, slack=0.9, latency_factor=3.0):
+    # First offered rate the system no longer keeps up with: completions fall below `slack` of arrivals, or p95
+    # latency grows past latency_factor times its value at the lowest rate that completed any request
+    baseline = next((result['p95'] for result in results if math.isfinite(result['p95'])), math.nan)
+    for result in results:
+        if result['throughput'] < slack * result['offered'] or result['p95'] > latency_factor * baseline:
+            return result['offered']
+    return None
+
+def run_load(responder, rates, duration, modes=MODES, seed=0, max_workers=256, **forward_kwargs):
+    results = []
+    for rate in rates:
+        arrivals = poisson_arrivals(rate, duration, seed)
+        # Distinct queries so result caches and retrieval cannot short-circuit the load
+        jobs = [(f"Load {rate}/{i}: is progress inevitable?", modes[i % len(modes)]) for i in range(len(arrivals))]
+        samples, elapsed = open_loop(lambda i: responder(jobs[i][0], mode=jobs[i][1], **forward_kwargs), arrivals, max_workers)
+        result = summarize(samples, elapsed, rate)
+        result['modes'] = {mode: summarize([sample for sample, job in zip(samples, jobs) if job[1] == mode], elapsed) for mode in modes}
+        results.append(result)
+    return results
+
+def format_results(results):
+    lines = [f"{'offered/s':>9} {'done/s':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'errors':>7}  per mode p95"]
+    for result in results:
+        modes = ' '.join(f"{mode}={stats['p95']:.2f}" for mode, stats in result['modes'].items())
+        lines.append(f"{result['offered']:9.2f} {result['throughput']:7.2f} {result['p50']:7.2f} {result['p95']:7.2f} {result['p99']:7.2f} "
+                     f"{result['error_rate']:7.1%}  {modes}")
+    saturated = saturation_point(results)
+    lines.append(f"Saturation point: {saturated}/s" if saturated else "No saturation within the tested rates")
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m diaspy.loadtest', description="Open-loop load test against a local fake LM server")
+    parser.add_argument('--rates', type=float, nargs='+', default=[1, 2, 4, 8], help="dialectics per second to offer")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds of arrivals per rate")
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=MODES)
+    parser.add_argument('--latency', type=float, default=0.2, help="mean seconds per LM call")
+    parser.add_argument('--distribution', default='lognormal', choices=('constant', 'uniform', 'exponential', 'lognormal'))
+    parser.add_argument('--sigma', type=float, default=0.5)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, help="LM requests per second before 429s")
+    parser.add_argument('--retries', type=int, default=0, help="LM client retries on errors and 429s")
+    parser.add_argument('--deadline', type=float)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='FILE', help="also write the results as JSON")
+    args = parser.parse_args(argv)
+    with FakeOpenAIServer(latency=args.latency, distribution=args.distribution, sigma=args.sigma, error_rate=args.error_rate,
+                          rate_limit=args.rate_limit, seed=args.seed) as server:
+        lm = make_lm('openai/fake-model', api_key='fake', api_base=server.url, num_retries=args.retries)
+        dspy.settings.configure(lm=lm)
+        responder = DialecticResponder(**{key: agent_class() for key, agent_class in AGENT_CLASSES.items()})
+        kwargs = {'deadline': args.deadline} if args.deadline else {}
+        results = run_load(responder, args.rates, args.duration, tuple(args.modes), args.seed, **kwargs)
+        print(format_results(results))
+        print(f"LM server: {server.requests} requests, {server.errors} injected errors, {server.rate_limited} rate limited, "
+              f"{server.connections} connections")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
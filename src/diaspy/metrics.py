@@ -0,0 +1,194 @@
+import bisect
+import contextlib
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .scoring import critic_score_stats, score_stats
+from .usage import counters
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+ITERATION_BUCKETS = (0, 1, 2, 3, 4, 6, 8)
+
+class _Metric:
+    def __init__(self, registry, name, help, labels=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, value=1):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        if not self.registry.enabled:
+            return
+        # Per-bucket counts; cumulated only when read, so an observation is one bisect and two additions
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def values(self):
+        with self._lock:
+            states = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        values = {}
+        for labels, (counts, total) in states.items():
+            cumulative, running = {}, 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                running += count
+                cumulative[bound] = running
+            values[labels] = {'count': running, 'sum': total, 'buckets': cumulative}
+        return values
+
+class MetricsRegistry:
+    # Process-wide aggregate metrics. Hot-path updates are a dict update under a per-metric lock; collectors are
+    # only called when metrics are read, to export state other modules already keep (usage.counters, score stats).
+    def __init__(self):
+        self.enabled = True
+        self._metrics = {}
+        self._collectors = []
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(self, name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, help, labels, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def collector(self, fn):
+        # fn() yields (name, kind, help, label names, {label values: value}) for gauges and counters
+        self._collectors.append(fn)
+        return fn
+
+    def reset(self):
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def _families(self):
+        for metric in self._metrics.values():
+            yield metric.name, metric.kind, metric.help, metric.labels, metric.values()
+        for collector in self._collectors:
+            yield from collector()
+
+    def snapshot(self):
+        # {metric name: {label values tuple: value}}; histogram values are {'count', 'sum', 'buckets': {le: cumulative}}
+        return {name: values for name, _, _, _, values in self._families()}
+
+    def prometheus(self):
+        # Prometheus text exposition format, version 0.0.4
+        lines = []
+        for name, kind, help, label_names, values in self._families():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for label_values, value in sorted(values.items()):
+                labels = list(zip(label_names, label_values))
+                if kind != 'histogram':
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                for bound, count in value['buckets'].items():
+                    lines.append(f"{name}_bucket{_labels(labels + [('le', _number(bound))])} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(value['sum'])}")
+                lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+registry = MetricsRegistry()
+
+requests = registry.counter('diaspy_requests_total', "Dialectic runs by requested mode (cache hits included)", ('mode',))
+request_errors = registry.counter('diaspy_request_errors_total', "Dialectic runs that raised", ('mode',))
+request_seconds = registry.histogram('diaspy_request_seconds', "End-to-end dialectic latency", ('mode',))
+iterations = registry.histogram('diaspy_iterations', "Critic rounds per executed run", ('mode',), ITERATION_BUCKETS)
+agent_seconds = registry.histogram('diaspy_agent_call_seconds', "Agent call latency; _count is calls per agent", ('agent',))
+agent_errors = registry.counter('diaspy_agent_errors_total', "Agent calls that raised", ('agent',))
+critic_scores = registry.histogram('diaspy_critic_score', "Scores returned by CriticAgent, fallback defaults included", (), SCORE_BUCKETS)
+cache_lookups = registry.counter('diaspy_cache_lookups_total', "Result store, retrieval index, call memo and checkpoint lookups", ('cache', 'outcome'))
+
+@registry.collector
+def _score_families():
+    for prefix, stats in (('diaspy_score', score_stats), ('diaspy_critic_score', critic_score_stats)):
+        snapshot = stats.snapshot()
+        for field in ('parsed', 'retries', 'fallbacks'):
+            yield f"{prefix}_{field}_total", 'counter', f"Score parses: {field}", (), {(): snapshot[field]}
+
+@registry.collector
+def _event_families():
+    yield 'diaspy_events_total', 'counter', "Responder events from usage.counters", ('event',), {(name,): value for name, value in counters.snapshot().items()}
+
+@contextlib.contextmanager
+def observe_request(mode):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        request_errors.inc(mode)
+        raise
+    finally:
+        requests.inc(mode)
+        request_seconds.observe(time.perf_counter() - started, mode)
+
+def serve_metrics(port=9464, host='127.0.0.1', metrics=None):
+    # Serves GET /metrics for a Prometheus scrape from a daemon thread; call .shutdown() on the result to stop
+    metrics = metrics or registry
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            data = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
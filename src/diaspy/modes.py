@@ -0,0 +1,191 @@
+import dspy
+from .graph import Graph, Loop, Map, Node
+from .usage import counters
+
+# The built-in modes as graphs run by DialecticResponder. Node functions take the graph.Run: run['query'] and the
+# forward() parameters are in its state, run.call makes agent calls and run.owner is the responder.
+
+def _thesis(run):
+    return run.owner._thesis(run['query'])
+
+def _fall_back(run):
+    # A revision the critic scored below the synthesis it revised is replaced by a full rebuild, and revision stops
+    # for this run. The round's resynthesis does the rebuild; _settle does it if the round stops before then.
+    score = run['critique'][1]
+    if run['from_revision'] and score < run['previous_score']:
+        counters.increment('delta_fallbacks')
+        run['delta'] = run['from_revision'] = False
+        run['stale'] = True
+    run['previous_score'] = score
+
+def _settle(run, rebuild):
+    if run['stale']:
+        rebuild(run)
+        run['stale'] = False
+        run.owner._track(synthesis=run['synthesis'])
+
+# Binary: thesis, antithesis and synthesis, then critique-driven refinement of the antithesis
+
+def _binary_synthesis(run):
+    synthesis = run.call('synthesis', run['query'], run['thesis'], run['antithesis'])
+    run.update(critiques=[], delta=run.owner.delta_synthesis, from_revision=False, stale=False, previous_score=None)
+    run.owner._track(thesis=run['thesis'], antithesis=run['antithesis'], synthesis=synthesis, critiques=run['critiques'])
+    return synthesis
+
+def _binary_critique(run):
+    critique, score = run.call('critic', run['query'], run['thesis'], run['antithesis'], run['synthesis'])
+    run['critiques'].append(critique)
+    return critique, score
+
+def _binary_rebuild(run):
+    run['synthesis'] = run.call('synthesis', run['query'], run['thesis'], run['antithesis'])
+
+def _refine_antithesis(run):
+    # None when even a re-sample at a higher temperature repeats the current antithesis
+    owner, prompt = run.owner, run['thesis'] + '\nCritique: ' + run['critique'][0]
+    revised = run.call('antithesis', run['query'], prompt)
+    if owner._is_repeat(revised, [run['antithesis']]):
+        counters.increment('antithesis_resamples')
+        with owner._rollout_context(rollout_id=run['iteration'] + 1, temperature=1.0):
+            revised = run.call('antithesis', run['query'], prompt)
+        if owner._is_repeat(revised, [run['antithesis']]):
+            counters.increment('skipped_iterations', run['max_iterations'] - run['iteration'] - 1)
+            return None
+    return revised
+
+def _binary_resynthesis(run):
+    run['antithesis'], run['stale'] = run['revised'], False
+    if run['delta']:
+        run['synthesis'], run['from_revision'] = run.owner._revise(run['query'], run['synthesis'], f"Revised antithesis: {run['antithesis']}"), True
+    else:
+        _binary_rebuild(run)
+    run.owner._track(antithesis=run['antithesis'], synthesis=run['synthesis'])
+
+BINARY = Graph(
+    Node('thesis', _thesis),
+    Node('antithesis', lambda run: run.call('antithesis', run['query'], run['thesis']), needs=('thesis',)),
+    Node('synthesis', _binary_synthesis, needs=('antithesis',)),
+    Loop('refinement', Graph(
+        Node('critique', _binary_critique, stop=lambda run: run['critique'][1] >= 0.8),
+        # The rebuild after a failed revision and the refined antithesis are independent, so they run together
+        Node('fallback', _fall_back, needs=('critique',)),
+        Node('revised', _refine_antithesis, needs=('critique',), stop=lambda run: run['revised'] is None),
+        Node('resynthesis', _binary_resynthesis, needs=('fallback', 'revised')),
+    ), times=lambda run: run['max_iterations'], reserve=3, needs=('synthesis',)),
+    Node('settled', lambda run: _settle(run, _binary_rebuild), needs=('refinement',)),
+    Node('prediction', lambda run: dspy.Prediction(thesis=run['thesis'], antithesis=run['antithesis'], synthesis=run['synthesis'],
+                                                   critiques=run['critiques']), needs=('settled',)),
+)
+
+# Debate: alternating con and pro turns against the thesis until the critic is satisfied or the turns stop adding
+# anything new, then one synthesis over the whole history
+
+def _open_debate(run):
+    history = [f"Thesis: {run['thesis']}"]
+    run.update(position=run['thesis'], converge=run.owner.convergence_threshold is not None)
+    run.owner._track(debate_history=history)
+    return history
+
+def _converged(run, stale_con):
+    # Every remaining round is three calls, and a stale con also skips this round's critique and rebuttal
+    remaining = run['max_rounds'] - run['iteration'] - 1
+    counters.increment('debate_converged')
+    counters.increment('debate_rounds_saved', remaining)
+    counters.increment('debate_calls_saved', 3 * remaining + (2 if stale_con else 0))
+
+def _con_turn(run):
+    # None when the con restates an earlier turn
+    history = run['debate_history']
+    con = run.call('con_debate', query=run['query'], current_position=run['position'], supporting_arguments='\n'.join(history))
+    if run['converge'] and run.owner._converged(con, history):
+        _converged(run, stale_con=True)
+        return None
+    history.append(f"Con {run['iteration']+1}: {con}")
+    return con
+
+def _pro_turn(run):
+    history, pro = run['debate_history'], run['pro']
+    converged = run['converge'] and run.owner._converged(pro, history)
+    history.append(f"Pro {run['iteration']+1}: {pro}")
+    run['position'] = pro
+    if converged:
+        _converged(run, stale_con=False)
+    return converged
+
+DEBATE = Graph(
+    Node('thesis', _thesis),
+    Node('debate_history', _open_debate, needs=('thesis',)),
+    # A round is three calls and the closing synthesis one more
+    Loop('rounds', Graph(
+        Node('con', _con_turn, stop=lambda run: run['con'] is None),
+        Node('critique', lambda run: run.call('critic', query=run['query'], thesis=run['thesis'], antithesis=run['con'],
+                                              synthesis=run['position']), needs=('con',), stop=lambda run: run['critique'][1] >= 0.9),
+        # The rebuttal only answers the con, so a speculative run overlaps it with the critique
+        Node('pro', lambda run: run.call('pro_debate', query=run['query'], current_position=run['position'], opposing_arguments=run['con']),
+             needs=('con',), after=('critique',)),
+        Node('pro_turn', _pro_turn, needs=('pro',), stop=lambda run: run['pro_turn']),
+    ), times=lambda run: run['max_rounds'], reserve=4, needs=('debate_history',)),
+    Node('synthesis', lambda run: run.call('synthesis', query=run['query'], thesis=run['thesis'], antithesis='\n'.join(run['debate_history'])),
+         needs=('rounds',)),
+    Node('prediction', lambda run: dspy.Prediction(debate_history=run['debate_history'], synthesis=run['synthesis']), needs=('synthesis',)),
+)
+
+# Experts: one opinion per domain in parallel, synthesized (map-reduce over panels with fan_in), then
+# critique-driven refinement of every opinion
+
+def _experts_synthesis(run):
+    opinions = run['expert_opinions']
+    # Until a synthesis lands, the raw opinions are the best answer a deadline can return
+    run.owner._track(expert_opinions=opinions, synthesis='\n'.join(f"{domain}: {op}" for domain, op in opinions.items()))
+    _experts_rebuild(run)
+    run.owner._track(synthesis=run['synthesis'])
+    # Panel summaries (fan_in) are rebuilt in full: a revision would leave the critic's panel context stale
+    run.update(delta=run.owner.delta_synthesis and not run['panels'], from_revision=False, stale=False, previous_score=None)
+    return run['synthesis']
+
+def _experts_rebuild(run):
+    run['entries'], run['synthesis'] = run.owner._synthesize_opinions(run['query'], run['expert_opinions'], run['fan_in'])
+    run['combined_context'] = '\n'.join(run['entries'])
+
+def _changed_domains(run):
+    changed = [domain for domain in run['domains'] if not run.owner._is_repeat(run['refined'][domain], [run['expert_opinions'][domain]])]
+    if not changed:
+        # No expert changed their opinion, so re-synthesizing would reproduce the same synthesis
+        counters.increment('skipped_iterations', run['max_iterations'] - run['iteration'] - 1)
+    return changed
+
+def _experts_resynthesis(run):
+    run['expert_opinions'] = opinions = run['refined']
+    run['stale'] = False
+    if run['delta']:
+        # The critic still sees every opinion; only the synthesis prompt shrinks to the changed ones
+        run['combined_context'] = '\n'.join(f"{domain}: {op}" for domain, op in opinions.items())
+        run['synthesis'] = run.owner._revise(run['query'], run['synthesis'], '\n'.join(f"{domain}: {opinions[domain]}" for domain in run['changed']))
+        run['from_revision'] = True
+    else:
+        _experts_rebuild(run)
+    run.owner._track(expert_opinions=opinions, synthesis=run['synthesis'])
+
+def _experts_prediction(run):
+    if run['panels']:
+        return dspy.Prediction(expert_opinions=run['expert_opinions'], panel_summaries=run['entries'], synthesis=run['synthesis'])
+    return dspy.Prediction(expert_opinions=run['expert_opinions'], synthesis=run['synthesis'])
+
+EXPERTS = Graph(
+    Map('expert_opinions', lambda run, domain: run.owner._opinion(run['query'], domain), items=lambda run: run['domains']),
+    Node('synthesis', _experts_synthesis, needs=('expert_opinions',)),
+    # Critique, the parallel expert pass and the synthesis run back to back
+    Loop('refinement', Graph(
+        Node('critique', lambda run: run.call('critic', query=run['query'], thesis=run['combined_context'], antithesis='', synthesis=run['synthesis']),
+             stop=lambda run: run['critique'][1] >= 0.8),
+        Node('fallback', _fall_back, needs=('critique',)),
+        Map('refined', lambda run, domain: run.owner._opinion(run['query'], domain, run['critique'][0]), items=lambda run: run['domains'],
+            needs=('critique',)),
+        Node('changed', _changed_domains, needs=('refined',), stop=lambda run: not run['changed']),
+        Node('resynthesis', _experts_resynthesis, needs=('fallback', 'changed')),
+    ), times=lambda run: run['max_iterations'], reserve=3, needs=('synthesis',)),
+    Node('settled', lambda run: _settle(run, _experts_rebuild), needs=('refinement',)),
+    Node('prediction', _experts_prediction, needs=('settled',)),
+)
+
+MODE_GRAPHS = {'binary': BINARY, 'debate': DEBATE, 'experts': EXPERTS}
@@ -0,0 +1,17 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+def parallel_map(fn, items, max_workers=None):
+    items = list(items)
+    if len(items) <= 1 or max_workers == 1:
+        return [fn(item) for item in items]
+    # Each task runs in a copy of the caller's context so dspy.context() overrides reach the worker threads
+    with ThreadPoolExecutor(max_workers=max_workers or len(items)) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fn, item) for item in items]
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            # Don't start tasks that are still queued once one has failed (e.g. on a deadline)
+            for future in futures:
+                future.cancel()
+            raise
@@ -0,0 +1,71 @@
+import threading
+
+MODES = ('binary', 'debate', 'experts')
+
+# Priors used until a mode has been observed; refined by record() with an exponential moving average
+PRIOR_SECONDS_PER_CALL = 1.5
+PRIOR_TOKENS_PER_CALL = 600
+PRIOR_SCORES = {'binary': 0.75, 'debate': 0.8, 'experts': 0.85}
+
+def call_bounds(mode, max_iterations=2, domains=None, max_rounds=3):
+    # Fewest and most agent calls a mode can make: early exit on the first critic pass vs. every refinement
+    if mode == 'binary':
+        return 4, 3 + 3 * max_iterations
+    if mode == 'debate':
+        return 4, 2 + 3 * max_rounds
+    if mode == 'experts':
+        n = len(domains or ['science', 'philosophy', 'humor'])
+        return n + 2, n + 1 + max_iterations * (n + 2)
+    raise ValueError(f"Unknown mode: {mode}")
+
+class ModePlanner:
+    def __init__(self, threshold=0.8, modes=MODES, alpha=0.2):
+        self.threshold = threshold
+        self.modes = modes
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self.history = {mode: {'runs': 0, 'refine_rate': 0.5, 'seconds_per_call': PRIOR_SECONDS_PER_CALL,
+                               'tokens_per_call': PRIOR_TOKENS_PER_CALL, 'score': PRIOR_SCORES.get(mode, threshold)}
+                        for mode in modes}
+
+    def estimate(self, mode, query, max_iterations=2, domains=None, max_rounds=3):
+        stats = self.history[mode]
+        low, high = call_bounds(mode, max_iterations, domains, max_rounds)
+        calls = low + (high - low) * stats['refine_rate']
+        # Long queries are echoed into every prompt of the dialectic
+        tokens_per_call = stats['tokens_per_call'] + len(query) // 4
+        return {'calls': calls, 'latency': calls * stats['seconds_per_call'], 'tokens': calls * tokens_per_call, 'score': stats['score']}
+
+    def choose(self, query, latency_budget=None, token_budget=None, **params):
+        estimates = {mode: self.estimate(mode, query, **params) for mode in self.modes}
+        in_budget = [mode for mode, est in estimates.items()
+                     if (latency_budget is None or est['latency'] <= latency_budget)
+                     and (token_budget is None or est['tokens'] <= token_budget)]
+        cost = (lambda mode: estimates[mode]['tokens']) if token_budget is not None else (lambda mode: estimates[mode]['latency'])
+        passing = [mode for mode in in_budget if estimates[mode]['score'] >= self.threshold]
+        if passing:
+            mode = min(passing, key=cost)
+        elif in_budget:
+            mode = max(in_budget, key=lambda mode: estimates[mode]['score'])
+        else:
+            mode = min(estimates, key=cost)
+        return mode, estimates[mode]
+
+    def record(self, mode, query, usage, max_iterations=2, domains=None, max_rounds=3):
+        if mode not in self.history or not usage['calls']:
+            return
+        low, high = call_bounds(mode, max_iterations, domains, max_rounds)
+        observed = {
+            'refine_rate': min(1.0, max(0.0, (usage['calls'] - low) / (high - low))) if high > low else 0.0,
+            'seconds_per_call': usage['latency'] / usage['calls'],
+            'tokens_per_call': max(0, usage['tokens'] / usage['calls'] - len(query) // 4),
+        }
+        if usage.get('score') is not None:
+            observed['score'] = usage['score']
+        with self._lock:
+            stats = self.history[mode]
+            # The first observation replaces the prior outright
+            alpha = 1.0 if stats['runs'] == 0 else self.alpha
+            for name, value in observed.items():
+                stats[name] += alpha * (value - stats[name])
+            stats['runs'] += 1
@@ -0,0 +1,172 @@
+import cProfile
+import contextlib
+import math
+import sys
+import threading
+import time
+from collections import Counter
+import dspy
+from dspy.utils.callback import BaseCallback
+
+PHASES = ('format', 'network', 'parse', 'other', 'total')
+
+class PhaseProfiler(BaseCallback):
+    # Splits every agent call into adapter formatting (prompt + demos), the LM call itself, adapter parsing, and the
+    # rest (module dispatch, Prediction construction, ...), keyed by the outermost agent module's class name.
+    # Enable with profile_phases(); callbacks fire on the thread doing the work, so parallel experts attribute correctly.
+    def __init__(self, skip=('DialecticResponder',)):
+        self.skip = skip
+        self.samples = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _state(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+            self._local.started = {}
+        return self._local
+
+    def _agent(self):
+        stack = self._state().stack
+        return stack[0][1] if stack else None
+
+    def _start(self, call_id):
+        self._state().started[call_id] = time.perf_counter()
+
+    def _end(self, call_id, phase):
+        started = self._state().started.pop(call_id, None)
+        agent = self._agent()
+        if started is None or agent is None:
+            return
+        elapsed = time.perf_counter() - started
+        self._record(agent, phase, elapsed)
+        self._local.phases[phase] = self._local.phases.get(phase, 0.0) + elapsed
+
+    def _record(self, agent, phase, seconds):
+        with self._lock:
+            self.samples.setdefault(agent, {}).setdefault(phase, []).append(seconds)
+
+    def on_module_start(self, call_id, instance, inputs):
+        name = type(instance).__name__
+        state = self._state()
+        if name in self.skip:
+            return
+        if not state.stack:
+            state.phases = {}
+        state.stack.append((call_id, name, time.perf_counter()))
+
+    def on_module_end(self, call_id, outputs, exception=None):
+        state = self._state()
+        if not state.stack or state.stack[-1][0] != call_id:
+            return
+        _, name, started = state.stack.pop()
+        if not state.stack:
+            total = time.perf_counter() - started
+            self._record(name, 'total', total)
+            self._record(name, 'other', max(0.0, total - sum(state.phases.values())))
+
+    def on_adapter_format_start(self, call_id, instance, inputs):
+        self._start(call_id)
+
+    def on_adapter_format_end(self, call_id, outputs, exception=None):
+        self._end(call_id, 'format')
+
+    def on_lm_start(self, call_id, instance, inputs):
+        self._start(call_id)
+
+    def on_lm_end(self, call_id, outputs, exception=None):
+        self._end(call_id, 'network')
+
+    def on_adapter_parse_start(self, call_id, instance, inputs):
+        self._start(call_id)
+
+    def on_adapter_parse_end(self, call_id, outputs, exception=None):
+        self._end(call_id, 'parse')
+
+    def summary(self):
+        with self._lock:
+            samples = {agent: {phase: sorted(values) for phase, values in phases.items()} for agent, phases in self.samples.items()}
+        return {agent: {phase: {'count': len(values), 'total': sum(values), 'mean': sum(values) / len(values),
+                                'p50': _percentile(values, 0.5), 'p95': _percentile(values, 0.95)}
+                        for phase, values in phases.items()}
+                for agent, phases in samples.items()}
+
+    def histogram(self, agent, phase, lowest=1e-5, buckets=12):
+        # Counts per power-of-ten-halves bucket from `lowest` seconds up; the last bucket is open-ended
+        with self._lock:
+            values = list(self.samples.get(agent, {}).get(phase, []))
+        counts = Counter(min(buckets - 1, max(0, int(2 * math.log10(max(value, lowest) / lowest)))) for value in values)
+        return [(lowest * 10 ** (bucket / 2), counts.get(bucket, 0)) for bucket in range(buckets)]
+
+    def report(self):
+        lines = [f"{'agent':<18} {'phase':<8} {'calls':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'share':>7}"]
+        for agent, phases in sorted(self.summary().items()):
+            total = phases.get('total', {}).get('total') or 1e-12
+            for phase in PHASES:
+                if phase in phases:
+                    stats = phases[phase]
+                    lines.append(f"{agent:<18} {phase:<8} {stats['count']:>6} {stats['mean'] * 1e3:9.3f} {stats['p50'] * 1e3:9.3f} "
+                                 f"{stats['p95'] * 1e3:9.3f} {stats['total'] / total:7.1%}")
+        return '\n'.join(lines)
+
+def _percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+@contextlib.contextmanager
+def profile_phases(profiler=None):
+    profiler = profiler or PhaseProfiler()
+    with dspy.context(callbacks=[*dspy.settings.callbacks, profiler]):
+        yield profiler
+
+@contextlib.contextmanager
+def cprofile(path=None):
+    # Deterministic profile of everything run inside; dump is pstats format (snakeviz, gprof2dot, pstats)
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        if path:
+            profile.dump_stats(path)
+
+class StackSampler:
+    # In-process sampling profiler writing py-spy's raw "folded" format (one "frame;frame;... count" line per stack),
+    # which inferno, flamegraph.pl and speedscope read directly
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(f"{frame.f_code.co_name} ({frame.f_code.co_filename}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(frames))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
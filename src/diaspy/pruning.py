@@ -0,0 +1,125 @@
+import threading
+from collections import OrderedDict
+import dspy
+from .datasets import index_by_agent
+from .parallel import parallel_map
+from .similarity import default_similarity
+from .usage import approx_tokens
+
+def _fields(demo):
+    return demo.toDict() if hasattr(demo, 'toDict') else dict(demo)
+
+def demo_tokens(demos):
+    return sum(approx_tokens(*_fields(demo).values()) for demo in demos)
+
+def agent_demos(agent):
+    return {name: list(predictor.demos) for name, predictor in agent.named_predictors()}
+
+def set_demos(agent, demos):
+    for name, predictor in agent.named_predictors():
+        predictor.demos = list(demos.get(name, predictor.demos))
+
+def evaluate(agent, devset, metric):
+    def score(example):
+        try:
+            return metric(example, agent(**example.inputs().toDict()))
+        except Exception:
+            return 0.0
+    scores = parallel_map(score, devset)
+    return sum(scores) / len(scores) if scores else 0.0
+
+def prune_agent(agent, devset, metric, tolerance=0.0, max_demos=None):
+    # Greedy backward elimination, costliest demos first: drop a demo whenever the agent still scores within
+    # `tolerance` of its full-demo score on devset. One evaluation per demo rather than a search over subsets.
+    agent = agent.deepcopy()
+    demos = agent_demos(agent)
+    baseline = evaluate(agent, devset, metric)
+    candidates = sorted(((name, demo) for name, predictor_demos in demos.items() for demo in predictor_demos),
+                        key=lambda item: demo_tokens([item[1]]), reverse=True)
+    for name, demo in candidates:
+        trial = {key: [d for d in value if d is not demo] if key == name else value for key, value in demos.items()}
+        set_demos(agent, trial)
+        if evaluate(agent, devset, metric) >= baseline - tolerance:
+            demos = trial
+    if max_demos is not None:
+        # Keep the cheapest survivors when a hard cap is set
+        demos = {name: sorted(value, key=lambda demo: demo_tokens([demo]))[:max_demos] for name, value in demos.items()}
+    set_demos(agent, demos)
+    return agent, baseline, evaluate(agent, devset, metric)
+
+def prune_demos(compiled, devsets=None, metric=None, tolerance=0.0, max_demos=None):
+    # Post-compile step over compile_agents' dict: returns (pruned copies, per-agent report). devsets maps agent key
+    # to examples; by default the packaged trainset, indexed like compile_agents does.
+    if metric is None or devsets is None:
+        from .utils import philosophical_metric, trainset
+        metric = metric or philosophical_metric
+        devsets = devsets if devsets is not None else index_by_agent(trainset)
+    pruned, report = {}, {}
+    for key, agent in compiled.items():
+        before = agent_demos(agent)
+        devset = devsets.get(key) or []
+        if not devset or not any(before.values()):
+            pruned[key] = agent
+            continue
+        pruned[key], score_before, score_after = prune_agent(agent, devset, metric, tolerance, max_demos)
+        after = agent_demos(pruned[key])
+        report[key] = {
+            'demos_before': sum(map(len, before.values())),
+            'demos_after': sum(map(len, after.values())),
+            'tokens_before': sum(map(demo_tokens, before.values())),
+            'tokens_after': sum(map(demo_tokens, after.values())),
+            'score_before': score_before,
+            'score_after': score_after,
+        }
+    return pruned, report
+
+def pruning_report(report):
+    lines = [f"{'agent':<12} {'demos':>9} {'prompt tokens/call':>20} {'saved':>7} {'metric':>13}"]
+    for key, row in sorted(report.items()):
+        saved = row['tokens_before'] - row['tokens_after']
+        lines.append(f"{key:<12} {row['demos_before']:>4} -> {row['demos_after']:<2} {row['tokens_before']:>9} -> {row['tokens_after']:<7} "
+                     f"{saved / (row['tokens_before'] or 1):7.1%} {row['score_before']:.2f} -> {row['score_after']:.2f}")
+    return '\n'.join(lines)
+
+class QueryDemoSelector(dspy.Module):
+    # Per-query few-shot: keeps the agent's demo pool but sends only the k demos whose query is most similar to the
+    # current one. Each distinct demo subset gets its own cached copy of the agent, so concurrent calls never
+    # mutate shared demos.
+    def __init__(self, agent, k=2, similarity=None, cache_size=64):
+        super().__init__()
+        self.agent = agent
+        self.k = k
+        self.similarity = similarity or default_similarity
+        self.pool = agent_demos(agent)
+        self.cache_size = cache_size
+        self._variants = OrderedDict()
+        self._lock = threading.Lock()
+
+    def select(self, query):
+        selected = {}
+        for name, demos in self.pool.items():
+            if len(demos) <= self.k:
+                selected[name] = tuple(range(len(demos)))
+                continue
+            scores = self.similarity.matrix([query], [_fields(demo).get('query', '') for demo in demos])[0]
+            selected[name] = tuple(sorted(scores.argsort()[::-1][:self.k]))
+        return selected
+
+    def variant(self, selected):
+        key = tuple(sorted(selected.items()))
+        with self._lock:
+            agent = self._variants.get(key)
+            if agent is not None:
+                self._variants.move_to_end(key)
+                return agent
+        agent = self.agent.deepcopy()
+        set_demos(agent, {name: [self.pool[name][i] for i in indices] for name, indices in selected.items()})
+        with self._lock:
+            self._variants[key] = agent
+            while len(self._variants) > self.cache_size:
+                self._variants.popitem(last=False)
+        return agent
+
+    def forward(self, *args, **kwargs):
+        query = kwargs['query'] if 'query' in kwargs else args[0]
+        return self.variant(self.select(query))(*args, **kwargs)
@@ -0,0 +1,101 @@
+import json
+import math
+import re
+import numpy as np
+from .similarity import default_similarity
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+RESOLUTION_MARKERS = ('resolved', 'resolve', 'conclusion', 'conclude', 'final', 'therefore', 'ultimately', 'in sum', 'on balance')
+GROUNDING_MARKERS = ('logical', 'reason', 'evidence', 'argument', 'truth', 'fact', 'accurate', 'balance', 'both', 'perspectives')
+
+def _as_dict(output):
+    if hasattr(output, 'toDict'):
+        return output.toDict()
+    # Prediction.__dict__ as passed by the QC harness
+    return output.get('_store', output)
+
+def quality_features(query, mode, output, similarity=None):
+    similarity = similarity or default_similarity
+    output = _as_dict(output)
+    synthesis = str(output.get('synthesis', ''))
+    synthesis_lower = synthesis.lower()
+    tokens = _TOKEN.findall(synthesis_lower)
+    features = {
+        'length': min(1.0, len(synthesis) / 200),
+        'lexical_diversity': len(set(tokens)) / len(tokens) if tokens else 0.0,
+        'grounding': min(1.0, sum(marker in synthesis_lower for marker in GROUNDING_MARKERS) / 3),
+        'query_relevance': max(0.0, similarity.similarity(query, synthesis)),
+    }
+    inputs = []
+    if 'thesis' in output and 'antithesis' in output:
+        inputs = [output['thesis'], output['antithesis']]
+        # A good antithesis says something the thesis does not
+        features['redundancy'] = max(0.0, similarity.similarity(output['thesis'], output['antithesis']))
+    if output.get('debate_history'):
+        inputs = [str(turn) for turn in output['debate_history']]
+        features['resolution'] = 1.0 if any(marker in synthesis_lower for marker in RESOLUTION_MARKERS) else 0.0
+    if output.get('expert_opinions'):
+        inputs = [str(opinion) for opinion in output['expert_opinions'].values()]
+        if len(inputs) > 1:
+            sims = similarity.matrix(inputs)
+            pairs = sims[np.triu_indices(len(inputs), k=1)]
+            features['expert_diversity'] = float(np.clip(1.0 - pairs.mean(), 0.0, 1.0))
+        else:
+            features['expert_diversity'] = 0.0
+    if inputs:
+        # How evenly the synthesis draws on every input rather than echoing one of them
+        agreements = np.clip(similarity.matrix(inputs, [synthesis])[:, 0], 0.0, None)
+        features['agreement'] = float(agreements.min() / agreements.max()) if agreements.max() > 0 else 0.0
+    return features
+
+def offline_score(features):
+    values = [1.0 - value if name == 'redundancy' else value for name, value in features.items()]
+    return sum(values) / len(values)
+
+class OfflineScorer:
+    # Scores every output from deterministic features; only outputs scoring inside [low, high] go to the LLM judge
+    def __init__(self, qc_agent=None, low=0.4, high=0.7):
+        self.qc_agent = qc_agent
+        self.low = low
+        self.high = high
+        self.llm_calls = 0
+        self.offline = 0
+
+    def score(self, query, mode, output):
+        features = quality_features(query, mode, output)
+        score = offline_score(features)
+        if self.qc_agent is not None and self.low <= score <= self.high:
+            self.llm_calls += 1
+            critique, llm_score = self.qc_agent(query=query, mode=mode, output=output)
+            return {'score': llm_score, 'source': 'llm', 'offline_score': score, 'critique': critique, 'features': features}
+        self.offline += 1
+        return {'score': score, 'source': 'offline', 'offline_score': score, 'features': features}
+
+    def score_batch(self, records):
+        return [self.score(record['query'], record['mode'], record['output']) for record in records]
+
+def load_runs(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def agreement(records, threshold=0.7):
+    # records carry the full LLM QC score as 'qc_score'; compares it with the offline score of the same output
+    pairs = [(offline_score(quality_features(record['query'], record['mode'], record['output'])), record['qc_score']) for record in records]
+    if not pairs:
+        return {'n': 0}
+    n = len(pairs)
+    offline, llm = zip(*pairs)
+    mean_offline, mean_llm = sum(offline) / n, sum(llm) / n
+    cov = sum((a - mean_offline) * (b - mean_llm) for a, b in pairs)
+    spread = math.sqrt(sum((a - mean_offline) ** 2 for a in offline) * sum((b - mean_llm) ** 2 for b in llm))
+    return {
+        'n': n,
+        'mean_abs_error': sum(abs(a - b) for a, b in pairs) / n,
+        'pearson': cov / spread if spread else 0.0,
+        'pass_fail_agreement': sum((a >= threshold) == (b >= threshold) for a, b in pairs) / n,
+    }
+
+if __name__ == '__main__':
+    import sys
+    # python -m diaspy.qc qc_runs.jsonl [threshold]
+    print(json.dumps(agreement(load_runs(sys.argv[1]), *map(float, sys.argv[2:3])), indent=2))
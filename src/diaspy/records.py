@@ -0,0 +1,88 @@
+import os
+import tempfile
+import threading
+import weakref
+
+# Prediction fields holding intermediate text that retention policies may spill or drop
+INTERMEDIATES = ('debate_history', 'critiques', 'expert_opinions', 'panel_summaries', 'branch_histories')
+RETENTION = ('all', 'spill', 'final')
+
+class SpillFile:
+    # A file given by path is kept; a temporary one is deleted on close(), or once neither the SpillFile nor any
+    # SpilledText pointing into it is reachable, or at exit
+    def __init__(self, path=None):
+        temporary = path is None
+        if temporary:
+            fd, path = tempfile.mkstemp(prefix='diaspy-spill-', suffix='.txt')
+            os.close(fd)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        self._finalizer = weakref.finalize(self, _release, self._file, path if temporary else None)
+
+    def write(self, text):
+        data = str(text).encode('utf-8')
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+        return SpilledText(self, offset, len(data))
+
+    def read(self, offset, length):
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(length).decode('utf-8')
+
+    def close(self):
+        with self._lock:
+            self._finalizer()
+
+def _release(file, path):
+    file.close()
+    if path is not None and os.path.exists(path):
+        os.remove(path)
+
+class SpilledText:
+    # A reference to text kept in a SpillFile; three slots instead of the full string per intermediate turn
+    __slots__ = ('spill', 'offset', 'length')
+
+    def __init__(self, spill, offset, length):
+        self.spill = spill
+        self.offset = offset
+        self.length = length
+
+    def __str__(self):
+        return self.spill.read(self.offset, self.length)
+
+    def __repr__(self):
+        return f"SpilledText({self.spill.path!r}, offset={self.offset}, length={self.length})"
+
+    def __eq__(self, other):
+        if isinstance(other, SpilledText):
+            return (self.spill, self.offset, self.length) == (other.spill, other.offset, other.length)
+        return isinstance(other, str) and str(self) == other
+
+    def __hash__(self):
+        # Equal to the str it holds, so it must hash like it
+        return hash(str(self))
+
+def compact(prediction, retain='all', spill=None):
+    if retain == 'all':
+        return prediction
+    for key in INTERMEDIATES:
+        if key not in prediction:
+            continue
+        value = prediction[key]
+        if retain == 'final':
+            prediction[key] = type(value)()
+        else:
+            prediction[key] = _spill(value, spill)
+    return prediction
+
+def _spill(value, spill):
+    if isinstance(value, dict):
+        return {key: _spill(item, spill) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_spill(item, spill) for item in value]
+    return spill.write(value)
@@ -1,16 +1,41 @@
+import contextlib
+import contextvars
+import functools
+import time
+import uuid
 import dspy
 from .agents import (
     ThesisAgent,
     AntithesisAgent,
     SynthesisAgent,
+    RevisionAgent,
     CriticAgent,
     ProDebateAgent,
     ConDebateAgent,
     ExpertAgent,
 )
+from .deadlines import DeadlineExceeded, current_deadline, deadline_scope
+from . import metrics
+from .graph import Run
+from .modes import MODE_GRAPHS
+from .parallel import parallel_map
+from .planner import ModePlanner
+from .records import RETENTION, SpillFile, compact
+from .scheduler import current_scheduler
+from .similarity import default_similarity
+from .store import artifact_version, result_key
+from .usage import approx_tokens, counters, current_usage, stage_listener, track_usage
+
+# Best-so-far fields of the run in progress, returned as a truncated prediction if its deadline passes
+_progress = contextvars.ContextVar('diaspy_progress', default=None)
+# checkpoints.RunCheckpoint of the run in progress when the responder has a checkpoint store
+_checkpoint = contextvars.ContextVar('diaspy_checkpoint', default=None)
 
 class DialecticResponder(dspy.Module):
-    def __init__(self, thesis, antithesis, synthesis, critic, pro_debate=None, con_debate=None, expert=None):
+    def __init__(self, thesis, antithesis, synthesis, critic, pro_debate=None, con_debate=None, expert=None, store=None, version=None, planner=None,
+                 retain='all', spill=None, similarity=None, dedupe_threshold=None, retrieval=None, reuse_threshold=0.9, seed_threshold=0.7,
+                 convergence_threshold=None, revision=None, delta_synthesis=False, graphs=None, speculate=False, memo=None,
+                 checkpoints=None):
         super().__init__()
         self.thesis_agent = thesis
         self.antithesis_agent = antithesis
@@ -19,62 +44,365 @@ class DialecticResponder(dspy.Module):
         self.pro_debate_agent = pro_debate or ProDebateAgent()
         self.con_debate_agent = con_debate or ConDebateAgent()
         self.expert_agent = expert or ExpertAgent()
+        # With delta_synthesis, refinement rounds revise the previous synthesis from only the inputs that changed
+        # instead of re-synthesizing everything; a revision the critic scores below its predecessor is rebuilt in full
+        self.revision_agent = revision or RevisionAgent()
+        self.delta_synthesis = delta_synthesis
+        # Completed dialectics are memoized in `store` under the compiled agents' version
+        self.store = store
+        self.version = version
+        if (store is not None or retrieval is not None or checkpoints is not None) and version is None:
+            self.version = artifact_version(self.thesis_agent, self.antithesis_agent, self.synthesis_agent, self.critic_agent,
+                                            self.pro_debate_agent, self.con_debate_agent, self.expert_agent, self.revision_agent)
+        # Learns per-mode cost and quality from every run; drives mode='auto'
+        self.planner = planner or ModePlanner()
+        # How much intermediate text (debate turns, critiques, opinions) returned predictions keep: see records.RETENTION
+        if retain not in RETENTION:
+            raise ValueError(f"Unknown retention policy: {retain}")
+        self.retain = retain
+        self.spill = spill
+        # Refinement outputs at least this similar to the previous round count as repeats and end refinement early, and
+        # experts whose opinion repeats are left out of a delta revision. Off (None) by default: it changes outputs.
+        self.similarity = similarity or default_similarity
+        self.dedupe_threshold = dedupe_threshold
+        # A debate turn at least this similar to an earlier turn adds nothing new; the debate then goes straight to
+        # synthesis. Off (None, always max_rounds) by default, like dedupe_threshold: it changes outputs. 0.9 suits the
+        # default similarity.
+        self.convergence_threshold = convergence_threshold
+        # Theses and first-round expert opinions from earlier queries: reused outright above reuse_threshold,
+        # passed to the expert as context above seed_threshold. The defaults suit the lexical index, which only
+        # matches rephrasings of the same question; re-validate them on paraphrase and antonym pairs for another embedder.
+        self.retrieval = retrieval
+        self.reuse_threshold = reuse_threshold
+        self.seed_threshold = seed_threshold
+        # Modes are graph.Graph definitions (see modes.py); `graphs` adds or replaces them by mode name. speculate
+        # starts nodes before the nodes that might make them unnecessary (e.g. the pro rebuttal alongside the critique);
+        # a graph.CallMemo passed as memo answers repeated identical agent calls from memory.
+        self.graphs = {**MODE_GRAPHS, **(graphs or {})}
+        self.speculate = speculate
+        self.memo = memo
+        # With a checkpoints.CheckpointStore every agent output is recorded as it lands. Each call is a fresh run
+        # unless given the run_id of one that failed or was truncated; that run resumes, replaying the recorded
+        # outputs instead of calling the LM until it passes the point of failure
+        self.checkpoints = checkpoints
 
-    def forward(self, query, mode='binary', max_iterations=2, domains=None, max_rounds=3):
-        if mode == 'binary':
-            return self._run_binary(query, max_iterations)
-        elif mode == 'debate':
-            return self._run_debate(query, max_rounds, max_iterations)
-        elif mode == 'experts':
-            domains = domains or ['science', 'philosophy', 'humor']
-            return self._run_experts(query, domains, max_iterations)
+    def forward(self, query, mode='binary', max_iterations=2, domains=None, max_rounds=3, branches=3, fan_in=None,
+                latency_budget=None, token_budget=None, deadline=None, run_id=None):
+        params = {'max_iterations': max_iterations, 'domains': domains, 'max_rounds': max_rounds, 'branches': branches, 'fan_in': fan_in}
+        if mode == 'auto':
+            params.update(latency_budget=latency_budget, token_budget=token_budget)
+        with metrics.observe_request(mode):
+            if self.store is None:
+                return self._compact(self._resumable(query, mode, params, deadline, run_id))
+            key = self._result_key(query, mode, params)
+            cached = self.store.get(key)
+            metrics.cache_lookups.inc('result', 'miss' if cached is None else 'hit')
+            if cached is not None:
+                return self._compact(dspy.Prediction(**cached), key)
+            prediction = self._resumable(query, mode, params, deadline, run_id)
+            if prediction.get('truncated'):
+                # A deadline-degraded answer must not be served to callers with more time
+                return self._compact(prediction)
+            # The store keeps the full result; the returned prediction may hold only references to it
+            self.store.put(key, query, mode, params, self.version, prediction.toDict())
+            return self._compact(prediction, key)
+
+    def resume(self, run_id, deadline=None):
+        # Re-runs an unfinished run from the checkpoint store with its original query, mode and parameters
+        run = self.checkpoints.run(run_id)
+        if run is None:
+            raise KeyError(f"No unfinished run: {run_id}")
+        return self(run['query'], mode=run['mode'], deadline=deadline, run_id=run_id, **run['params'])
+
+    def _resumable(self, query, mode, params, deadline, run_id):
+        if self.checkpoints is None:
+            return self._dispatch(query, mode, deadline=deadline, **params)
+        run_id = run_id or uuid.uuid4().hex
+        checkpoint = self.checkpoints.open(run_id, query, mode, params)
+        token = _checkpoint.set(checkpoint)
+        try:
+            prediction = self._dispatch(query, mode, deadline=deadline, **params)
+        except Exception as e:
+            self.checkpoints.fail(run_id, e)
+            raise
+        finally:
+            _checkpoint.reset(token)
+        if checkpoint.replayed:
+            counters.increment('checkpoint_resumes')
+        # A deadline-truncated run stays resumable, so a retry with more time picks up where it stopped
+        if prediction.get('truncated'):
+            self.checkpoints.fail(run_id, 'deadline reached before the run completed')
         else:
+            self.checkpoints.clear(run_id)
+        return prediction
+
+    def _result_key(self, query, mode, params):
+        # Settings that change what a run returns are part of the key, so differently configured responders sharing a
+        # store never serve each other's results
+        settings = {'delta_synthesis': self.delta_synthesis, 'convergence_threshold': self.convergence_threshold,
+                    'dedupe_threshold': self.dedupe_threshold, 'reuse_threshold': self.reuse_threshold, 'seed_threshold': self.seed_threshold}
+        return result_key(query, mode, {**params, 'settings': settings}, self.version)
+
+    def _compact(self, prediction, key=None):
+        if self.retain == 'all':
+            return prediction
+        if self.retain == 'spill' and self.spill is None:
+            self.spill = SpillFile()
+        if key is not None:
+            prediction.result_key = key
+        return compact(prediction, self.retain, self.spill)
+
+    def _dispatch(self, query, mode, max_iterations, domains, max_rounds, branches, fan_in, latency_budget=None, token_budget=None,
+                  deadline=None):
+        with deadline_scope(deadline):
+            if mode == 'auto':
+                # A deadline doubles as the latency budget when none is given
+                latency_budget = latency_budget if latency_budget is not None else deadline
+                return self._run_auto(query, max_iterations, domains, max_rounds, latency_budget, token_budget)
+            with track_usage() as usage:
+                prediction = self._run_bounded(query, mode, max_iterations, domains, max_rounds, branches, fan_in)
+        # Every refinement iteration or debate round starts with one critique
+        metrics.iterations.observe(usage.calls.get('critic', 0), mode)
+        if prediction.get('truncated'):
+            return prediction
+        self.planner.record(mode, query, usage.snapshot(), max_iterations=max_iterations, domains=domains, max_rounds=max_rounds)
+        return prediction
+
+    def _run_bounded(self, query, mode, *args):
+        if current_deadline() is None:
+            return self._run_mode(query, mode, *args)
+        progress = {'fields': {}, 'outputs': {}, 'truncated': False}
+        token = _progress.set(progress)
+        try:
+            prediction = self._run_mode(query, mode, *args)
+        except DeadlineExceeded:
+            counters.increment('deadline_exceeded')
+            return self._partial_prediction(progress)
+        finally:
+            _progress.reset(token)
+        prediction.truncated = progress['truncated']
+        return prediction
+
+    def _partial_prediction(self, progress):
+        fields = dict(progress['fields'])
+        if 'synthesis' not in fields:
+            # Nothing was synthesized yet: fall back to the furthest-along position any agent produced
+            outputs = progress['outputs']
+            fields['synthesis'] = next((outputs[name] for name in ('pro_debate', 'thesis', 'expert') if name in outputs), '')
+        return dspy.Prediction(**fields, truncated=True)
+
+    def _track(self, **fields):
+        progress = _progress.get()
+        if progress is not None:
+            progress['fields'].update(fields)
+
+    def _out_of_time(self, calls):
+        # True when the remaining budget will not cover `calls` more sequential agent calls at the average latency so far
+        deadline = current_deadline()
+        if deadline is None:
+            return False
+        usage = current_usage()
+        average = sum(usage.seconds.values()) / usage.total_calls if usage is not None and usage.total_calls else 0.0
+        if deadline.remaining() > calls * average:
+            return False
+        counters.increment('deadline_truncations')
+        _progress.get()['truncated'] = True
+        return True
+
+    def _run_mode(self, query, mode, max_iterations, domains, max_rounds, branches, fan_in):
+        if mode == 'tournament':
+            return self._run_tournament(query, branches, max_rounds)
+        if mode not in self.graphs:
             raise ValueError(f"Unknown mode: {mode}")
+        if mode == 'experts':
+            domains = domains or ['science', 'philosophy', 'humor']
+            if fan_in is not None and fan_in < 2:
+                raise ValueError(f"fan_in must be at least 2, got {fan_in}")
+        run = Run(self, {'query': query, 'max_iterations': max_iterations, 'domains': domains, 'max_rounds': max_rounds, 'fan_in': fan_in,
+                         'panels': bool(domains and fan_in and len(domains) > fan_in)}, budget=self._out_of_time, speculate=self.speculate)
+        self.graphs[mode].run(run)
+        return run['prediction']
 
-    def _run_binary(self, query, max_iterations):
-        thesis = self.thesis_agent(query)
-        antithesis = self.antithesis_agent(query, thesis)
-        synthesis = self.synthesis_agent(query, thesis, antithesis)
-        critiques = []
-        for _ in range(max_iterations):
-            critique, score = self.critic_agent(query, thesis, antithesis, synthesis)
-            critiques.append(critique)
-            if score >= 0.8:
-                break
-            antithesis = self.antithesis_agent(query, thesis + '\nCritique: ' + critique)
-            synthesis = self.synthesis_agent(query, thesis, antithesis)
-        return dspy.Prediction(thesis=thesis, antithesis=antithesis, synthesis=synthesis, critiques=critiques)
-
-    def _run_debate(self, query, max_rounds, max_iterations):
-        thesis = self.thesis_agent(query)
-        current_position = thesis
-        debate_history = [f"Thesis: {thesis}"]
+    def _run_auto(self, query, max_iterations, domains, max_rounds, latency_budget, token_budget):
+        mode, predicted = self.planner.choose(query, latency_budget=latency_budget, token_budget=token_budget,
+                                              max_iterations=max_iterations, domains=domains, max_rounds=max_rounds)
+        with track_usage() as usage:
+            prediction = self._run_bounded(query, mode, max_iterations, domains, max_rounds, None, None)
+        actual = usage.snapshot()
+        metrics.iterations.observe(actual['agents'].get('critic', 0), mode)
+        if not prediction.get('truncated'):
+            self.planner.record(mode, query, actual, max_iterations=max_iterations, domains=domains, max_rounds=max_rounds)
+        prediction.mode = mode
+        prediction.predicted_cost = predicted
+        prediction.actual_cost = {name: actual[name] for name in ('calls', 'latency', 'tokens', 'score')}
+        return prediction
+
+    def _call(self, name, *args, **kwargs):
+        if self.memo is not None:
+            key = self.memo.key(name, args, kwargs)
+            cached = self.memo.get(key)
+            metrics.cache_lookups.inc('memo', 'miss' if cached is None else 'hit')
+            if cached is not None:
+                return cached
+        checkpoint = _checkpoint.get()
+        if checkpoint is not None:
+            checkpoint_key = checkpoint.key(name, args, kwargs)
+            replayed = checkpoint.replay(checkpoint_key)
+            metrics.cache_lookups.inc('checkpoint', 'miss' if replayed is None else 'hit')
+            if replayed is not None:
+                counters.increment('checkpoint_replays')
+                return replayed
+        agent = getattr(self, f'{name}_agent')
+        scheduler = current_scheduler()
+        if scheduler is not None:
+            # Under a PipelineScheduler the call is queued with every other running query's ready calls
+            agent = functools.partial(scheduler.dispatch, name, agent)
+        deadline = current_deadline()
+        start = time.perf_counter()
+        try:
+            result = agent(*args, **kwargs) if deadline is None else deadline.run(agent, *args, **kwargs)
+        except Exception:
+            metrics.agent_errors.inc(name)
+            raise
+        seconds = time.perf_counter() - start
+        metrics.agent_seconds.observe(seconds, name)
+        usage = current_usage()
+        if usage is not None:
+            score = result[1] if name == 'critic' else None
+            usage.record(name, seconds, approx_tokens(*args, *kwargs.values(), result), score)
+        listener = stage_listener()
+        if listener is not None:
+            listener(name, result, seconds)
+        progress = _progress.get()
+        if progress is not None:
+            progress['outputs'][name] = result
+        if checkpoint is not None:
+            checkpoint.record(checkpoint_key, name, result)
+        if self.memo is not None:
+            self.memo.put(key, result)
+        return result
+
+    def _is_repeat(self, text, previous):
+        return self.dedupe_threshold is not None and self.similarity.is_near_duplicate(text, previous, self.dedupe_threshold)
+
+    def _debate_round(self, query, thesis, current_position, debate_history, round_num):
+        con_arg = self._call('con_debate', query=query, current_position=current_position, supporting_arguments='\n'.join(debate_history))
+        debate_history.append(f"Con {round_num+1}: {con_arg}")
+        critique, score = self._call('critic', query=query, thesis=thesis, antithesis=con_arg, synthesis=current_position)
+        if score >= 0.9:
+            return current_position, score, True
+        pro_arg = self._call('pro_debate', query=query, current_position=current_position, opposing_arguments=con_arg)
+        debate_history.append(f"Pro {round_num+1}: {pro_arg}")
+        return pro_arg, score, False
+
+    def _converged(self, turn, debate_history):
+        # Novelty is one minus the turn's best cosine match among earlier turns, compared without their "Con 2: " labels
+        previous = [entry.split(': ', 1)[-1] for entry in debate_history]
+        return 1.0 - self.similarity.max_similarity(turn, previous) <= 1.0 - self.convergence_threshold
+
+    def _run_tournament(self, query, branches, max_rounds, prune_margin=0.2):
+        # `branches` is either a branch count (theses sampled at spread temperatures) or a list of opening theses
+        theses = list(branches) if isinstance(branches, (list, tuple)) else [None] * branches
+        if not theses:
+            raise ValueError(f"tournament needs at least one branch, got {branches!r}")
+
+        def open_branch(index):
+            thesis = theses[index]
+            if thesis is None:
+                with self._branch_context(index, len(theses)):
+                    thesis = self._call('thesis', query)
+            return {'index': index, 'thesis': thesis, 'position': thesis, 'history': [f"Thesis: {thesis}"], 'score': 0.0, 'done': False}
+
+        def advance(branch):
+            with self._branch_context(branch['index'], len(theses)):
+                branch['position'], branch['score'], branch['done'] = self._debate_round(
+                    query, branch['thesis'], branch['position'], branch['history'], round_num)
+            return branch
+
+        active = parallel_map(open_branch, range(len(theses)))
+        pruned = []
         for round_num in range(max_rounds):
-            con_arg = self.con_debate_agent(query=query, current_position=current_position, supporting_arguments='\n'.join(debate_history))
-            debate_history.append(f"Con {round_num+1}: {con_arg}")
-            critique, score = self.critic_agent(query=query, thesis=thesis, antithesis=con_arg, synthesis=current_position)
-            if score >= 0.9:
+            running = [branch for branch in active if not branch['done']]
+            if not running or self._out_of_time(4):
                 break
-            pro_arg = self.pro_debate_agent(query=query, current_position=current_position, opposing_arguments=con_arg)
-            current_position = pro_arg
-            debate_history.append(f"Pro {round_num+1}: {pro_arg}")
-        synthesis = self.synthesis_agent(query=query, thesis=thesis, antithesis='\n'.join(debate_history))
-        return dspy.Prediction(debate_history=debate_history, synthesis=synthesis)
-
-    def _run_experts(self, query, domains, max_iterations):
-        expert_opinions = {}
-        for domain in domains:
-            opinion = self.expert_agent(query=query, expertise_domain=domain, context='')
-            expert_opinions[domain] = opinion
-        combined_context = '\n'.join([f"{domain}: {op}" for domain, op in expert_opinions.items()])
-        synthesis = self.synthesis_agent(query=query, thesis=combined_context, antithesis='')
-        for _ in range(max_iterations):
-            critique, score = self.critic_agent(query=query, thesis=combined_context, antithesis='', synthesis=synthesis)
-            if score >= 0.8:
-                break
-            for domain in domains:
-                refined_op = self.expert_agent(query=query, expertise_domain=domain, context=critique)
-                expert_opinions[domain] = refined_op
-            combined_context = '\n'.join([f"{domain}: {op}" for domain, op in expert_opinions.items()])
-            synthesis = self.synthesis_agent(query=query, thesis=combined_context, antithesis='')
-        return dspy.Prediction(expert_opinions=expert_opinions, synthesis=synthesis)
+            parallel_map(advance, running)
+            # Drop branches trailing the current leader by more than prune_margin
+            best = max(branch['score'] for branch in active)
+            pruned.extend(branch for branch in active if branch['score'] < best - prune_margin)
+            active = [branch for branch in active if branch['score'] >= best - prune_margin]
+        active.sort(key=lambda branch: branch['score'], reverse=True)
+        thesis = '\n'.join(f"Branch {branch['index']+1}: {branch['thesis']}" for branch in active)
+        antithesis = '\n\n'.join('\n'.join(branch['history']) for branch in active)
+        synthesis = self._call('synthesis', query=query, thesis=thesis, antithesis=antithesis)
+        return dspy.Prediction(
+            debate_history=active[0]['history'],
+            branch_histories={branch['index']: branch['history'] for branch in active},
+            branch_scores={branch['index']: branch['score'] for branch in active + pruned},
+            pruned=sorted(branch['index'] for branch in pruned),
+            synthesis=synthesis,
+        )
+
+    def _branch_context(self, index, count):
+        if count <= 1:
+            return contextlib.nullcontext()
+        # Spread temperatures over [0.7, 1.0] and give each branch its own rollout so samples differ
+        return self._rollout_context(rollout_id=index, temperature=0.7 + 0.3 * index / (count - 1))
+
+    def _rollout_context(self, rollout_id, temperature):
+        lm = dspy.settings.lm
+        if lm is None:
+            return contextlib.nullcontext()
+        return dspy.context(lm=lm.copy(temperature=temperature, rollout_id=rollout_id))
+
+    def _revise(self, query, synthesis, changes):
+        counters.increment('delta_syntheses')
+        return self._call('revision', query=query, previous_synthesis=synthesis, changes=changes)
+
+    def _opinion(self, query, domain, context=''):
+        if context or self.retrieval is None:
+            return self._call('expert', query=query, expertise_domain=domain, context=context)
+        return self._first_opinion(query, domain)
+
+    def _thesis(self, query):
+        if self.retrieval is None:
+            return self._call('thesis', query)
+        score, match = self.retrieval.best('thesis', query, version=self.version)
+        if match is not None and score >= self.reuse_threshold:
+            self.retrieval.count('reused')
+            counters.increment('retrieval_reused')
+            metrics.cache_lookups.inc('retrieval', 'hit')
+            return match['text']
+        metrics.cache_lookups.inc('retrieval', 'miss')
+        thesis = self._call('thesis', query)
+        self.retrieval.add('thesis', query, thesis, version=self.version)
+        return thesis
+
+    def _first_opinion(self, query, domain):
+        score, match = self.retrieval.best('expert', query, domain=domain, version=self.version)
+        if match is not None and score >= self.reuse_threshold:
+            self.retrieval.count('reused')
+            counters.increment('retrieval_reused')
+            metrics.cache_lookups.inc('retrieval', 'hit')
+            return match['text']
+        context = ''
+        if match is not None and score >= self.seed_threshold:
+            self.retrieval.count('seeded')
+            counters.increment('retrieval_seeded')
+            metrics.cache_lookups.inc('retrieval', 'seeded')
+            context = f"Your opinion on the related question \"{match['query']}\": {match['text']}"
+        else:
+            metrics.cache_lookups.inc('retrieval', 'miss')
+        opinion = self._call('expert', query=query, expertise_domain=domain, context=context)
+        self.retrieval.add('expert', query, opinion, domain=domain, version=self.version)
+        return opinion
+
+    def _synthesize_opinions(self, query, expert_opinions, fan_in=None):
+        # Returns the entries of the final synthesis prompt (opinions, or panel summaries with fan_in) and the synthesis
+        entries = [f"{domain}: {op}" for domain, op in expert_opinions.items()]
+        # Map-reduce: synthesize panels of at most fan_in entries in parallel until one prompt fits them all
+        while fan_in and len(entries) > fan_in:
+            panels = [entries[i:i + fan_in] for i in range(0, len(entries), fan_in)]
+            summaries = parallel_map(lambda panel: self._call('synthesis', query=query, thesis='\n'.join(panel), antithesis=''), panels)
+            entries = [f"Panel {i+1}: {summary}" for i, summary in enumerate(summaries)]
+        synthesis = self._call('synthesis', query=query, thesis='\n'.join(entries), antithesis='')
+        return entries, synthesis
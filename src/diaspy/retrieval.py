@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import numpy as np
+from .similarity import HashingEmbedder, content_words, default_similarity
+
+class RetrievalIndex:
+    # Brute-force cosine index over the queries that produced earlier theses and expert opinions, so a paraphrased
+    # query can find them. Pure NumPy: one matrix product per lookup, which stays sub-millisecond into the tens of
+    # thousands of entries. Persisted to a single .npz (vectors plus JSON metadata) when `path` is given.
+    # Lexical vectors (the default HashingEmbedder) score "raise taxes" and "lower taxes" as close as real
+    # paraphrases, so with them a match must also use the same content words in the same order as the query; only
+    # rephrasings in function words, case or punctuation are found. Pass a semantic embedder to match paraphrases.
+    def __init__(self, path=None, similarity=None):
+        self.path = path
+        self.similarity = similarity or default_similarity
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._entries = []
+        self.lookups = 0
+        self.reused = 0
+        self.seeded = 0
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, kind, query, text, domain=None, version=None):
+        vector = self.similarity.embed([query])[0]
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((16, vector.shape[0]), dtype=np.float32)
+            elif len(self._entries) == self._vectors.shape[0]:
+                # Grow by doubling so adds stay amortized O(1)
+                self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+            self._vectors[len(self._entries)] = vector
+            self._entries.append({'kind': kind, 'query': query, 'text': text, 'domain': domain, 'version': version})
+
+    def search(self, kind, query, k=1, domain=None, version=None):
+        with self._lock:
+            self.lookups += 1
+            if not self._entries:
+                return []
+            vectors = self._vectors[:len(self._entries)]
+            entries = list(self._entries)
+        scores = vectors @ self.similarity.embed([query])[0]
+        mask = np.array([entry['kind'] == kind and entry['domain'] == domain and (version is None or entry['version'] == version)
+                         for entry in entries])
+        scores = np.where(mask, scores, -np.inf)
+        best = np.argsort(-scores)[:k]
+        return [(float(scores[i]), entries[i]) for i in best if np.isfinite(scores[i])]
+
+    def best(self, kind, query, domain=None, version=None):
+        matches = self.search(kind, query, 5 if self.lexical else 1, domain, version)
+        if self.lexical:
+            words = content_words(query)
+            matches = [(score, entry) for score, entry in matches if content_words(entry['query']) == words]
+        return matches[0] if matches else (0.0, None)
+
+    @property
+    def lexical(self):
+        return isinstance(self.similarity.embedder, HashingEmbedder)
+
+    def count(self, outcome):
+        # outcome is 'reused' or 'seeded'
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self):
+        return {'entries': len(self._entries), 'lookups': self.lookups, 'reused': self.reused, 'seeded': self.seeded,
+                'hit_rate': self.reused / self.lookups if self.lookups else 0.0}
+
+    def save(self, path=None):
+        path = path or self.path
+        with self._lock:
+            vectors = self._vectors[:len(self._entries)] if self._vectors is not None else np.zeros((0, 0), dtype=np.float32)
+            meta = json.dumps(self._entries)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, vectors=vectors, meta=np.array(meta))
+        os.replace(tmp, path)
+
+    def load(self, path):
+        with np.load(path) as data:
+            vectors = data['vectors']
+            entries = json.loads(str(data['meta']))
+        with self._lock:
+            self._vectors = vectors.astype(np.float32) if len(entries) else None
+            self._entries = entries
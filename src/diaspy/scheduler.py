@@ -0,0 +1,152 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import dspy
+
+_current = contextvars.ContextVar('diaspy_scheduler', default=None)
+
+def current_scheduler():
+    return _current.get()
+
+class _Task:
+    __slots__ = ('name', 'agent', 'args', 'kwargs', 'lm', 'context', 'future')
+
+    def __init__(self, name, agent, args, kwargs):
+        self.name = name
+        self.agent = agent
+        self.args = args
+        self.kwargs = kwargs
+        self.lm = dspy.settings.lm
+        self.context = contextvars.copy_context()
+        self.future = Future()
+
+class PipelineScheduler:
+    # Runs many dialectics at once and interleaves their agent calls, so while one query waits on its thesis another's
+    # critic is on the wire. Each query keeps its own stage order (every mode runs unchanged); the scheduler only decides
+    # which ready call goes out next, keeping up to max_in_flight LM requests outstanding.
+    # batchers maps an agent name to fn(agent, [(args, kwargs), ...]) -> results for backends with batched inference;
+    # queued calls to that agent under the same LM are then sent together as one request.
+    def __init__(self, responder, max_in_flight=8, max_queries=None, batchers=None, max_batch=8):
+        self.responder = responder
+        self.max_in_flight = max_in_flight
+        self.max_queries = max_queries
+        self.batchers = batchers or {}
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._reset()
+
+    def _reset(self):
+        self._in_flight = 0
+        self._busy = 0.0
+        self._last = self._started = self._finished = time.perf_counter()
+        self._stopping = False
+        self.queries = 0
+        self.tasks = 0
+        self.requests = 0
+        self.batched = 0
+
+    def run(self, queries, **forward_kwargs):
+        queries = list(queries)
+        if not queries:
+            return []
+        self._reset()
+        self.queries = len(queries)
+        pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='diaspy-lm')
+        loop = threading.Thread(target=self._loop, args=(pool,), daemon=True)
+        loop.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_queries or len(queries)) as runners:
+                futures = [runners.submit(contextvars.copy_context().run, self._run_query, query, forward_kwargs) for query in queries]
+                return [future.result() for future in futures]
+        finally:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify_all()
+            loop.join()
+            pool.shutdown()
+            self._finished = time.perf_counter()
+
+    def _run_query(self, query, forward_kwargs):
+        token = _current.set(self)
+        try:
+            return self.responder(query, **forward_kwargs)
+        finally:
+            _current.reset(token)
+
+    def dispatch(self, name, agent, *args, **kwargs):
+        # Called from a query's thread in place of agent(*args, **kwargs); blocks until the scheduler has run it
+        task = _Task(name, agent, args, kwargs)
+        with self._cond:
+            self._pending.append(task)
+            self.tasks += 1
+            self._cond.notify_all()
+        return task.future.result()
+
+    def _loop(self, pool):
+        while True:
+            with self._cond:
+                while not self._stopping and (not self._pending or self._in_flight >= self.max_in_flight):
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                group = self._take()
+                self._account(1)
+            pool.submit(self._execute, group)
+
+    def _take(self):
+        first = self._pending.popleft()
+        group = [first]
+        if first.name in self.batchers:
+            # Calls queue up while every slot is busy; gather the waiting calls to the same agent and LM into one batch
+            for task in list(self._pending):
+                if len(group) >= self.max_batch:
+                    break
+                if task.name == first.name and task.lm is first.lm:
+                    self._pending.remove(task)
+                    group.append(task)
+        return group
+
+    def _execute(self, group):
+        try:
+            if len(group) == 1:
+                task = group[0]
+                results = [task.context.run(task.agent, *task.args, **task.kwargs)]
+            else:
+                self.batched += len(group)
+                first = group[0]
+                results = first.context.run(self.batchers[first.name], first.agent, [(task.args, task.kwargs) for task in group])
+            for task, result in zip(group, results):
+                task.future.set_result(result)
+        except BaseException as exc:
+            for task in group:
+                if not task.future.done():
+                    task.future.set_exception(exc)
+        finally:
+            with self._cond:
+                self._account(-1)
+                self._cond.notify_all()
+
+    def _account(self, delta):
+        # Integrates requests-in-flight over time; caller holds the lock
+        now = time.perf_counter()
+        self._busy += self._in_flight * (now - self._last)
+        self._last = now
+        self._in_flight += delta
+        if delta > 0:
+            self.requests += 1
+
+    def stats(self):
+        elapsed = max(self._finished - self._started, 1e-9)
+        return {
+            'queries': self.queries,
+            'tasks': self.tasks,
+            'requests': self.requests,
+            'batched_tasks': self.batched,
+            'elapsed': elapsed,
+            'throughput': self.queries / elapsed,
+            'mean_in_flight': self._busy / elapsed,
+            'utilization': self._busy / (elapsed * self.max_in_flight),
+        }
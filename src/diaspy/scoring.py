@@ -0,0 +1,100 @@
+import re
+import threading
+
+_FRACTION = re.compile(r'(-?\d+(?:\.\d+)?)\s*(?:/|out of)\s*(\d+(?:\.\d+)?)')
+_PERCENT = re.compile(r'(-?\d+(?:\.\d+)?)\s*%')
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+
+def parse_score(value):
+    """Parse an LM-produced score into a float in [0.0, 1.0], or None if no score can be found.
+
+    Accepts native numbers as well as strings such as "0.8", "8/10", "80%", "0.8 out of 1" or "Score: 7".
+    Bare numbers, native or in a string, above 1 are read as marks out of 10 (or out of 100 when above 10).
+    """
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        score = _marks(float(value))
+    else:
+        text = str(value).strip().lower()
+        match = _FRACTION.search(text)
+        if match:
+            den = float(match.group(2))
+            if den == 0:
+                return None
+            score = float(match.group(1)) / den
+        else:
+            match = _PERCENT.search(text)
+            if match:
+                score = float(match.group(1)) / 100
+            else:
+                match = _NUMBER.search(text)
+                if not match:
+                    return None
+                score = _marks(float(match.group(0)))
+    if score != score:  # NaN
+        return None
+    # Clamp score to [0.0, 1.0]
+    return max(0.0, min(1.0, score))
+
+def _marks(score):
+    if 1.0 < score <= 10.0:
+        return score / 10
+    if 10.0 < score <= 100.0:
+        return score / 100
+    return score
+
+class ScoreStats:
+    # Counts also go to `parent`, so a per-scorer ScoreStats still adds up in the process-wide one
+    def __init__(self, parent=None):
+        self.parent = parent
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.parsed = 0
+            self.retries = 0
+            self.fallbacks = 0
+
+    def record(self, parsed=0, retries=0, fallbacks=0):
+        with self._lock:
+            self.parsed += parsed
+            self.retries += retries
+            self.fallbacks += fallbacks
+        if self.parent is not None:
+            self.parent.record(parsed, retries, fallbacks)
+
+    @property
+    def fallback_rate(self):
+        total = self.parsed + self.fallbacks
+        return self.fallbacks / total if total else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return {'parsed': self.parsed, 'retries': self.retries, 'fallbacks': self.fallbacks, 'fallback_rate': self.fallback_rate}
+
+# Process-wide counters shared by every scorer (critic, QC, ...)
+score_stats = ScoreStats()
+# CriticAgent's share of score_stats
+critic_score_stats = ScoreStats(parent=score_stats)
+
+def predict_score(predict, retries=1, default=0.5, stats=None, **inputs):
+    """Run `predict(**inputs)` and parse its `score` field, re-asking only when no score can be parsed.
+
+    Returns `(prediction, score)`; falls back to `default` once `retries` re-asks have failed.
+    """
+    stats = stats or score_stats
+    prediction = predict(**inputs)
+    score = parse_score(getattr(prediction, 'score', None))
+    attempt = 0
+    while score is None and attempt < retries:
+        attempt += 1
+        # A fresh rollout id bypasses the LM cache so the re-ask is a real second sample
+        prediction = predict(config={'rollout_id': attempt}, **inputs)
+        score = parse_score(getattr(prediction, 'score', None))
+    if score is None:
+        stats.record(retries=attempt, fallbacks=1)
+        return prediction, default
+    stats.record(parsed=1, retries=attempt)
+    return prediction, score
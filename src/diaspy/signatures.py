@@ -21,6 +21,14 @@ class SynthesisSignature(dspy.Signature):
     antithesis: str = dspy.InputField()
     synthesis: str = dspy.OutputField()
 
+class RevisionSignature(dspy.Signature):
+    """Revise an existing synthesis to account for changed inputs, keeping what still holds and reworking only what the changes affect, grounded in logical reasoning and truth-seeking."""
+
+    query: str = dspy.InputField()
+    previous_synthesis: str = dspy.InputField()
+    changes: str = dspy.InputField(desc="Only the inputs that changed since the previous synthesis")
+    synthesis: str = dspy.OutputField()
+
 class CriticSignature(dspy.Signature):
     """Critique the synthesis for factual accuracy, logical consistency, and balance, providing a score and feedback. Inspired by Popper's falsifiability and cybernetic negative feedback. Output score as a decimal float between 0.0 and 1.0."""
 
@@ -29,7 +37,7 @@ class CriticSignature(dspy.Signature):
     antithesis: str = dspy.InputField()
     synthesis: str = dspy.InputField()
     critique: str = dspy.OutputField()
-    score: float = dspy.OutputField(desc="Decimal float between 0.0 and 1.0")
+    score: str = dspy.OutputField(desc="Decimal float between 0.0 and 1.0, e.g. 0.8")
 
 class ProArgumentSignature(dspy.Signature):
     """Generate supporting arguments for a position in a debate, maintaining logical reasoning and truthfulness."""
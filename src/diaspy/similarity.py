@@ -0,0 +1,86 @@
+import re
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+# Words that can change between two phrasings of one question. Negations are deliberately absent.
+FUNCTION_WORDS = frozenset("""
+    a an the this that these those it its to for of in on at by with from about as into than and or
+    is are was were be been being do does did has have had should would could can will shall may might must
+    we you i they he she one our your their us them
+""".split())
+
+def content_words(text):
+    # In order: "the rich pay more than the poor" and "the poor pay more than the rich" are different questions
+    return tuple(token for token in _TOKEN.findall(str(text).lower()) if token not in FUNCTION_WORDS)
+
+class HashingEmbedder:
+    # Local embedding with no model download: signed feature hashing of word unigrams and bigrams.
+    # Any callable mapping a list of texts to an (n, dim) array can replace it, e.g. a dspy.Embedder.
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def __call__(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN.findall(str(text).lower())
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                digest = zlib.crc32(feature.encode())
+                vectors[row, digest % self.dim] += 1.0 if digest & 0x80000000 else -1.0
+        return vectors
+
+class Similarity:
+    def __init__(self, embedder=None, cache_size=4096):
+        self.embedder = embedder or HashingEmbedder()
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        texts = [str(text) for text in texts]
+        vectors = {}
+        with self._lock:
+            for text in texts:
+                vector = self._cache.get(text)
+                if vector is not None:
+                    self._cache.move_to_end(text)
+                    vectors[text] = vector
+        missing = [text for text in dict.fromkeys(texts) if text not in vectors]
+        if missing:
+            computed = np.asarray(self.embedder(missing), dtype=np.float32)
+            norms = np.linalg.norm(computed, axis=1, keepdims=True)
+            computed = computed / np.where(norms == 0, 1.0, norms)
+            vectors.update(zip(missing, computed))
+            with self._lock:
+                self._cache.update(zip(missing, computed))
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return np.stack([vectors[text] for text in texts]) if texts else np.zeros((0, 0), dtype=np.float32)
+
+    def matrix(self, texts, others=None):
+        # Cosine similarity of every text against every other, in one batched product
+        a = self.embed(texts)
+        b = a if others is None else self.embed(others)
+        return a @ b.T
+
+    def similarity(self, text, other):
+        return float(self.matrix([text], [other])[0, 0])
+
+    def max_similarity(self, text, others):
+        others = list(others)
+        return float(self.matrix([text], others).max()) if others else 0.0
+
+    def is_near_duplicate(self, text, others, threshold=0.95):
+        return self.max_similarity(text, others) >= threshold
+
+    def has_near_duplicates(self, texts, threshold=0.95):
+        texts = list(texts)
+        if len(texts) < 2:
+            return False
+        sims = self.matrix(texts)
+        return bool((np.triu(sims, k=1) >= threshold).any())
+
+# Shared by the responder, metrics and QC so embeddings of the same text are computed once per process
+default_similarity = Similarity()
@@ -0,0 +1,140 @@
+import abc
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+def artifact_version(*modules):
+    # Fingerprint of the compiled agents' state (demos, instructions); recompiling changes it
+    digest = hashlib.sha256()
+    for module in modules:
+        try:
+            state = module.dump_state()
+        except Exception:
+            state = type(module).__name__
+        digest.update(json.dumps(state, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+def encode_result(result):
+    # JSON object keys are strings, so dicts with other keys (a tournament's branch indices) are stored as item lists
+    return json.dumps(_tagged(result), default=str)
+
+def decode_result(text):
+    return json.loads(text, object_hook=lambda obj: {key: value for key, value in obj['__items__']} if list(obj) == ['__items__'] else obj)
+
+def _tagged(value):
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: _tagged(item) for key, item in value.items()}
+        return {'__items__': [[key, _tagged(item)] for key, item in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [_tagged(item) for item in value]
+    return value
+
+def result_key(query, mode, params, version):
+    payload = json.dumps({'query': query, 'mode': mode, 'params': params, 'version': version}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResultStore(abc.ABC):
+    @abc.abstractmethod
+    def get(self, key):
+        pass
+
+    @abc.abstractmethod
+    def put(self, key, query, mode, params, version, result):
+        pass
+
+    @abc.abstractmethod
+    def invalidate(self, version=None, keep_version=None, older_than=None):
+        pass
+
+    @abc.abstractmethod
+    def query(self, mode=None, version=None, since=None, limit=None):
+        pass
+
+    @abc.abstractmethod
+    def stats(self):
+        pass
+
+class SQLiteResultStore(ResultStore):
+    def __init__(self, path='diaspy_results.db', ttl=None):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    mode TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    version TEXT,
+                    created REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    result TEXT NOT NULL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_mode ON results (mode, created)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_version ON results (version)")
+
+    def get(self, key):
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT result, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and time.time() - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE results SET hits = hits + 1 WHERE key = ?", (key,))
+        return decode_result(row[0])
+
+    def put(self, key, query, mode, params, version, result):
+        row = (key, query, mode, json.dumps(params, sort_keys=True, default=str), version, time.time(), encode_result(result))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, query, mode, params, version, created, result) VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+
+    def invalidate(self, version=None, keep_version=None, older_than=None):
+        clauses, args = [], []
+        if version is not None:
+            clauses.append("version = ?")
+            args.append(version)
+        if keep_version is not None:
+            clauses.append("(version IS NULL OR version != ?)")
+            args.append(keep_version)
+        if older_than is not None:
+            clauses.append("created < ?")
+            args.append(time.time() - older_than)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM results" + where, args).rowcount
+
+    def query(self, mode=None, version=None, since=None, limit=None):
+        clauses, args = [], []
+        for column, value in (("mode = ?", mode), ("version = ?", version), ("created >= ?", since)):
+            if value is not None:
+                clauses.append(column)
+                args.append(value)
+        sql = "SELECT query, mode, params, version, created, hits, result FROM results"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [
+            {'query': query, 'mode': mode, 'params': json.loads(params), 'version': version, 'created': created, 'hits': hits, 'result': decode_result(result)}
+            for query, mode, params, version, created, hits, result in rows
+        ]
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT mode, COUNT(*), SUM(hits) FROM results GROUP BY mode").fetchall()
+        return {mode: {'results': count, 'hits': hits or 0} for mode, count, hits in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import dspy
+from dspy.teleprompt import LabeledFewShot
+from .parallel import parallel_map
+
+logger = logging.getLogger(__name__)
+
+class TeacherCache:
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS teacher_outputs (key TEXT PRIMARY KEY, success INTEGER NOT NULL, steps TEXT NOT NULL)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT success, steps FROM teacher_outputs WHERE key = ?", (key,)).fetchone()
+        return None if row is None else (bool(row[0]), json.loads(row[1]))
+
+    def put(self, key, success, steps):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO teacher_outputs (key, success, steps) VALUES (?, ?, ?)",
+                               (key, int(success), json.dumps(steps, default=str)))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM teacher_outputs").fetchone()[0]
+
+class CachedBootstrapFewShot:
+    # Drop-in for BootstrapFewShot: teacher runs are evaluated concurrently and cached per (signature, demos the teacher
+    # sees, example, LM), so a recompile only pays for examples that are new or changed or whose labeled demos changed.
+    # Teacher errors are not cached.
+    def __init__(self, metric=None, metric_threshold=None, max_bootstrapped_demos=4, max_labeled_demos=16, num_threads=8, cache=None):
+        self.metric = metric
+        self.metric_threshold = metric_threshold
+        self.max_bootstrapped_demos = max_bootstrapped_demos
+        self.max_labeled_demos = max_labeled_demos
+        self.num_threads = num_threads
+        self.cache = cache if cache is not None else TeacherCache()
+        self.reports = []
+
+    def compile(self, student, *, teacher=None, trainset):
+        started = time.perf_counter()
+        student = student.reset_copy()
+        teacher = teacher.deepcopy() if teacher is not None else student.deepcopy()
+        if self.max_labeled_demos and not getattr(teacher, '_compiled', False):
+            teacher = LabeledFewShot(k=self.max_labeled_demos).compile(teacher.reset_copy(), trainset=trainset)
+        signature_key = self._signature_key(student)
+        counts = {'hits': 0, 'misses': 0}
+        lock = threading.Lock()
+
+        def evaluate(example):
+            key = self._example_key(signature_key, self._visible_demos(teacher, example), example)
+            cached = self.cache.get(key)
+            with lock:
+                counts['hits' if cached is not None else 'misses'] += 1
+            if cached is not None:
+                return cached
+            result = self._run_teacher(teacher, example)
+            if result is None:
+                # An error (often a transient LM or network failure) says nothing about the example; retry it next compile
+                return False, {}
+            self.cache.put(key, *result)
+            return result
+
+        traces = {name: [] for name, _ in student.named_predictors()}
+        bootstrapped = set()
+        for offset in range(0, len(trainset), self.num_threads):
+            if len(bootstrapped) >= self.max_bootstrapped_demos:
+                break
+            batch = trainset[offset:offset + self.num_threads]
+            for index, (success, steps) in enumerate(parallel_map(evaluate, batch, max_workers=self.num_threads), start=offset):
+                if not success or len(bootstrapped) >= self.max_bootstrapped_demos:
+                    continue
+                bootstrapped.add(index)
+                for name, demo in steps.items():
+                    traces[name].append(dspy.Example(augmented=True, **demo))
+
+        validation = [example for index, example in enumerate(trainset) if index not in bootstrapped]
+        random.Random(0).shuffle(validation)
+        rng = random.Random(0)
+        for name, predictor in student.named_predictors():
+            augmented = traces[name][:self.max_bootstrapped_demos]
+            sample_size = max(0, min(self.max_labeled_demos - len(augmented), len(validation)))
+            predictor.demos = augmented + rng.sample(validation, sample_size)
+        student._compiled = True
+        self.reports.append({'agent': type(student).__name__, 'examples': len(trainset), 'bootstrapped': len(bootstrapped),
+                             'cache_hits': counts['hits'], 'cache_misses': counts['misses'], 'seconds': time.perf_counter() - started})
+        return student
+
+    def _run_teacher(self, teacher, example):
+        # Private copy per example: filtering the example out of the teacher's demos must not race other threads
+        teacher = teacher.deepcopy()
+        demos = self._visible_demos(teacher, example)
+        predictor2name = {}
+        for name, predictor in teacher.named_predictors():
+            predictor.demos = demos[name]
+            predictor2name[id(predictor)] = name
+        try:
+            with dspy.context(trace=[]):
+                prediction = teacher(**example.inputs())
+                trace = dspy.settings.trace
+            if self.metric is None:
+                success = True
+            elif self.metric_threshold is not None:
+                success = self.metric(example, prediction, trace) >= self.metric_threshold
+            else:
+                success = bool(self.metric(example, prediction, trace))
+        except Exception as e:
+            logger.error(f"Failed to bootstrap example {example}: {e}")
+            return None
+        steps = {}
+        for predictor, inputs, outputs in trace:
+            name = predictor2name.get(id(predictor))
+            if name is not None:
+                steps[name] = {**inputs, **outputs}
+        return bool(success), steps
+
+    def _visible_demos(self, teacher, example):
+        # The teacher's demos for one example: never the example itself, so it cannot copy the answer
+        return {name: [demo for demo in predictor.demos if demo != example] for name, predictor in teacher.named_predictors()}
+
+    def _signature_key(self, student):
+        lm = dspy.settings.lm
+        return [type(student).__name__, getattr(self.metric, '__name__', repr(self.metric)), self.metric_threshold,
+                getattr(lm, 'model', None), [(name, predictor.signature.signature, predictor.signature.instructions)
+                                             for name, predictor in student.named_predictors()]]
+
+    def _example_key(self, signature_key, demos, example):
+        # Teacher outputs depend on the demos it sees for this example as well as the signatures, metric and LM
+        demos = {name: [demo.toDict() for demo in visible] for name, visible in demos.items()}
+        payload = json.dumps([signature_key, demos, example.toDict(), sorted(example.inputs().keys())], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+def timing_report(full_reports, incremental_reports):
+    lines = [f"{'agent':<20}{'full s':>10}{'incr s':>10}{'misses':>10}{'hits':>8}"]
+    for full, incremental in zip(full_reports, incremental_reports):
+        lines.append(f"{full['agent']:<20}{full['seconds']:>10.3f}{incremental['seconds']:>10.3f}"
+                     f"{incremental['cache_misses']:>10}{incremental['cache_hits']:>8}")
+    full_total = sum(report['seconds'] for report in full_reports)
+    incremental_total = sum(report['seconds'] for report in incremental_reports)
+    lines.append(f"{'total':<20}{full_total:>10.3f}{incremental_total:>10.3f}"
+                 f"{'':>10}{'':>8}  speedup x{full_total / incremental_total if incremental_total else float('inf'):.1f}")
+    return '\n'.join(lines)
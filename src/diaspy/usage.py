@@ -0,0 +1,91 @@
+import contextlib
+import contextvars
+import threading
+import time
+
+_current = contextvars.ContextVar('diaspy_usage', default=None)
+_listener = contextvars.ContextVar('diaspy_stage_listener', default=None)
+
+def approx_tokens(*values):
+    # Rough 4-characters-per-token estimate; good enough for budgeting without a tokenizer
+    return sum(len(str(value)) for value in values) // 4
+
+class Usage:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.calls = {}
+        self.seconds = {}
+        self.tokens = 0
+        self.scores = []
+
+    def record(self, agent, seconds, tokens=0, score=None):
+        with self._lock:
+            self.calls[agent] = self.calls.get(agent, 0) + 1
+            self.seconds[agent] = self.seconds.get(agent, 0.0) + seconds
+            self.tokens += tokens
+            if score is not None:
+                self.scores.append(score)
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def last_score(self):
+        return self.scores[-1] if self.scores else None
+
+    def snapshot(self):
+        with self._lock:
+            return {'calls': self.total_calls, 'latency': self.elapsed, 'tokens': self.tokens, 'score': self.last_score, 'agents': dict(self.calls)}
+
+def current_usage():
+    return _current.get()
+
+@contextlib.contextmanager
+def track_usage():
+    usage = Usage()
+    token = _current.set(usage)
+    try:
+        yield usage
+    finally:
+        _current.reset(token)
+
+def stage_listener():
+    return _listener.get()
+
+@contextlib.contextmanager
+def on_stage(callback):
+    # callback(agent, result, seconds) runs as each agent call in this context completes, e.g. to stream stages
+    token = _listener.set(callback)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+class Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + value
+
+    def __getitem__(self, name):
+        return self._values.get(name, 0)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+# Process-wide event counts (refinement short-circuits, re-samples, ...)
+counters = Counters()
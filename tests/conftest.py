@@ -0,0 +1,14 @@
+import pytest
+from unittest.mock import MagicMock
+
+@pytest.fixture
+def mock_agents():
+    return {
+        'thesis': MagicMock(return_value='Mock thesis'),
+        'antithesis': MagicMock(return_value='Mock antithesis'),
+        'synthesis': MagicMock(return_value='Mock synthesis'),
+        'critic': MagicMock(return_value=('Mock critique', 0.9)),
+        'pro_debate': MagicMock(return_value='Mock pro'),
+        'con_debate': MagicMock(return_value='Mock con'),
+        'expert': MagicMock(return_value='Mock opinion')
+    }
@@ -0,0 +1,47 @@
+import functools
+from concurrent.futures import Future
+import dspy
+import pytest
+from diaspy.agents import AGENT_CLASSES
+from diaspy.backends import ProcessBackend, ThreadBackend, _then, load_artifact, save_artifact
+from diaspy.fakes import FakeLM
+from diaspy.responders import DialecticResponder
+from unittest.mock import MagicMock
+
+def test_artifact_roundtrip(tmp_path):
+    agents = {key: agent_class() for key, agent_class in AGENT_CLASSES.items()}
+    agents['thesis'].generate.predict.demos = [dspy.Example(query='q', thesis='t')]
+    path = str(tmp_path / 'agents.json')
+    save_artifact(agents, path)
+    loaded = load_artifact(path)
+    assert set(loaded) == set(AGENT_CLASSES)
+    assert loaded['thesis'].generate.predict.demos[0]['thesis'] == 't'
+
+def test_chained_future_fails_when_conversion_raises():
+    source = Future()
+    chained = _then(source, lambda result: dspy.Prediction(**result))
+    source.set_result(['not', 'a', 'dict'])
+    with pytest.raises(TypeError):
+        chained.result(timeout=1)
+
+def test_thread_backend_map():
+    responder = DialecticResponder(thesis=MagicMock(return_value='T'), antithesis=MagicMock(return_value='A'),
+                                   synthesis=MagicMock(return_value='S'), critic=MagicMock(return_value=('C', 0.9)))
+    backend = ThreadBackend(responder, max_workers=4)
+    predictions = backend.map(['q1', 'q2', 'q3'], mode='binary')
+    backend.shutdown()
+    assert [prediction.synthesis for prediction in predictions] == ['S', 'S', 'S']
+
+def test_process_backend_runs_dialectics_and_agent_calls(tmp_path):
+    path = str(tmp_path / 'agents.json')
+    save_artifact({key: agent_class() for key, agent_class in AGENT_CLASSES.items()}, path)
+    backend = ProcessBackend(path, functools.partial(FakeLM, score='0.95'), max_workers=1)
+    try:
+        prediction = backend.submit('Is AI good?', mode='binary').result(timeout=60)
+        critique, score = backend.agent('critic')('q', 't', 'a', 's')
+    finally:
+        backend.shutdown()
+    assert isinstance(prediction, dspy.Prediction)
+    assert prediction.synthesis.startswith('Synthesis')
+    assert len(prediction.critiques) == 1
+    assert score == 0.95
@@ -0,0 +1,98 @@
+import time
+import pytest
+from diaspy.checkpoints import RunInProgress, SQLiteCheckpointStore
+from diaspy.responders import DialecticResponder
+from diaspy.usage import counters
+
+def fails_once_at(call, answers):
+    # Answers in order, raising instead on the call-th call (1-based) the first time it is reached
+    answers, calls = iter(answers), [0]
+
+    def answer(**kwargs):
+        calls[0] += 1
+        if calls[0] == call:
+            raise TimeoutError('LM timed out')
+        return next(answers)
+    return answer
+
+def test_checkpoint_store_roundtrip():
+    store = SQLiteCheckpointStore(':memory:')
+    checkpoint = store.open('run', 'q', 'debate', {'max_rounds': 3})
+    key = checkpoint.key('critic', (), {'query': 'q'})
+    assert checkpoint.key('critic', (), {'query': 'q'}) != key
+    checkpoint.record(key, 'critic', ('Mock critique', 0.5))
+    checkpoint.record(checkpoint.key('listing', (), {}), 'listing', ['a', 'b'])
+    with pytest.raises(RunInProgress):
+        store.open('run', 'q', 'debate', {'max_rounds': 3})
+    store.fail('run', TimeoutError('LM timed out'))
+    [run] = store.runs()
+    assert run['params'] == {'max_rounds': 3} and run['calls'] == 2 and run['status'] == 'failed'
+    assert run['error'] == 'TimeoutError: LM timed out'
+    with pytest.raises(ValueError, match='different query'):
+        store.open('run', 'other query', 'debate', {'max_rounds': 3})
+    resumed = store.open('run', 'q', 'debate', {'max_rounds': 3})
+    assert resumed.replay(resumed.key('critic', (), {'query': 'q'})) == ('Mock critique', 0.5)
+    assert resumed.replay(resumed.key('listing', (), {})) == ['a', 'b']
+    assert store.run('run')['attempts'] == 2 and store.run('run')['error'] is None
+    store.clear('run')
+    assert store.runs() == [] and store.run('run') is None
+
+def test_checkpoint_store_prunes_inactive_runs(monkeypatch):
+    store = SQLiteCheckpointStore(':memory:', ttl=60)
+    store.open('old', 'q', 'binary', {})
+    store.fail('old', 'deadline reached before the run completed')
+    now = time.time()
+    monkeypatch.setattr('diaspy.checkpoints.time.time', lambda: now + 61)
+    store.open('new', 'q', 'binary', {})
+    assert [run['run_id'] for run in store.runs()] == ['new']
+    monkeypatch.setattr('diaspy.checkpoints.time.time', lambda: now + 200)
+    assert store.prune(60) == 1 and store.runs() == []
+
+def test_failed_debate_resumes_from_last_call(mock_agents):
+    counters.reset()
+    cons = ['Markets fail the poor', 'Prices ignore pollution', 'Monopolies form']
+    pros = ['Growth lifts everyone', 'Innovation offsets harm', 'Trade spreads ideas']
+    mock_agents['critic'].return_value = ('Mock critique', 0.5)
+    mock_agents['con_debate'].side_effect = lambda **kwargs: cons[mock_agents['con_debate'].call_count - 1]
+    mock_agents['pro_debate'].side_effect = fails_once_at(3, pros)
+    store = SQLiteCheckpointStore(':memory:')
+    responder = DialecticResponder(**mock_agents, checkpoints=store)
+    with pytest.raises(TimeoutError):
+        responder('Test query', mode='debate', max_rounds=3, run_id='debate-1')
+    assert store.run('debate-1')['calls'] == 1 + 3 + 3 + 1 + 1
+    calls = {name: agent.call_count for name, agent in mock_agents.items()}
+    mock_agents['con_debate'].side_effect = lambda **kwargs: cons[2]
+    prediction = responder('Test query', mode='debate', max_rounds=3, run_id='debate-1')
+    # Only the failed rebuttal and the closing synthesis reach the LM again
+    assert {name: agent.call_count - calls[name] for name, agent in mock_agents.items() if agent.call_count > calls[name]} == {
+        'pro_debate': 1, 'synthesis': 1}
+    assert prediction.debate_history == ['Thesis: Mock thesis', 'Con 1: Markets fail the poor', 'Pro 1: Growth lifts everyone',
+                                         'Con 2: Prices ignore pollution', 'Pro 2: Innovation offsets harm', 'Con 3: Monopolies form',
+                                         'Pro 3: Trade spreads ideas']
+    assert counters.snapshot()['checkpoint_replays'] == 9 and counters.snapshot()['checkpoint_resumes'] == 1
+    assert store.runs() == []
+
+def test_resume_experts_run_by_id(mock_agents):
+    mock_agents['critic'].side_effect = fails_once_at(1, [('Mock critique', 0.5), ('Mock critique', 0.9)])
+    mock_agents['expert'].side_effect = lambda query, expertise_domain, context: f'{expertise_domain} opinion {bool(context)}'
+    store = SQLiteCheckpointStore(':memory:')
+    responder = DialecticResponder(**mock_agents, checkpoints=store)
+    with pytest.raises(TimeoutError):
+        responder('Test query', mode='experts', domains=['science', 'art'], run_id='job-1')
+    assert [run['run_id'] for run in store.runs()] == ['job-1']
+    prediction = responder.resume('job-1')
+    assert prediction.expert_opinions == {'science': 'science opinion True', 'art': 'art opinion True'}
+    assert mock_agents['expert'].call_count == 4 and mock_agents['synthesis'].call_count == 2
+    assert store.runs() == []
+    with pytest.raises(KeyError):
+        responder.resume('job-1')
+
+def test_calls_without_run_id_are_separate_runs(mock_agents):
+    mock_agents['synthesis'].side_effect = TimeoutError('LM timed out')
+    store = SQLiteCheckpointStore(':memory:')
+    responder = DialecticResponder(**mock_agents, checkpoints=store)
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            responder('Test query', mode='binary')
+    # Identical requests never share (or clear) each other's checkpoint
+    assert len(store.runs()) == 2 and mock_agents['thesis'].call_count == 2
@@ -0,0 +1,37 @@
+import io
+import json
+from diaspy.cli import compare, main, run_mode
+from diaspy.responders import DialecticResponder
+
+def test_run_mode_streams_stages(mock_agents):
+    stages = []
+    run = run_mode(DialecticResponder(**mock_agents), 'Test query', 'binary', emit=lambda mode, agent, result: stages.append((mode, agent)))
+    assert run['error'] is None
+    assert run['prediction'].synthesis == 'Mock synthesis'
+    assert stages == [('binary', 'thesis'), ('binary', 'antithesis'), ('binary', 'synthesis'), ('binary', 'critic')]
+    assert run['stats']['calls'] == 4
+
+def test_run_mode_reports_errors(mock_agents):
+    mock_agents['thesis'].side_effect = RuntimeError('LM down')
+    run = run_mode(DialecticResponder(**mock_agents), 'Test query', 'binary')
+    assert run['prediction'] is None
+    assert run['error'] == 'LM down'
+
+def test_compare_runs_every_mode(mock_agents):
+    out = io.StringIO()
+    runs = compare(DialecticResponder(**mock_agents), 'Test query', out=out)
+    assert [run['mode'] for run in runs] == ['binary', 'debate', 'experts']
+    text = out.getvalue()
+    assert '[debate] Con debate: Mock con' in text
+    assert '[experts] Expert: Mock opinion' in text
+    assert 'Critique (0.90): Mock critique' in text
+
+def test_batch_writes_jsonl(tmp_path, capsys):
+    queries = tmp_path / 'queries.txt'
+    queries.write_text('Is AI beneficial?\n\n{"query": "Should we colonize Mars?", "mode": "debate"}\n')
+    output = tmp_path / 'out.jsonl'
+    main(['--fake', '--compare', '--batch', str(queries), '--output', str(output)])
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted((record['index'], record['mode']) for record in records) == [(0, 'binary'), (0, 'debate'), (0, 'experts'), (1, 'debate')]
+    assert all(record['result']['synthesis'] and record['calls'] > 0 for record in records)
+    assert 'debate' in capsys.readouterr().err
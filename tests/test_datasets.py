@@ -0,0 +1,31 @@
+import json
+import pytest
+from diaspy.datasets import index_by_agent, load_trainset
+
+@pytest.fixture
+def jsonl_path(tmp_path):
+    path = tmp_path / 'train.jsonl'
+    records = [{'query': f'q{i}', 'thesis': f't{i}'} for i in range(20)]
+    records.append({'query': 'q', 'thesis': 't', 'antithesis': 'a', 'synthesis': 's'})
+    records.append({'query': 'q', 'expertise_domain': 'science', 'context': '', 'opinion': 'o', 'inputs': ['query', 'expertise_domain']})
+    path.write_text('\n'.join(json.dumps(record) for record in records) + '\n')
+    return str(path)
+
+def test_load_trainset_infers_inputs(jsonl_path):
+    examples = list(load_trainset(jsonl_path))
+    assert len(examples) == 22
+    assert set(examples[0].inputs().keys()) == {'query'}
+    assert set(examples[20].inputs().keys()) == {'query', 'thesis', 'antithesis'}
+    assert set(examples[21].inputs().keys()) == {'query', 'expertise_domain'}
+
+def test_load_trainset_shards_are_disjoint(jsonl_path):
+    shards = [list(load_trainset(jsonl_path, shard=i, num_shards=3)) for i in range(3)]
+    assert sum(len(shard) for shard in shards) == 22
+    assert len(list(load_trainset(jsonl_path, sample=0.5, seed=1))) < 22
+
+def test_index_by_agent_single_pass(jsonl_path):
+    index = index_by_agent(load_trainset(jsonl_path), limit=5)
+    assert len(index['thesis']) == 5
+    assert [len(index[agent]) for agent in ('synthesis', 'critic', 'expert', 'pro_debate')] == [1, 1, 1, 0]
+    assert set(index['critic'][0].inputs().keys()) == {'query', 'thesis', 'antithesis', 'synthesis'}
+    assert set(index['expert'][0].inputs().keys()) == {'query', 'expertise_domain', 'context'}
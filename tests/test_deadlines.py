@@ -0,0 +1,88 @@
+import threading
+import time
+import pytest
+from diaspy.deadlines import Deadline, DeadlineExceeded, deadline_scope, current_deadline
+from diaspy.responders import DialecticResponder
+from diaspy.store import SQLiteResultStore
+
+def slow(value, seconds):
+    def call(*args, **kwargs):
+        time.sleep(seconds)
+        return value
+    return call
+
+def test_deadline_run_raises_when_call_overruns():
+    deadline = Deadline(0.05)
+    assert deadline.run(lambda x: x + 1, 1) == 2
+    with pytest.raises(DeadlineExceeded):
+        deadline.run(slow('late', 0.5))
+
+def test_hung_calls_do_not_block_later_calls():
+    release = threading.Event()
+    try:
+        for _ in range(70):
+            with pytest.raises(DeadlineExceeded):
+                Deadline(0.02).run(release.wait)
+        assert Deadline(0.5).run(lambda: 'answered') == 'answered'
+    finally:
+        release.set()
+
+def test_deadline_scope_is_scoped():
+    assert current_deadline() is None
+    with deadline_scope(1.0) as deadline:
+        assert current_deadline() is deadline
+    assert current_deadline() is None
+    with deadline_scope(None) as deadline:
+        assert deadline is None
+
+def test_no_deadline_leaves_prediction_unchanged(mock_agents):
+    prediction = DialecticResponder(**mock_agents)('Test query', mode='binary')
+    assert 'truncated' not in prediction
+
+def test_completed_run_is_not_truncated(mock_agents):
+    prediction = DialecticResponder(**mock_agents)('Test query', mode='binary', deadline=5.0)
+    assert prediction.truncated is False
+    assert prediction.synthesis == 'Mock synthesis'
+
+def test_binary_returns_best_synthesis_so_far(mock_agents):
+    mock_agents['critic'].return_value = ('Needs work', 0.2)
+    mock_agents['antithesis'].side_effect = ['First antithesis', 'Second antithesis']
+    syntheses = iter(['First synthesis', 'Refined synthesis'])
+    mock_agents['synthesis'].side_effect = lambda *args: slow(next(syntheses), 0.0 if args[2] == 'First antithesis' else 1.0)()
+    responder = DialecticResponder(**mock_agents)
+    start = time.perf_counter()
+    prediction = responder('Test query', mode='binary', deadline=0.3)
+    assert time.perf_counter() - start < 0.9
+    assert prediction.truncated is True
+    assert prediction.synthesis == 'First synthesis'
+    assert prediction.antithesis == 'First antithesis'
+    assert prediction.critiques == ['Needs work']
+
+def test_binary_skips_refinement_near_deadline(mock_agents):
+    mock_agents['critic'].return_value = ('Needs work', 0.2)
+    # Three calls averaging 0.2s leave 0.4s: room for the two quick calls even through a GC pause, not for a round
+    mock_agents['thesis'].side_effect = slow('Mock thesis', 0.6)
+    prediction = DialecticResponder(**mock_agents)('Test query', mode='binary', max_iterations=5, deadline=1.0)
+    assert prediction.truncated is True
+    assert prediction.synthesis == 'Mock synthesis'
+    # The loop stopped before starting a round it could not finish, rather than being cut mid-call
+    mock_agents['critic'].assert_not_called()
+
+def test_experts_cancel_slow_experts(mock_agents):
+    mock_agents['expert'].side_effect = lambda query, expertise_domain, context: slow('Late', 1.0)() if expertise_domain == 'slow' else 'Quick'
+    responder = DialecticResponder(**mock_agents)
+    start = time.perf_counter()
+    prediction = responder('Test query', mode='experts', domains=['fast', 'slow'], deadline=0.2)
+    assert time.perf_counter() - start < 0.9
+    assert prediction.truncated is True
+    assert prediction.synthesis == 'Quick'
+    mock_agents['synthesis'].assert_not_called()
+
+def test_truncated_results_are_not_cached(mock_agents, tmp_path):
+    mock_agents['synthesis'].side_effect = slow('Late synthesis', 0.5)
+    store = SQLiteResultStore(str(tmp_path / 'results.db'))
+    responder = DialecticResponder(**mock_agents, store=store, version='v1')
+    prediction = responder('Test query', mode='binary', deadline=0.1)
+    assert prediction.truncated is True
+    assert store.stats() == {}
+    store.close()
@@ -0,0 +1,95 @@
+import time
+import dspy
+import pytest
+from diaspy.fakes import FakeLM
+from diaspy.graph import CallMemo, Graph, Loop, Map, Node, Run
+from diaspy.responders import DialecticResponder
+from diaspy.usage import counters
+from unittest.mock import MagicMock
+
+def slow(value, seconds=0.1):
+    def fn(run):
+        time.sleep(seconds)
+        return value
+    return fn
+
+def test_independent_nodes_run_concurrently():
+    graph = Graph(Node('a', slow(1)), Node('b', slow(2)), Map('c', lambda run, x: x * run['a'], items=lambda run: [1, 2, 3], needs=('a',)),
+                  Node('total', lambda run: run['a'] + run['b'] + sum(run['c'].values()), needs=('b', 'c')))
+    run = Run(None)
+    started = time.perf_counter()
+    assert graph.run(run) is False
+    assert time.perf_counter() - started < 0.19
+    assert run['c'] == {1: 1, 2: 2, 3: 3}
+    assert run['total'] == 9
+
+def test_stop_discards_speculative_nodes():
+    counters.reset()
+    graph = Graph(Node('check', slow('fail', 0.05), stop=lambda run: run['check'] == 'fail'), Node('work', slow('done', 0.05), after=('check',)))
+    for speculate in (False, True):
+        run = Run(None, speculate=speculate)
+        assert graph.run(run) is True
+        assert 'work' not in run.state
+    assert counters.snapshot() == {'speculative_discards': 1}
+
+def test_loop_stops_and_respects_budget():
+    body = Graph(Node('count', lambda run: run.get('count', 0) + 1, stop=lambda run: run['count'] == 3))
+    run = Run(None)
+    assert Graph(Loop('rounds', body, times=5)).run(run) is False
+    assert run['rounds'] == 3 and run['iteration'] == 2
+    budget = Run(None, budget=lambda calls: calls > 1)
+    Graph(Loop('rounds', body, times=5, reserve=2)).run(budget)
+    assert budget['rounds'] == 0 and 'count' not in budget.state
+    with pytest.raises(ValueError, match='Unsatisfiable'):
+        Graph(Node('a', lambda run: 1, needs=('b',)), Node('b', lambda run: 2, needs=('a',))).run(Run(None))
+
+def test_speculative_debate_matches_sequential(mock_agents):
+    mock_agents['critic'].return_value = ('Mock critique', 0.5)
+    cons = ['Markets fail the poor', 'Prices ignore pollution', 'Monopolies form']
+    pros = ['Growth lifts everyone', 'Innovation offsets harm', 'Trade spreads ideas']
+    predictions = []
+
+    def slow_agent(answers, seconds=0.05):
+        answers = iter(answers)
+
+        def answer(**kwargs):
+            time.sleep(seconds)
+            return next(answers)
+        return answer
+
+    for speculate in (False, True):
+        mock_agents['con_debate'].side_effect = slow_agent(cons, 0)
+        mock_agents['pro_debate'].side_effect = slow_agent(pros)
+        mock_agents['critic'].side_effect = slow_agent([('Mock critique', 0.5)] * 3)
+        started = time.perf_counter()
+        predictions.append(DialecticResponder(**mock_agents, speculate=speculate)('Test query', mode='debate', max_rounds=3))
+        predictions[-1].seconds = time.perf_counter() - started
+    assert predictions[0].debate_history == predictions[1].debate_history
+    assert len(predictions[1].debate_history) == 7
+    # Critique and rebuttal overlap in each of the three rounds
+    assert predictions[1].seconds < predictions[0].seconds - 0.1
+
+def test_custom_mode_graph(mock_agents):
+    quick = Graph(
+        Node('thesis', lambda run: run.call('thesis', run['query'])),
+        Node('prediction', lambda run: dspy.Prediction(synthesis=run['thesis']), needs=('thesis',)),
+    )
+    responder = DialecticResponder(**mock_agents, graphs={'quick': quick})
+    assert responder('Test query', mode='quick').synthesis == 'Mock thesis'
+    with pytest.raises(ValueError, match='Unknown mode'):
+        responder('Test query', mode='missing')
+
+def test_call_memo_skips_repeated_calls_but_not_resamples():
+    memo = CallMemo()
+    lm = FakeLM()
+    thesis = MagicMock(side_effect=lambda query: f'Thesis for {query} at {dspy.settings.lm.kwargs.get("temperature")}')
+    responder = DialecticResponder(thesis, MagicMock(return_value='Mock antithesis'), MagicMock(return_value='Mock synthesis'),
+                                   MagicMock(return_value=('Mock critique', 0.9)), memo=memo)
+    with dspy.context(lm=lm):
+        first = responder('Test query', mode='binary')
+        second = responder('Test query', mode='binary')
+    with dspy.context(lm=lm.copy(temperature=1.0)):
+        third = responder('Test query', mode='binary')
+    assert first.thesis == second.thesis != third.thesis
+    assert thesis.call_count == 2
+    assert memo.hits == 4
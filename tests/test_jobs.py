@@ -0,0 +1,95 @@
+import functools
+import time
+import dspy
+import pytest
+from diaspy.checkpoints import SQLiteCheckpointStore
+from diaspy.fakes import fake_responder
+from diaspy.jobs import SQLiteJobQueue, Worker, run_workers
+from diaspy.responders import DialecticResponder
+from unittest.mock import MagicMock
+
+def test_enqueue_is_idempotent_and_claim_leases(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    job_id = queue.enqueue('q', 'binary', {'max_iterations': 1})
+    assert queue.enqueue('q', 'binary', {'max_iterations': 1}) == job_id
+    job = queue.claim('w1', lease=60)
+    assert (job.id, job.params, job.attempts) == (job_id, {'max_iterations': 1}, 1)
+    assert queue.claim('w2') is None
+
+def test_expired_lease_is_redelivered_and_results_written_once(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    job_id = queue.enqueue('q')
+    queue.claim('w1', lease=0)
+    time.sleep(0.01)
+    job = queue.claim('w2', lease=60)
+    assert job.attempts == 2
+    # A late failure from the worker that lost the lease leaves the redelivered job running
+    queue.fail(job_id, 'w1', RuntimeError('timed out'))
+    assert queue.metrics()['running'] == 1
+    queue.complete(job_id, 'w2', {'synthesis': 'first'})
+    queue.complete(job_id, 'w1', {'synthesis': 'late duplicate'})
+    assert queue.result(job_id) == {'synthesis': 'first'}
+    metrics = queue.metrics()
+    assert (metrics['done'], metrics['redelivered'], metrics['pending']) == (1, 1, 0)
+
+def test_job_whose_lease_keeps_expiring_fails(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    job_id = queue.enqueue('q')
+    for worker in ('w1', 'w2'):
+        # Each worker crashes without reporting back
+        assert queue.claim(worker, lease=0, max_attempts=2).id == job_id
+        time.sleep(0.01)
+    assert queue.claim('w3', max_attempts=2) is None
+    assert queue.metrics()['failed'] == 1
+
+def test_worker_renews_lease_while_running(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    queue, other = SQLiteJobQueue(path), SQLiteJobQueue(path)
+    job_id = queue.enqueue('q')
+    stolen = []
+
+    def slow(query, **kwargs):
+        time.sleep(0.5)
+        stolen.append(other.claim('w2', lease=60))
+        return dspy.Prediction(synthesis='s')
+
+    assert Worker(queue, slow, worker_id='w1', lease=0.15).run_once()
+    assert stolen == [None] and queue.result(job_id) == {'synthesis': 's'}
+    assert queue.metrics()['redelivered'] == 0
+
+def test_redelivered_job_waits_for_crashed_workers_checkpoint(mock_agents, tmp_path):
+    class Crash(BaseException):
+        pass
+
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    job_id = queue.enqueue('Test query', 'binary', {'max_iterations': 1})
+    mock_agents['critic'].side_effect = [Crash(), ('Mock critique', 0.9)]
+    responder = DialecticResponder(**mock_agents, checkpoints=SQLiteCheckpointStore(':memory:', lease=0.5))
+    # Worker A dies mid-run, leaving its job leased and its checkpoint in progress
+    with pytest.raises(Crash):
+        Worker(queue, responder, worker_id='A', lease=0.1, max_attempts=2).run_once()
+    worker, deadline = Worker(queue, responder, worker_id='B', lease=0.1, max_attempts=2), time.monotonic() + 5
+    while queue.result(job_id) is None and time.monotonic() < deadline:
+        worker.run_once()
+        time.sleep(0.05)
+    # Redeliveries while the checkpoint was still leased did not use up attempts, and the run resumed from it
+    assert queue.result(job_id)['synthesis'] == 'Mock synthesis'
+    assert queue.metrics()['failed'] == 0 and mock_agents['thesis'].call_count == 1
+
+def test_worker_retries_then_fails(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    job_id = queue.enqueue('q')
+    worker = Worker(queue, MagicMock(side_effect=RuntimeError('LM down')), max_attempts=2)
+    assert worker.run(idle_timeout=0) == 0
+    assert queue.metrics()['failed'] == 1
+    assert queue.result(job_id) is None
+
+def test_worker_processes_drain_queue(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    queue = SQLiteJobQueue(path)
+    job_ids = [queue.enqueue(f'query {i}', 'binary', {'max_iterations': 1}) for i in range(6)]
+    workers = run_workers(path, functools.partial(fake_responder, score='0.9'), processes=2, idle_timeout=1.0)
+    for worker in workers:
+        worker.join(timeout=60)
+    assert all(queue.result(job_id)['synthesis'] for job_id in job_ids)
+    assert queue.metrics()['done'] == 6
@@ -0,0 +1,58 @@
+import socket
+import httpx
+import pytest
+import dspy
+from diaspy.fakes import FakeLM, FakeOpenAIServer
+from diaspy.lm import make_lm, with_timeout
+from diaspy.responders import DialecticResponder
+from diaspy.agents import AGENT_CLASSES
+from dspy.utils.exceptions import LMTransportError
+
+@pytest.fixture
+def server():
+    with FakeOpenAIServer() as server:
+        yield server
+
+def test_make_lm_copies_share_one_pool(server):
+    a = make_lm('openai/fake-model', api_key='test', api_base=server.url)
+    b = make_lm('openai/fake-model', api_key='test', api_base=server.url, temperature=0.5)
+    assert b.kwargs['temperature'] == 0.5 and a.kwargs.get('temperature') is None
+    a('one')
+    b('two')
+    assert server.connections == 1
+
+def test_make_lm_timeouts():
+    lm = make_lm('openai/fake-model', api_key='test', timeout=30, connect_timeout=2)
+    assert lm.kwargs['timeout'] == httpx.Timeout(30, connect=2)
+    assert make_lm('openai/fake-model', api_key='test', timeout=30, connect_timeout=5).kwargs['timeout'].connect == 5
+
+def test_connections_are_kept_alive(server):
+    lm = make_lm('openai/fake-model', api_key='test', api_base=server.url)
+    for i in range(5):
+        assert 'Answer' in lm(f'Question {i}')[0]
+    assert server.requests == 5
+    assert server.connections == 1
+
+def test_responder_runs_over_pooled_client(server):
+    agents = {key: agent_class() for key, agent_class in AGENT_CLASSES.items()}
+    with dspy.context(lm=make_lm('openai/fake-model', api_key='test', api_base=server.url)):
+        prediction = DialecticResponder(**agents)('Is progress inevitable?', mode='binary', max_iterations=1)
+    assert prediction.synthesis
+    assert server.connections == 1
+
+def test_with_timeout_buckets_and_skips_custom_engines():
+    lm = dspy.LM('openai/fake-model', api_key='test', cache=False)
+    assert with_timeout(lm, 3.2).kwargs['timeout'] == 4
+    assert with_timeout(make_lm('openai/fake-model', api_key='test', connect_timeout=2), 3.2).kwargs['timeout'] == httpx.Timeout(4, connect=2)
+    assert with_timeout(lm, 0.1).kwargs['timeout'] == 1
+    fake = FakeLM()
+    assert with_timeout(fake, 3.2) is fake
+    assert with_timeout(None, 3.2) is None
+
+def test_connection_errors_surface():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    lm = make_lm('openai/fake-model', api_key='test', api_base=f'http://127.0.0.1:{port}/v1', num_retries=0)
+    with pytest.raises(LMTransportError, match='Connection refused'):
+        lm('hello')
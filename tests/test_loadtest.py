@@ -0,0 +1,61 @@
+import time
+import dspy
+import pytest
+from diaspy.fakes import FakeOpenAIServer
+from diaspy.lm import make_lm
+from diaspy.loadtest import open_loop, poisson_arrivals, run_load, saturation_point, summarize
+from diaspy.responders import DialecticResponder
+
+def test_poisson_arrivals_are_seeded():
+    arrivals = poisson_arrivals(50, 2.0, seed=1)
+    assert arrivals == poisson_arrivals(50, 2.0, seed=1)
+    assert arrivals == sorted(arrivals) and arrivals[-1] < 2.0
+    assert 60 < len(arrivals) < 140
+
+def test_open_loop_counts_queueing_in_latency():
+    # A single worker cannot keep up with back-to-back arrivals, so later requests wait and report it
+    samples, elapsed = open_loop(lambda i: time.sleep(0.05), [0.0, 0.0, 0.0, 0.0], max_workers=1)
+    latencies = [sample['latency'] for sample in samples]
+    assert latencies[-1] >= 0.19
+    assert elapsed >= 0.2
+
+def test_summarize_and_saturation_point():
+    samples = [{'latency': 0.1, 'error': None}] * 9 + [{'latency': 0.5, 'error': 'LMServerError'}]
+    stats = summarize(samples, 1.0, rate=10)
+    assert stats['throughput'] == 9
+    assert stats['error_rate'] == pytest.approx(0.1)
+    assert stats['errors'] == {'LMServerError': 1}
+    results = [{'offered': 1, 'throughput': 1.0, 'p95': 0.1}, {'offered': 2, 'throughput': 1.9, 'p95': 0.2},
+               {'offered': 4, 'throughput': 2.5, 'p95': 0.9}]
+    assert saturation_point(results) == 4
+    assert saturation_point(results[:2]) is None
+    # A lowest rate with no successes has no p95; the baseline is the first rate that has one
+    results = [{'offered': 0, 'throughput': 0.0, 'p95': float('nan')}, {'offered': 1, 'throughput': 1.0, 'p95': 0.1},
+               {'offered': 2, 'throughput': 2.0, 'p95': 1.0}]
+    assert saturation_point(results) == 2
+
+def test_run_load_breaks_down_by_mode(mock_agents):
+    results = run_load(DialecticResponder(**mock_agents), [20], 0.5)
+    assert results[0]['error_rate'] == 0.0
+    assert set(results[0]['modes']) == {'binary', 'debate', 'experts'}
+    assert sum(stats['requests'] for stats in results[0]['modes'].values()) == results[0]['requests']
+
+def test_fake_server_injects_errors_and_rate_limits():
+    with FakeOpenAIServer(error_rate=1.0) as server:
+        with pytest.raises(Exception):
+            make_lm('openai/fake-model', api_key='fake', api_base=server.url, num_retries=0)('hi')
+        assert server.errors == 1
+    with FakeOpenAIServer(rate_limit=1) as server:
+        lm = make_lm('openai/fake-model', api_key='fake', api_base=server.url, num_retries=0)
+        lm('one')
+        with pytest.raises(Exception):
+            lm('two')
+        assert server.rate_limited == 1
+
+def test_fake_server_latency_is_seeded():
+    draws = []
+    for _ in range(2):
+        with FakeOpenAIServer(latency=0.1, distribution='lognormal', seed=3) as server:
+            draws.append([server.sample_latency() for _ in range(100)])
+    assert draws[0] == draws[1]
+    assert 0.07 < sum(draws[0]) / 100 < 0.13
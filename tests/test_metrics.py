@@ -0,0 +1,82 @@
+import urllib.request
+import dspy
+import pytest
+from diaspy import metrics
+from diaspy.agents import CriticAgent
+from diaspy.fakes import FakeLM
+from diaspy.metrics import MetricsRegistry, serve_metrics
+from diaspy.responders import DialecticResponder
+from diaspy.scoring import critic_score_stats, score_stats
+from diaspy.store import SQLiteResultStore
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.registry.reset()
+
+def test_registry_prometheus_text():
+    registry = MetricsRegistry()
+    calls = registry.counter('calls_total', "Calls", ('agent',))
+    latency = registry.histogram('latency_seconds', "Latency", ('agent',), buckets=(0.1, 1.0))
+    calls.inc('thesis')
+    calls.inc('critic', value=2)
+    latency.observe(0.05, 'thesis')
+    latency.observe(0.5, 'thesis')
+    assert registry.snapshot()['calls_total'] == {('thesis',): 1, ('critic',): 2}
+    assert registry.snapshot()['latency_seconds'][('thesis',)]['count'] == 2
+    text = registry.prometheus()
+    assert '# TYPE calls_total counter\n' in text
+    assert 'calls_total{agent="critic"} 2\n' in text
+    assert 'latency_seconds_bucket{agent="thesis",le="0.1"} 1\n' in text
+    assert 'latency_seconds_bucket{agent="thesis",le="+Inf"} 2\n' in text
+    assert 'latency_seconds_sum{agent="thesis"} 0.55\n' in text
+    registry.enabled = False
+    calls.inc('thesis')
+    assert registry.snapshot()['calls_total'][('thesis',)] == 1
+
+def test_responder_records_requests_agents_iterations_and_cache(mock_agents):
+    mock_agents['critic'].return_value = ('Mock critique', 0.5)
+    rebuttals = iter(['Markets fail the poor', 'Prices ignore pollution', 'Monopolies form'])
+    mock_agents['antithesis'].side_effect = lambda *args: next(rebuttals)
+    responder = DialecticResponder(**mock_agents, store=SQLiteResultStore(':memory:'), version='v1')
+    responder('Test query', mode='binary', max_iterations=2)
+    responder('Test query', mode='binary', max_iterations=2)
+    snapshot = metrics.registry.snapshot()
+    assert snapshot['diaspy_requests_total'] == {('binary',): 2}
+    assert snapshot['diaspy_iterations'][('binary',)]['sum'] == 2
+    assert snapshot['diaspy_agent_call_seconds'][('critic',)]['count'] == 2
+    assert snapshot['diaspy_agent_call_seconds'][('antithesis',)]['count'] == 3
+    assert snapshot['diaspy_cache_lookups_total'] == {('result', 'miss'): 1, ('result', 'hit'): 1}
+
+def test_responder_counts_errors(mock_agents):
+    mock_agents['thesis'].side_effect = RuntimeError('LM down')
+    with pytest.raises(RuntimeError):
+        DialecticResponder(**mock_agents)('Test query', mode='debate')
+    snapshot = metrics.registry.snapshot()
+    assert snapshot['diaspy_request_errors_total'] == {('debate',): 1}
+    assert snapshot['diaspy_agent_errors_total'] == {('thesis',): 1}
+
+def test_critic_agent_records_scores_and_fallbacks():
+    critic_score_stats.reset()
+    global_fallbacks = score_stats.fallbacks
+    with dspy.context(lm=FakeLM(score='0.7')):
+        CriticAgent()(query='q', thesis='t', antithesis='a', synthesis='s')
+    with dspy.context(lm=FakeLM(score='no idea')):
+        CriticAgent(retries=0)(query='q', thesis='t', antithesis='a', synthesis='s')
+    snapshot = metrics.registry.snapshot()
+    # The unparseable score falls back to 0.5
+    assert snapshot['diaspy_critic_score'][()]['buckets'][0.6] == 1
+    assert snapshot['diaspy_critic_score'][()]['buckets'][0.7] == 2
+    assert snapshot['diaspy_critic_score_fallbacks_total'] == {(): 1}
+    assert score_stats.fallbacks == global_fallbacks + 1
+
+def test_serve_metrics_over_http():
+    metrics.requests.inc('binary')
+    server = serve_metrics(port=0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            text = response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'diaspy_requests_total{mode="binary"} 1' in text
+    assert '# TYPE diaspy_events_total counter' in text
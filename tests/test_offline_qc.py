@@ -0,0 +1,41 @@
+import dspy
+import pytest
+from diaspy.qc import OfflineScorer, agreement, offline_score, quality_features
+from unittest.mock import MagicMock
+
+BINARY = {
+    'thesis': 'Markets allocate scarce resources efficiently through prices.',
+    'antithesis': 'Unregulated markets concentrate wealth and ignore externalities like pollution.',
+    'synthesis': 'On balance, markets allocate resources well when regulation prices externalities, so both efficiency and fairness hold; the evidence supports this logical middle ground.',
+    'critiques': ['Fine'],
+}
+
+def test_quality_features_binary():
+    features = quality_features('Are markets efficient?', 'binary', dspy.Prediction(**BINARY))
+    assert set(features) == {'length', 'lexical_diversity', 'grounding', 'query_relevance', 'redundancy', 'agreement'}
+    assert features['redundancy'] < 0.3
+    assert features['grounding'] == 1.0
+    assert 0.0 <= offline_score(features) <= 1.0
+
+def test_expert_diversity_penalizes_duplicates():
+    same = quality_features('q', 'experts', {'synthesis': 's', 'expert_opinions': {'a': 'gravity bends spacetime', 'b': 'gravity bends spacetime'}})
+    varied = quality_features('q', 'experts', {'synthesis': 's', 'expert_opinions': {'a': 'gravity bends spacetime', 'b': 'determinism governs existence'}})
+    assert same['expert_diversity'] == pytest.approx(0.0, abs=1e-6)
+    assert varied['expert_diversity'] == pytest.approx(1.0)
+
+def test_only_borderline_outputs_reach_llm():
+    qc_agent = MagicMock(return_value=('LLM critique', 0.9))
+    scorer = OfflineScorer(qc_agent=qc_agent, low=0.0, high=0.0)
+    assert scorer.score('q', 'binary', BINARY)['source'] == 'offline'
+    scorer = OfflineScorer(qc_agent=qc_agent, low=0.0, high=1.0)
+    result = scorer.score('q', 'binary', BINARY)
+    assert (result['source'], result['score']) == ('llm', 0.9)
+    qc_agent.assert_called_once()
+
+def test_agreement_statistics():
+    good = {'query': 'Are markets efficient?', 'mode': 'binary', 'output': BINARY, 'qc_score': 0.9}
+    bad = {'query': 'Are markets efficient?', 'mode': 'binary', 'output': {'thesis': 'x', 'antithesis': 'x', 'synthesis': 'x'}, 'qc_score': 0.1}
+    stats = agreement([good, bad], threshold=0.5)
+    assert stats['n'] == 2
+    assert stats['pearson'] == pytest.approx(1.0)
+    assert stats['pass_fail_agreement'] == 1.0
@@ -0,0 +1,31 @@
+import pytest
+from diaspy.planner import ModePlanner, call_bounds
+from diaspy.responders import DialecticResponder
+
+def test_call_bounds_scale_with_domains():
+    assert call_bounds('binary', max_iterations=2) == (4, 9)
+    assert call_bounds('experts', max_iterations=1, domains=['a'] * 10) == (12, 23)
+
+def test_planner_picks_cheapest_mode_clearing_threshold():
+    planner = ModePlanner(threshold=0.8)
+    # binary's prior score is below the threshold, so the cheapest passing mode is debate
+    mode, estimate = planner.choose('Is AI good?')
+    assert mode == 'debate'
+    assert estimate['score'] >= 0.8
+
+def test_planner_respects_budget_and_learns():
+    planner = ModePlanner(threshold=0.8)
+    planner.record('binary', 'q', {'calls': 4, 'latency': 0.4, 'tokens': 400, 'score': 0.95})
+    mode, estimate = planner.choose('q', latency_budget=1.0)
+    assert mode == 'binary'
+    assert estimate['calls'] == 4
+    assert estimate['latency'] == pytest.approx(0.4)
+
+def test_responder_auto_reports_predicted_and_actual_cost(mock_agents):
+    responder = DialecticResponder(**mock_agents)
+    prediction = responder('Test query', mode='auto')
+    assert prediction.mode in ('binary', 'debate', 'experts')
+    assert set(prediction.predicted_cost) == {'calls', 'latency', 'tokens', 'score'}
+    assert prediction.actual_cost['calls'] >= 4
+    assert prediction.actual_cost['score'] == 0.9
+    assert responder.planner.history[prediction.mode]['runs'] == 1
@@ -0,0 +1,44 @@
+import pstats
+import dspy
+import pytest
+from diaspy.agents import AGENT_CLASSES
+from diaspy.fakes import FakeLM
+from diaspy.profiling import StackSampler, cprofile, profile_phases
+from diaspy.responders import DialecticResponder
+
+@pytest.fixture
+def responder():
+    return DialecticResponder(**{key: agent_class() for key, agent_class in AGENT_CLASSES.items()})
+
+def test_phases_are_split_per_agent(responder):
+    with dspy.context(lm=FakeLM()), profile_phases() as profiler:
+        responder('Is AI beneficial?', mode='binary')
+        responder('Is AI beneficial?', mode='experts', domains=['science', 'humor'])
+    summary = profiler.summary()
+    assert set(summary) == {'ThesisAgent', 'AntithesisAgent', 'SynthesisAgent', 'CriticAgent', 'ExpertAgent'}
+    expert = summary['ExpertAgent']
+    assert {phase: expert[phase]['count'] for phase in ('format', 'network', 'parse', 'other', 'total')} == dict.fromkeys(
+        ('format', 'network', 'parse', 'other', 'total'), 2)
+    parts = sum(expert[phase]['total'] for phase in ('format', 'network', 'parse', 'other'))
+    assert parts == pytest.approx(expert['total']['total'], rel=1e-6)
+    assert sum(count for _, count in profiler.histogram('ExpertAgent', 'format')) == 2
+    assert 'ExpertAgent' in profiler.report()
+
+def test_profiler_is_scoped(responder):
+    with dspy.context(lm=FakeLM()):
+        with profile_phases() as profiler:
+            responder('Is AI beneficial?', mode='binary', max_iterations=0)
+        responder('Is AI beneficial?', mode='binary', max_iterations=0)
+    assert profiler.summary()['ThesisAgent']['total']['count'] == 1
+
+def test_cprofile_and_folded_dumps(responder, tmp_path):
+    sampler = StackSampler(interval=0.0005)
+    with dspy.context(lm=FakeLM(latency=0.01)), cprofile(str(tmp_path / 'run.prof')), sampler:
+        responder('Is AI beneficial?', mode='binary')
+    assert pstats.Stats(str(tmp_path / 'run.prof')).total_calls > 0
+    sampler.dump(str(tmp_path / 'run.folded'))
+    lines = (tmp_path / 'run.folded').read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0
+    assert ';' in stack
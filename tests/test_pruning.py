@@ -0,0 +1,53 @@
+import dspy
+import pytest
+from diaspy.pruning import QueryDemoSelector, agent_demos, demo_tokens, prune_demos, pruning_report
+
+class EchoAgent(dspy.Module):
+    # Answers with its own demos' theses, so the metric can see which demos the prompt would carry
+    def __init__(self, demos=()):
+        super().__init__()
+        self.generate = dspy.Predict('query -> thesis')
+        self.generate.demos = list(demos)
+
+    def forward(self, query):
+        return ' '.join(demo['thesis'] for demo in self.generate.demos)
+
+def demo(query, thesis):
+    return dspy.Example(query=query, thesis=thesis).with_inputs('query')
+
+@pytest.fixture
+def compiled():
+    demos = [demo('What is justice?', 'keep'), demo('Why is the sky blue?', 'drop ' * 20), demo('What is art?', 'also drop')]
+    return {'thesis': EchoAgent(demos)}
+
+def keep_metric(example, pred, trace=None):
+    return 1.0 if 'keep' in pred else 0.0
+
+def test_prune_keeps_only_needed_demos(compiled):
+    devset = [demo('What is truth?', '')]
+    pruned, report = prune_demos(compiled, {'thesis': devset}, keep_metric)
+    assert [d['thesis'] for d in agent_demos(pruned['thesis'])['generate']] == ['keep']
+    row = report['thesis']
+    assert (row['demos_before'], row['demos_after']) == (3, 1)
+    assert row['tokens_after'] < row['tokens_before']
+    assert row['score_after'] == row['score_before'] == 1.0
+    # The compiled agent itself is left untouched
+    assert len(compiled['thesis'].generate.demos) == 3
+    assert 'thesis' in pruning_report(report)
+
+def test_prune_respects_cap_and_skips_agents_without_data(compiled):
+    pruned, report = prune_demos(compiled, {'thesis': [demo('Q', '')]}, lambda example, pred, trace=None: 1.0, max_demos=0)
+    assert agent_demos(pruned['thesis'])['generate'] == []
+    pruned, report = prune_demos(compiled, {}, keep_metric)
+    assert pruned['thesis'] is compiled['thesis']
+    assert report == {}
+
+def test_demo_tokens_counts_fields():
+    assert demo_tokens([{'query': 'a' * 40, 'thesis': 'b' * 40}]) == 20
+
+def test_query_selector_picks_similar_demos(compiled):
+    selector = QueryDemoSelector(compiled['thesis'], k=1)
+    assert selector(query='What is justice in society?') == 'keep'
+    assert selector(query='Why is the sky so blue?').startswith('drop')
+    assert selector(query='What is justice in society?') == 'keep'
+    assert len(selector._variants) == 2
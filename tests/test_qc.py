@@ -1,7 +1,11 @@
+import json
 import os
 import dspy
+from diaspy.lm import make_lm
 from diaspy.responders import DialecticResponder
 from diaspy.utils import compile_agents, trainset, philosophical_metric
+from diaspy.scoring import predict_score, score_stats
+from diaspy.qc import OfflineScorer, agreement
 
 # QC Signature for evaluating package outputs against specs
 class QCSignature(dspy.Signature):
@@ -11,7 +15,7 @@ class QCSignature(dspy.Signature):
     mode: str = dspy.InputField()
     output: dict = dspy.InputField(desc="The Prediction dict from the responder")
     critique: str = dspy.OutputField()
-    score: float = dspy.OutputField(desc="Decimal float between 0.0 and 1.0")
+    score: str = dspy.OutputField(desc="Decimal float between 0.0 and 1.0, e.g. 0.8")
 
 class QCAgent(dspy.Module):
     def __init__(self):
@@ -19,25 +23,25 @@ class QCAgent(dspy.Module):
         self.evaluate = dspy.ChainOfThought(QCSignature)
 
     def forward(self, query, mode, output):
-        prediction = self.evaluate(query=query, mode=mode, output=output)
-        try:
-            score = float(prediction.score.strip())
-        except ValueError:
-            score = 0.5
+        prediction, score = predict_score(self.evaluate, query=query, mode=mode, output=output)
         return prediction.critique, score
 
-def run_qc():
+def run_qc(full_qc=False, runs_path='qc_runs.jsonl'):
+    # By default only borderline outputs reach QCAgent; full_qc judges everything with the LLM, records the runs
+    # to runs_path and reports how well the offline scores agree with the LLM scores
     # Setup Grok-3-mini
     api_key = os.environ.get('XAI_API_KEY')
     if not api_key:
         raise ValueError("XAI_API_KEY not set")
-    grok = dspy.LM(model='xai/grok-3-mini', api_key=api_key, cache=False)
+    grok = make_lm('xai/grok-3-mini', api_key=api_key)
     dspy.settings.configure(lm=grok)
 
     # Compile agents and create responder
     compiled_agents = compile_agents(trainset)
     responder = DialecticResponder(**compiled_agents)
     qc_agent = QCAgent()
+    scorer = OfflineScorer(qc_agent=qc_agent)
+    runs = []
 
     # Test queries
     test_queries = ["What is the meaning of life?", "Is AI the future?"]
@@ -52,7 +56,12 @@ def run_qc():
                 # Use package's own metric for initial score
                 initial_score = philosophical_metric(None, prediction)
                 # QC critique
-                critique, qc_score = qc_agent(query=query, mode=mode, output=prediction.__dict__)
+                if full_qc:
+                    critique, qc_score = qc_agent(query=query, mode=mode, output=prediction.__dict__)
+                    runs.append({'query': query, 'mode': mode, 'output': prediction.toDict(), 'qc_score': qc_score})
+                else:
+                    result = scorer.score(query, mode, prediction.__dict__)
+                    critique, qc_score = result.get('critique', f"offline features: {result['features']}"), result['score']
                 mode_scores.append((initial_score + qc_score) / 2)
                 print(f"QC for {mode} on '{query}': Score={qc_score}, Critique={critique}")
             except Exception as e:
@@ -65,7 +74,13 @@ def run_qc():
     meta_thesis = "The diaspy package adheres well to specs, enabling truthful dialectical LLM interactions."
     meta_antithesis = "Potential gaps: Sparse training data may lead to hallucinations; expand for multi-model support."
     meta_synthesis = dspy.ChainOfThought("Synthesize: thesis={meta_thesis}, antithesis={meta_antithesis} into final QC assessment").synthesis  # Simple CoT for meta
-    final_report = "\n".join(reports) + f"\nMeta-Synthesis: {meta_synthesis}"
+    if full_qc:
+        with open(runs_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(run, default=str) + "\n" for run in runs)
+        reports.append(f"Offline vs LLM QC agreement: {agreement(runs)}")
+    else:
+        reports.append(f"LLM QC calls: {scorer.llm_calls}, offline: {scorer.offline}")
+    final_report = "\n".join(reports) + f"\nScore fallbacks: {score_stats.snapshot()}" + f"\nMeta-Synthesis: {meta_synthesis}"
     print(final_report)
     return final_report
 
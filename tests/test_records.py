@@ -0,0 +1,54 @@
+import gc
+import os
+import pytest
+from diaspy.records import SpillFile, SpilledText
+from diaspy.responders import DialecticResponder
+from diaspy.store import SQLiteResultStore
+
+@pytest.fixture
+def mock_agents(mock_agents):
+    # A critic that is never satisfied, so every refinement round runs
+    mock_agents['critic'].return_value = ('Mock critique', 0.5)
+    return mock_agents
+
+def test_spill_file_roundtrip(tmp_path):
+    spill = SpillFile(str(tmp_path / 'spill.txt'))
+    first, second = spill.write('héllo'), spill.write('world')
+    assert str(first) == 'héllo' and str(second) == 'world'
+    assert first == 'héllo' and first in {'héllo'} and {first: 1}['héllo'] == 1
+    assert not hasattr(first, '__dict__')
+
+def test_temporary_spill_file_is_deleted():
+    spill = SpillFile()
+    path = spill.path
+    text = spill.write('hello')
+    del spill
+    # Still readable while a reference into the file is alive
+    assert os.path.exists(path) and str(text) == 'hello'
+    del text
+    gc.collect()
+    assert not os.path.exists(path)
+    spill = SpillFile()
+    spill.close()
+    assert not os.path.exists(spill.path)
+
+def test_spill_retention_keeps_references(mock_agents, tmp_path):
+    responder = DialecticResponder(**mock_agents, retain='spill', spill=SpillFile(str(tmp_path / 'spill.txt')))
+    prediction = responder('Test query', mode='debate', max_rounds=2)
+    assert all(isinstance(turn, SpilledText) for turn in prediction.debate_history)
+    assert [str(turn) for turn in prediction.debate_history] == ['Thesis: Mock thesis', 'Con 1: Mock con', 'Pro 1: Mock pro', 'Con 2: Mock con', 'Pro 2: Mock pro']
+    assert prediction.synthesis == 'Mock synthesis'
+
+def test_final_retention_drops_intermediates_but_store_keeps_them(mock_agents):
+    rebuttals = iter(['Markets fail the poor', 'Prices ignore pollution', 'Monopolies form'])
+    mock_agents['antithesis'].side_effect = lambda *args: next(rebuttals)
+    store = SQLiteResultStore(':memory:')
+    responder = DialecticResponder(**mock_agents, store=store, version='v1', retain='final')
+    prediction = responder('Test query', mode='binary')
+    assert prediction.critiques == []
+    assert prediction.synthesis == 'Mock synthesis'
+    assert store.get(prediction.result_key)['critiques'] == ['Mock critique', 'Mock critique']
+
+def test_unknown_retention_rejected(mock_agents):
+    with pytest.raises(ValueError):
+        DialecticResponder(**mock_agents, retain='some')
@@ -1,21 +1,9 @@
-import pytest
 import dspy
+import pytest
 from diaspy.responders import DialecticResponder
 from diaspy.agents import ThesisAgent, AntithesisAgent, SynthesisAgent, CriticAgent
 from unittest.mock import patch, MagicMock
 
-@pytest.fixture
-def mock_agents():
-    return {
-        'thesis': MagicMock(return_value='Mock thesis'),
-        'antithesis': MagicMock(return_value='Mock antithesis'),
-        'synthesis': MagicMock(return_value='Mock synthesis'),
-        'critic': MagicMock(return_value=('Mock critique', 0.9)),
-        'pro_debate': MagicMock(return_value='Mock pro'),
-        'con_debate': MagicMock(return_value='Mock con'),
-        'expert': MagicMock(return_value='Mock opinion')
-    }
-
 def test_dialectic_responder_binary(mock_agents):
     responder = DialecticResponder(**mock_agents)
     prediction = responder('Test query', mode='binary')
@@ -35,3 +23,140 @@ def test_dialectic_responder_experts(mock_agents):
     prediction = responder('Test query', mode='experts', domains=['test'])
     assert hasattr(prediction, 'expert_opinions')
     assert hasattr(prediction, 'synthesis')
+
+def test_dialectic_responder_tournament(mock_agents):
+    responder = DialecticResponder(**mock_agents)
+    prediction = responder('Test query', mode='tournament', branches=3)
+    assert mock_agents['thesis'].call_count == 3
+    assert len(prediction.branch_histories) == 3
+    assert prediction.pruned == []
+    assert hasattr(prediction, 'synthesis')
+
+def test_dialectic_responder_tournament_needs_a_branch(mock_agents):
+    responder = DialecticResponder(**mock_agents)
+    for branches in ([], 0):
+        with pytest.raises(ValueError, match='at least one branch'):
+            responder('Test query', mode='tournament', branches=branches)
+    assert mock_agents['thesis'].call_count == 0
+
+def test_dialectic_responder_tournament_prunes_weak_branches(mock_agents):
+    scores = {'Thesis A': 0.85, 'Thesis B': 0.3}
+    mock_agents['critic'].side_effect = lambda query, thesis, antithesis, synthesis: ('Mock critique', scores[thesis])
+    responder = DialecticResponder(**mock_agents)
+    prediction = responder('Test query', mode='tournament', branches=['Thesis A', 'Thesis B'], max_rounds=2)
+    mock_agents['thesis'].assert_not_called()
+    assert prediction.pruned == [1]
+    assert list(prediction.branch_histories) == [0]
+    assert prediction.branch_scores == {0: 0.85, 1: 0.3}
+    # The pruned branch stops after its first round
+    assert mock_agents['critic'].call_count == 3
+
+def test_dialectic_responder_experts_hierarchical(mock_agents):
+    domains = [f'domain{i}' for i in range(10)]
+    mock_agents['expert'].side_effect = lambda query, expertise_domain, context: f'{expertise_domain} opinion'
+    responder = DialecticResponder(**mock_agents)
+    prediction = responder('Test query', mode='experts', domains=domains, fan_in=3)
+    assert list(prediction.expert_opinions) == domains
+    # 10 opinions -> 4 panels -> 2 panels -> final synthesis
+    assert prediction.panel_summaries == ['Panel 1: Mock synthesis', 'Panel 2: Mock synthesis']
+    assert mock_agents['synthesis'].call_count == 7
+    for call in mock_agents['synthesis'].call_args_list:
+        assert len(call.kwargs['thesis'].split('\n')) <= 3
+
+def test_experts_panel_summaries_keep_multiline_entries(mock_agents):
+    mock_agents['synthesis'].return_value = 'Summary\nsecond para'
+    prediction = DialecticResponder(**mock_agents)('Test query', mode='experts', domains=['a', 'b', 'c', 'd'], fan_in=2)
+    assert prediction.panel_summaries == ['Panel 1: Summary\nsecond para', 'Panel 2: Summary\nsecond para']
+
+def test_dialectic_responder_binary_skips_repeated_antithesis(mock_agents):
+    from diaspy.usage import counters
+    counters.reset()
+    mock_agents['critic'].return_value = ('Mock critique', 0.5)
+    responder = DialecticResponder(**mock_agents, dedupe_threshold=0.95)
+    prediction = responder('Test query', mode='binary', max_iterations=3)
+    # Initial antithesis, one refinement and one re-sample; both repeat the original, so the two remaining rounds are skipped
+    assert mock_agents['antithesis'].call_count == 3
+    assert mock_agents['synthesis'].call_count == 1
+    assert prediction.critiques == ['Mock critique']
+    assert counters.snapshot() == {'antithesis_resamples': 1, 'skipped_iterations': 2}
+
+def test_dialectic_responder_refines_repeats_without_dedupe(mock_agents):
+    mock_agents['critic'].return_value = ('Mock critique', 0.5)
+    DialecticResponder(**mock_agents)('Test query', mode='binary', max_iterations=3)
+    assert mock_agents['antithesis'].call_count == 4 and mock_agents['synthesis'].call_count == 4
+
+def test_dialectic_responder_binary_refines_distinct_antitheses(mock_agents):
+    mock_agents['critic'].return_value = ('Mock critique', 0.5)
+    rebuttals = iter(['Markets fail the poor', 'Prices ignore pollution', 'Monopolies form'])
+    mock_agents['antithesis'].side_effect = lambda *args: next(rebuttals)
+    responder = DialecticResponder(**mock_agents)
+    prediction = responder('Test query', mode='binary', max_iterations=2)
+    assert prediction.antithesis == 'Monopolies form'
+    assert len(prediction.critiques) == 2
+
+def test_dialectic_responder_debate_stops_when_positions_converge(mock_agents):
+    from diaspy.usage import counters
+    counters.reset()
+    mock_agents['critic'].return_value = ('Mock critique', 0.5)
+    cons = iter(['Markets fail the poor', 'Prices ignore pollution', 'Markets fail the poor', 'Monopolies form'])
+    pros = iter(['Growth lifts everyone', 'Innovation offsets harm', 'Growth lifts everyone'])
+    mock_agents['con_debate'].side_effect = lambda **kwargs: next(cons)
+    mock_agents['pro_debate'].side_effect = lambda **kwargs: next(pros)
+    responder = DialecticResponder(**mock_agents, convergence_threshold=0.9)
+    prediction = responder('Test query', mode='debate', max_rounds=5)
+    # The third con restates the first, so the debate skips its critique and rebuttal and synthesizes
+    assert prediction.debate_history == ['Thesis: Mock thesis', 'Con 1: Markets fail the poor', 'Pro 1: Growth lifts everyone',
+                                         'Con 2: Prices ignore pollution', 'Pro 2: Innovation offsets harm']
+    assert mock_agents['critic'].call_count == 2
+    assert counters.snapshot() == {'debate_converged': 1, 'debate_rounds_saved': 2, 'debate_calls_saved': 8}
+
+def test_dialectic_responder_debate_runs_every_round_by_default(mock_agents):
+    mock_agents['critic'].return_value = ('Mock critique', 0.5)
+    responder = DialecticResponder(**mock_agents)
+    prediction = responder('Test query', mode='debate', max_rounds=3)
+    assert len(prediction.debate_history) == 7
+    assert mock_agents['con_debate'].call_count == 3
+
+def test_dialectic_responder_experts_delta_synthesis_sends_only_changes(mock_agents):
+    from diaspy.usage import counters
+    counters.reset()
+    scores = iter([0.5, 0.6])
+    mock_agents['critic'].side_effect = lambda **kwargs: ('Mock critique', next(scores))
+    mock_agents['expert'].side_effect = lambda query, expertise_domain, context: (
+        'Evidence now favors regulation' if expertise_domain == 'science' and context else f'{expertise_domain} opinion')
+    mock_agents['revision'] = MagicMock(return_value='Mock revision')
+    responder = DialecticResponder(**mock_agents, delta_synthesis=True, dedupe_threshold=0.95)
+    prediction = responder('Test query', mode='experts', domains=['science', 'philosophy', 'law', 'economics'], max_iterations=2)
+    assert prediction.synthesis == 'Mock revision'
+    assert mock_agents['synthesis'].call_count == 1
+    assert mock_agents['revision'].call_args.kwargs == {'query': 'Test query', 'previous_synthesis': 'Mock synthesis',
+                                                        'changes': 'science: Evidence now favors regulation'}
+    assert 'fallbacks' not in ' '.join(counters.snapshot())
+
+def test_dialectic_responder_delta_synthesis_falls_back_when_quality_drops(mock_agents):
+    from diaspy.usage import counters
+    counters.reset()
+    scores = iter([0.5, 0.3])
+    mock_agents['critic'].side_effect = lambda *args: ('Mock critique', next(scores))
+    rebuttals = iter(['Markets fail the poor', 'Prices ignore pollution', 'Monopolies form'])
+    mock_agents['antithesis'].side_effect = lambda *args: next(rebuttals)
+    mock_agents['revision'] = MagicMock(return_value='Mock revision')
+    responder = DialecticResponder(**mock_agents, delta_synthesis=True)
+    prediction = responder('Test query', mode='binary', max_iterations=2)
+    # The first refinement is revised; it scores lower, so the next round re-synthesizes in full
+    assert mock_agents['revision'].call_count == 1
+    assert mock_agents['revision'].call_args.kwargs['changes'] == 'Revised antithesis: Prices ignore pollution'
+    assert mock_agents['synthesis'].call_count == 2
+    assert prediction.synthesis == 'Mock synthesis'
+    assert counters.snapshot() == {'delta_syntheses': 1, 'delta_fallbacks': 1}
+
+def test_dialectic_responder_delta_fallback_rebuilds_when_refinement_stops(mock_agents):
+    scores = iter([0.5, 0.3])
+    mock_agents['critic'].side_effect = lambda *args: ('Mock critique', next(scores))
+    rebuttals = iter(['Markets fail the poor', 'Prices ignore pollution', 'Prices ignore pollution', 'Prices ignore pollution'])
+    mock_agents['antithesis'].side_effect = lambda *args: next(rebuttals)
+    mock_agents['revision'] = MagicMock(return_value='Mock revision')
+    prediction = DialecticResponder(**mock_agents, delta_synthesis=True, dedupe_threshold=0.95)('Test query', mode='binary', max_iterations=3)
+    # The antithesis stops changing in the round that rejects the revision, so the rebuild happens after the loop
+    assert mock_agents['synthesis'].call_count == 2
+    assert prediction.synthesis == 'Mock synthesis'
@@ -0,0 +1,78 @@
+from diaspy.responders import DialecticResponder
+from diaspy.retrieval import RetrievalIndex
+
+def test_search_ranks_and_filters():
+    index = RetrievalIndex()
+    index.add('thesis', 'Is artificial intelligence beneficial to humanity?', 'AI helps')
+    index.add('thesis', 'Should we colonize Mars?', 'Mars yes')
+    index.add('expert', 'Is artificial intelligence beneficial to humanity?', 'Science view', domain='science')
+    score, match = index.best('thesis', 'Is artificial intelligence beneficial for humanity?')
+    assert match['text'] == 'AI helps'
+    assert score > 0.7
+    assert index.best('expert', 'Is artificial intelligence beneficial to humanity?', domain='science')[1]['text'] == 'Science view'
+    assert index.best('expert', 'Is artificial intelligence beneficial to humanity?', domain='humor') == (0.0, None)
+    assert index.best('thesis', 'Should we colonize Mars?', version='v2') == (0.0, None)
+
+def test_index_grows_and_persists(tmp_path):
+    path = str(tmp_path / 'index.npz')
+    index = RetrievalIndex(path)
+    for i in range(40):
+        index.add('thesis', f'Question number {i} about topic {i}', f'Thesis {i}')
+    index.save()
+    loaded = RetrievalIndex(path)
+    assert len(loaded) == 40
+    assert loaded.best('thesis', 'Question number 17 about topic 17')[1]['text'] == 'Thesis 17'
+    loaded.add('thesis', 'A new question', 'New thesis')
+    assert len(loaded) == 41
+
+def test_responder_reuses_thesis_for_repeated_query(mock_agents):
+    index = RetrievalIndex()
+    responder = DialecticResponder(**mock_agents, retrieval=index)
+    first = responder('Is AI beneficial for society?', mode='binary')
+    second = responder('Is AI beneficial for society?', mode='debate')
+    assert mock_agents['thesis'].call_count == 1
+    assert first.thesis == 'Mock thesis'
+    assert second.debate_history[0] == 'Thesis: Mock thesis'
+    assert index.stats()['reused'] == 1
+
+def test_responder_seeds_expert_context(mock_agents):
+    index = RetrievalIndex()
+    responder = DialecticResponder(**mock_agents, retrieval=index, reuse_threshold=1.01, seed_threshold=0.3)
+    responder('Is artificial intelligence beneficial to humanity?', mode='experts', domains=['science'])
+    responder('Is artificial intelligence beneficial for humanity?', mode='experts', domains=['science'])
+    contexts = [call.kwargs['context'] for call in mock_agents['expert'].call_args_list]
+    assert contexts[0] == ''
+    assert 'Mock opinion' in contexts[1]
+    assert index.stats()['seeded'] == 1
+
+def test_tournament_bypasses_retrieval(mock_agents):
+    index = RetrievalIndex()
+    responder = DialecticResponder(**mock_agents, retrieval=index)
+    responder('Is AI beneficial?', mode='binary')
+    responder('Is AI beneficial?', mode='tournament', branches=2)
+    assert mock_agents['thesis'].call_count == 3
+
+PARAPHRASES = [('Is AI beneficial?', 'is ai beneficial'), ('Should we colonize Mars?', 'Should we colonize Mars'),
+               ('Is artificial intelligence beneficial to humanity?', 'Is artificial intelligence beneficial for humanity?'),
+               ('Is AI good for society?', 'Is AI good for the society?')]
+OPPOSITES = [('Should we raise taxes?', 'Should we lower taxes?'), ('Is nuclear power safe?', 'Is nuclear power unsafe?'),
+             ('Is AI good for society?', 'Is AI bad for society?'), ('Is free will an illusion?', 'Is free will not an illusion?'),
+             ('Does money buy happiness?', 'Does money not buy happiness?'),
+             ('Should the government raise taxes on the wealthy to fund public schools?',
+              'Should the government lower taxes on the wealthy to fund public schools?'),
+             ('Should the rich pay more taxes than the poor?', 'Should the poor pay more taxes than the rich?'),
+             ('Do parents owe more to their children than children to their parents?',
+              'Do children owe more to their parents than parents to their children?')]
+
+def test_lexical_index_never_matches_opposite_questions(mock_agents):
+    # Thresholds validated on rephrasings and on opposite questions, which lexical vectors score as close (up to 0.94)
+    mock_agents['expert'].side_effect = lambda query, expertise_domain, context: f'Opinion on {query}'
+    for pairs, seeded in ((PARAPHRASES, True), (OPPOSITES, False)):
+        for first, second in pairs:
+            responder = DialecticResponder(**mock_agents, retrieval=RetrievalIndex())
+            responder(first, mode='experts', domains=['science'], max_iterations=0)
+            mock_agents['expert'].reset_mock()
+            responder(second, mode='experts', domains=['science'], max_iterations=0)
+            stats = responder.retrieval.stats()
+            assert (stats['reused'] + stats['seeded'] > 0) == seeded, (first, second)
+            assert seeded or mock_agents['expert'].call_args.kwargs['context'] == ''
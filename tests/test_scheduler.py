@@ -0,0 +1,70 @@
+import threading
+import time
+import pytest
+from diaspy.responders import DialecticResponder
+from diaspy.scheduler import PipelineScheduler
+
+class Gauge:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def wrap(self, value, seconds=0.02):
+        def call(*args, **kwargs):
+            with self.lock:
+                self.current += 1
+                self.peak = max(self.peak, self.current)
+            time.sleep(seconds)
+            with self.lock:
+                self.current -= 1
+            return value(*args) if callable(value) else value
+        return call
+
+def test_scheduler_matches_sequential_results(mock_agents):
+    mock_agents['thesis'].side_effect = lambda query: f'Thesis for {query}'
+    responder = DialecticResponder(**mock_agents)
+    queries = [f'Query {i}' for i in range(6)]
+    expected = [responder(query, mode='binary').toDict() for query in queries]
+    results = PipelineScheduler(responder, max_in_flight=4).run(queries, mode='binary')
+    assert [result.toDict() for result in results] == expected
+
+def test_scheduler_interleaves_queries(mock_agents):
+    gauge = Gauge()
+    for name in ('thesis', 'antithesis', 'synthesis'):
+        mock_agents[name].side_effect = gauge.wrap(f'Mock {name}')
+    mock_agents['critic'].side_effect = gauge.wrap(('Mock critique', 0.9))
+    scheduler = PipelineScheduler(DialecticResponder(**mock_agents), max_in_flight=4)
+    scheduler.run([f'Query {i}' for i in range(8)], mode='binary')
+    stats = scheduler.stats()
+    assert gauge.peak == 4
+    assert stats['tasks'] == 32
+    assert stats['mean_in_flight'] > 1.5
+    assert 0 < stats['utilization'] <= 1
+
+def test_scheduler_limits_requests_in_flight(mock_agents):
+    gauge = Gauge()
+    mock_agents['expert'].side_effect = gauge.wrap('Mock opinion')
+    scheduler = PipelineScheduler(DialecticResponder(**mock_agents), max_in_flight=2)
+    scheduler.run(['Q1', 'Q2', 'Q3'], mode='experts', domains=['a', 'b', 'c'])
+    assert gauge.peak == 2
+
+def test_scheduler_batches_same_agent_calls(mock_agents):
+    batches = []
+
+    def critic_batch(agent, calls):
+        batches.append(len(calls))
+        return [agent(*args, **kwargs) for args, kwargs in calls]
+
+    mock_agents['synthesis'].side_effect = Gauge().wrap('Mock synthesis')
+    scheduler = PipelineScheduler(DialecticResponder(**mock_agents), max_in_flight=1, batchers={'critic': critic_batch})
+    results = scheduler.run([f'Query {i}' for i in range(4)], mode='binary')
+    assert all(result.critiques == ['Mock critique'] for result in results)
+    assert max(batches) > 1
+    assert scheduler.stats()['batched_tasks'] == sum(size for size in batches if size > 1)
+    assert scheduler.stats()['requests'] < scheduler.stats()['tasks']
+
+def test_scheduler_propagates_agent_errors(mock_agents):
+    mock_agents['critic'].side_effect = RuntimeError('LM down')
+    with pytest.raises(RuntimeError, match='LM down'):
+        PipelineScheduler(DialecticResponder(**mock_agents)).run(['Q1', 'Q2'], mode='binary')
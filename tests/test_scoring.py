@@ -0,0 +1,54 @@
+import pytest
+import dspy
+from dspy.utils import DummyLM
+from diaspy.agents import CriticAgent
+from diaspy.scoring import parse_score, predict_score, ScoreStats
+from unittest.mock import MagicMock
+
+@pytest.mark.parametrize('raw, expected', [
+    (0.8, 0.8),
+    ('0.8', 0.8),
+    (' 0.75\n', 0.75),
+    ('8/10', 0.8),
+    ('80%', 0.8),
+    ('0.8 out of 1', 0.8),
+    ('Score: 7', 0.7),
+    ('85', 0.85),
+    # Numbers and strings share one rule for bare values above 1
+    (1.7, 0.17),
+    ('1.7', 0.17),
+    (85, 0.85),
+    (250, 1.0),
+    ('250', 1.0),
+    ('-0.2', 0.0),
+])
+def test_parse_score(raw, expected):
+    assert parse_score(raw) == pytest.approx(expected)
+
+@pytest.mark.parametrize('raw', [None, '', 'excellent', '3/0', float('nan'), True])
+def test_parse_score_failure(raw):
+    assert parse_score(raw) is None
+
+def test_predict_score_reasks_only_on_failure():
+    stats = ScoreStats()
+    predict = MagicMock(side_effect=[MagicMock(score='great'), MagicMock(score='9/10')])
+    _, score = predict_score(predict, stats=stats, query='q')
+    assert score == pytest.approx(0.9)
+    assert predict.call_count == 2
+    assert stats.snapshot() == {'parsed': 1, 'retries': 1, 'fallbacks': 0, 'fallback_rate': 0.0}
+
+def test_predict_score_fallback():
+    stats = ScoreStats()
+    predict = MagicMock(return_value=MagicMock(score='n/a'))
+    _, score = predict_score(predict, retries=2, stats=stats, query='q')
+    assert score == 0.5
+    assert predict.call_count == 3
+    assert stats.fallbacks == 1
+    assert stats.fallback_rate == 1.0
+
+def test_critic_agent_parses_fraction():
+    lm = DummyLM([{'reasoning': 'r', 'critique': 'Solid', 'score': '8/10'}])
+    with dspy.context(lm=lm):
+        critique, score = CriticAgent()('q', 't', 'a', 's')
+    assert critique == 'Solid'
+    assert score == pytest.approx(0.8)
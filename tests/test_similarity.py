@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from diaspy.similarity import HashingEmbedder, Similarity
+from diaspy.utils import philosophical_metric
+from unittest.mock import MagicMock
+
+def test_similarity_matrix_is_cosine():
+    similarity = Similarity()
+    sims = similarity.matrix(['gravity bends spacetime', 'Gravity bends spacetime!', 'determinism governs existence'])
+    assert sims.shape == (3, 3)
+    assert sims[0, 1] == pytest.approx(1.0, abs=1e-6)
+    assert sims[0, 2] < 0.3
+    assert similarity.has_near_duplicates(['gravity bends spacetime', 'Gravity bends spacetime!'])
+    assert not similarity.is_near_duplicate('gravity bends spacetime', ['determinism governs existence'])
+
+def test_embeddings_are_cached():
+    embedder = MagicMock(side_effect=HashingEmbedder(dim=64))
+    similarity = Similarity(embedder=embedder, cache_size=2)
+    similarity.embed(['a', 'b'])
+    similarity.embed(['b', 'a'])
+    assert embedder.call_count == 1
+    # 'b' is least recently used, so 'c' evicts it
+    similarity.embed(['c'])
+    similarity.embed(['a'])
+    assert embedder.call_count == 2
+    similarity.embed(['b'])
+    assert embedder.call_count == 3
+    assert np.linalg.norm(similarity.embed(['a'])[0]) == pytest.approx(1.0)
+
+def test_metric_treats_paraphrased_opinions_as_duplicates():
+    pred = MagicMock(synthesis='s', expert_opinions={'a': 'Gravity is a force.', 'b': 'gravity is a force'})
+    pred.debate_history = []
+    duplicate = philosophical_metric(None, pred)
+    pred.expert_opinions = {'a': 'Gravity is a force.', 'b': 'Determinism governs existence.'}
+    assert philosophical_metric(None, pred) > duplicate
@@ -0,0 +1,47 @@
+import time
+from diaspy.cli import print_prediction
+from diaspy.responders import DialecticResponder
+from diaspy.store import SQLiteResultStore, result_key
+
+def test_store_roundtrip_and_stats():
+    store = SQLiteResultStore(':memory:')
+    key = result_key('q', 'binary', {'max_iterations': 2}, 'v1')
+    assert store.get(key) is None
+    store.put(key, 'q', 'binary', {'max_iterations': 2}, 'v1', {'synthesis': 'S'})
+    assert store.get(key) == {'synthesis': 'S'}
+    assert store.stats() == {'binary': {'results': 1, 'hits': 1}}
+    assert store.query(mode='binary')[0]['params'] == {'max_iterations': 2}
+
+def test_store_ttl_and_invalidation(monkeypatch):
+    store = SQLiteResultStore(':memory:', ttl=10)
+    store.put('a', 'q', 'binary', {}, 'v1', {'synthesis': 'old'})
+    store.put('b', 'q', 'debate', {}, 'v2', {'synthesis': 'new'})
+    assert store.invalidate(keep_version='v2') == 1
+    assert store.get('a') is None
+    now = time.time()
+    monkeypatch.setattr('diaspy.store.time.time', lambda: now + 11)
+    assert store.get('b') is None
+
+def test_responder_memoizes_results(mock_agents):
+    store = SQLiteResultStore(':memory:')
+    responder = DialecticResponder(**mock_agents, store=store, version='v1')
+    first = responder('Test query', mode='binary')
+    second = responder('Test query', mode='binary')
+    assert second.toDict() == first.toDict()
+    assert mock_agents['thesis'].call_count == 1
+    # A recompiled artifact gets a new version and misses the cache
+    DialecticResponder(**mock_agents, store=store, version='v2')('Test query', mode='binary')
+    assert mock_agents['thesis'].call_count == 2
+    # So does a responder configured to produce different results
+    DialecticResponder(**mock_agents, store=store, version='v2', delta_synthesis=True)('Test query', mode='binary')
+    assert mock_agents['thesis'].call_count == 3
+
+def test_cached_tournament_keeps_branch_indices(mock_agents, capsys):
+    store = SQLiteResultStore(':memory:')
+    responder = DialecticResponder(**mock_agents, store=store, version='v1')
+    first = responder('Test query', mode='tournament', branches=2, max_rounds=1)
+    cached = responder('Test query', mode='tournament', branches=2, max_rounds=1)
+    assert mock_agents['synthesis'].call_count == 1
+    assert cached.branch_histories == first.branch_histories and set(cached.branch_scores) == {0, 1}
+    print_prediction('tournament', cached)
+    assert 'Branch 2 (score 0.90):' in capsys.readouterr().out
@@ -0,0 +1,74 @@
+import random
+import dspy
+from diaspy.agents import ThesisAgent
+from diaspy.fakes import FakeLM
+from diaspy.training import CachedBootstrapFewShot, TeacherCache
+from diaspy.utils import philosophical_metric, trainset
+
+def thesis_examples():
+    return [ex for ex in trainset if 'thesis' in ex and 'antithesis' not in ex]
+
+def test_cached_bootstrap_assigns_demos():
+    with dspy.context(lm=FakeLM()):
+        teleprompter = CachedBootstrapFewShot(metric=philosophical_metric, max_bootstrapped_demos=2, num_threads=4)
+        agent = teleprompter.compile(ThesisAgent(), trainset=thesis_examples())
+    demos = agent.generate.predict.demos
+    assert len(demos) == 3
+    assert sum(1 for demo in demos if demo.get('augmented')) == 2
+    assert agent._compiled
+
+def test_incremental_recompile_reuses_teacher_outputs():
+    cache = TeacherCache()
+    examples = thesis_examples()
+    with dspy.context(lm=FakeLM()):
+        CachedBootstrapFewShot(metric=philosophical_metric, max_labeled_demos=0, cache=cache).compile(ThesisAgent(), trainset=examples)
+        examples[1] = examples[1].copy(thesis="Light scatters more at short wavelengths.")
+        incremental = CachedBootstrapFewShot(metric=philosophical_metric, max_labeled_demos=0, cache=cache)
+        incremental.compile(ThesisAgent(), trainset=examples)
+    assert len(cache) == 4
+    assert incremental.reports[0]['cache_hits'] == 2
+    assert incremental.reports[0]['cache_misses'] == 1
+
+def test_incremental_recompile_with_labeled_demos():
+    cache = TeacherCache()
+    examples = [dspy.Example(query=f'Question {i}?', thesis=f'Thesis {i}.').with_inputs('query') for i in range(24)]
+
+    def recompile(edit):
+        examples[edit] = examples[edit].copy(thesis=f'Edited thesis {edit}.')
+        teleprompter = CachedBootstrapFewShot(cache=cache)
+        teleprompter.compile(ThesisAgent(), trainset=examples)
+        return teleprompter.reports[0]['cache_hits'], teleprompter.reports[0]['cache_misses']
+
+    with dspy.context(lm=FakeLM()):
+        CachedBootstrapFewShot(cache=cache).compile(ThesisAgent(), trainset=examples)
+        # The teacher's 16 labeled demos are LabeledFewShot's seeded sample; one batch of 8 examples is evaluated
+        labeled = set(random.Random(0).sample(range(24), 16))
+        unlabeled = min(set(range(8)) - labeled)
+        # Editing an example no other one sees as a demo re-runs only that example
+        assert recompile(unlabeled) == (7, 1)
+        # Editing a labeled demo changes what the teacher answers for every example that sees it
+        assert recompile(min(set(range(8)) & labeled)) == (0, 8)
+
+def test_teacher_demos_are_part_of_the_key():
+    cache = TeacherCache()
+    examples = thesis_examples()
+    with dspy.context(lm=FakeLM()):
+        CachedBootstrapFewShot(metric=philosophical_metric, max_labeled_demos=0, cache=cache).compile(ThesisAgent(), trainset=examples)
+        # Labeled demos change what the teacher answers, so nothing cached without them applies
+        labeled = CachedBootstrapFewShot(metric=philosophical_metric, cache=cache)
+        labeled.compile(ThesisAgent(), trainset=examples)
+    assert labeled.reports[0]['cache_hits'] == 0
+
+def test_teacher_errors_are_not_cached(monkeypatch):
+    def timeout(self, query):
+        raise TimeoutError('LM timed out')
+
+    cache = TeacherCache()
+    teleprompter = CachedBootstrapFewShot(metric=philosophical_metric, max_labeled_demos=0, cache=cache)
+    with dspy.context(lm=FakeLM()):
+        monkeypatch.setattr(ThesisAgent, 'forward', timeout)
+        agent = teleprompter.compile(ThesisAgent(), trainset=thesis_examples())
+        assert len(cache) == 0 and not any(demo.get('augmented') for demo in agent.generate.predict.demos)
+        monkeypatch.undo()
+        teleprompter.compile(ThesisAgent(), trainset=thesis_examples())
+    assert teleprompter.reports[1]['cache_misses'] == 3 and len(cache) == 3